@@ -0,0 +1,30 @@
+from flask import Blueprint, jsonify
+from api.utils.security.jwt.decorators import token_required, admin_required
+from api.utils.security.jwt.jwt_utils import token_cache
+from api.utils.security.jwt.revocation import revocation_list
+from api.utils.payments import stripe_gateway
+from api.utils.catalog_cache import catalog_cache
+from api.product.snapshot import catalog_snapshots
+from api.product.search import product_search
+from api.product.facets import catalog_facets
+
+blueprint = Blueprint('admin', __name__)
+
+
+@blueprint.route("/metrics", methods=["GET"])
+@token_required
+@admin_required
+def metrics(current_user_id):
+    """Per-worker counters of the in-process caches and clients; rate limiter counters live at /admin/ddos/stats"""
+    return jsonify({
+        "data": {
+            "jwt_cache": token_cache.stats(),
+            "jwt_revocation": revocation_list.stats(),
+            "stripe_gateway": stripe_gateway.stats(),
+            "catalog_cache": catalog_cache.stats(),
+            "catalog_snapshot": catalog_snapshots.stats(),
+            "product_search": product_search.stats(),
+            "catalog_facets": catalog_facets.stats(),
+        },
+        "message": "Metrics retrieved successfully."
+    }), 200
@@ -9,6 +9,12 @@ from api.utils.db.create_tables import create_tables
 from sqlalchemy import inspect
 from flask_mail import Mail
 from api.contact.routes import blueprint as contact_blueprint
+from api.utils.security.DDOS import init_rate_limiting
+from api.utils.security.jwt.decorators import current_principal, get_bearer_token
+from api.purchases.outbox.worker import init_payment_intent_worker
+from api.purchases.reservation.engine import init_reservation_sweeper
+from api.purchases.webhook.worker import init_stripe_webhook_worker
+from api.product.search import init_product_search
 
 from dotenv import load_dotenv
 import os
@@ -42,6 +48,15 @@ application.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
 init_db(application)
 migrate = Migrate(application, db)
 
+# Thread que cria os PaymentIntents da Stripe a partir do outbox do checkout
+init_payment_intent_worker(application)
+# Libera reservas de estoque cujo pagamento não foi confirmado a tempo
+init_reservation_sweeper(application)
+# Aplica em lote os eventos de webhook da Stripe gravados pela rota /webhooks/stripe/create
+init_stripe_webhook_worker(application)
+# Monta o índice de busca de produtos em segundo plano, fora das requisições
+init_product_search(application)
+
 try:
     connect_to_db(application)
     print("Connected successfully")
@@ -75,6 +90,12 @@ except Exception as e:
     raise
 
 
+# Rate limiting global (tabela de políticas em api/utils/security/DDOS/policies.py).
+# Registrado antes do verify_jwt: requisições sem token para rotas protegidas também são contadas.
+# O token só é decodificado aqui para políticas por usuário, e o verify_jwt reaproveita o resultado em g
+init_rate_limiting(application)
+
+
 @application.before_request
 def verify_jwt():
     if request.method == 'OPTIONS':
@@ -112,23 +133,14 @@ def verify_jwt():
     else:
           current_app.logger.debug(f"verify_jwt: Endpoint '{request.endpoint}' is NOT public. Proceeding with token check.")
  
-    # Log para debug do endpoint sendo verificado
-### erro aqui facil de resolver só ver no git e arrumar
-    token = request.headers.get("Authorization")
-    if not token:
+    # O token é decodificado uma única vez; os decorators leem o principal de g
+    if not get_bearer_token():
         current_app.logger.warning(f"verify_jwt: Token ausente para endpoint protegido '{request.endpoint}'.")
         return jsonify({"message": "Token ausente!"}), 401
 
-    try:
-        # Assumindo que verify_token agora retorna apenas o user_id ou levanta exceção
-        from api.utils.security.jwt.jwt_utils import verify_token # Importar aqui ou no topo
-        user_id = verify_token(token.split()[1] if token.startswith("Bearer ") else token)
-        g.current_user_id = user_id # Armazena no contexto da requisição 'g'
-    except Exception as e: # Captura exceções de verify_token (Expirado, Inválido)
-        # É importante que verify_token levante exceções específicas ou retorne algo
-        # que indique falha para este try/except funcionar bem.
-        # Ajuste a mensagem de erro conforme o que verify_token retorna/levanta.
-        return jsonify({"message": f"Token inválido ou expirado: {str(e)}"}), 401
+    if current_principal() is None:
+        return jsonify({"message": "Token inválido ou expirado!"}), 401
+
 
 
 @application.before_request
@@ -0,0 +1,86 @@
+"""
+Per-request authentication overhead of a protected route.
+
+"before" replays the previous path: verify_jwt decodes the token, then token_required decodes it
+again and prints its trace lines (sent to /dev/null here, to the worker log in production).
+"after" is the memoized principal: verify_jwt, the rate limit middleware and token_required all
+call current_principal(), which decodes once per request.
+"cached" adds the verified-token cache of jwt_utils, so a reused token skips HS256 entirely.
+
+Usage (from the repository root):
+    JWT_SECRET_KEY=... python -m api.benchmarks.auth [--requests 50000]
+"""
+import argparse
+import contextlib
+import logging
+import os
+import time
+
+from flask import Flask, g
+
+from api.utils.security.jwt.decorators import current_principal, get_bearer_token
+from api.utils.security.jwt.jwt_utils import generate_token, token_cache, verify_token
+
+
+def legacy_auth(token_header: str, log) -> int:
+    # before_request verify_jwt
+    user_id = verify_token(token_header.split()[1] if token_header.startswith("Bearer ") else token_header)
+    g.current_user_id = user_id
+    # token_required
+    print("\n=== INÍCIO DA REQUISIÇÃO (decorator) ===", file=log, flush=True)
+    print("Método: GET", file=log, flush=True)
+    print("\n=== Validação de Token (decorator) ===", file=log, flush=True)
+    token = token_header.split()[1]
+    print("✓ Bearer token encontrado (decorator)", file=log, flush=True)
+    print(f"Token recebido (decorator): {token[:20]}...", file=log, flush=True)
+    user_id = verify_token(token)
+    print(f"✓ Token válido para user_id: {user_id} (decorator)", file=log, flush=True)
+    return user_id
+
+
+def memoized_auth(token_header: str, log) -> int:
+    # verify_jwt, middleware (política por usuário) e token_required
+    get_bearer_token()
+    current_principal()
+    current_principal()
+    return current_principal()
+
+
+def measure(app: Flask, auth, token_header: str, requests: int, log) -> float:
+    headers = {"Authorization": token_header}
+    start = time.perf_counter()
+    for _ in range(requests):
+        with app.test_request_context("/user/me", headers=headers):
+            assert auth(token_header, log) == 42
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50_000)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    app = Flask(__name__)
+    with app.app_context():
+        token_header = f"Bearer {generate_token(42)}"
+
+    cache_size = token_cache.max_size
+    with open(os.devnull, "w") as log, contextlib.redirect_stdout(log):
+        baseline = measure(app, lambda header, _: 42, token_header, args.requests, log)
+        token_cache.max_size = 0
+        before = measure(app, legacy_auth, token_header, args.requests, log)
+        after = measure(app, memoized_auth, token_header, args.requests, log)
+        token_cache.max_size = cache_size or 10_000
+        cached = measure(app, memoized_auth, token_header, args.requests, log)
+
+    print(f"request context only: {baseline:.1f} µs/request")
+    print(f"{'mode':<28}{'auth µs/request':>16}")
+    print(f"{'decode twice + prints':<28}{before - baseline:>16.1f}")
+    print(f"{'memoized principal':<28}{after - baseline:>16.1f}")
+    print(f"{'memoized + token cache':<28}{cached - baseline:>16.1f}")
+    print(f"token cache: {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Catalog reads through the HTTP routes with the catalog cache off vs on: product by id, the full
+product listing, one listing page and the category listing. With the cache on, the only statement
+left is the catalog version check (at most once per --check-interval seconds), plus a full reload
+after each version bump (--bump-every requests; 0 never bumps).
+
+Runs on SQLite; --rtt-ms adds a sleep per statement to stand in for the MySQL round trip.
+
+Usage (from the repository root):
+    JWT_SECRET_KEY=... python -m api.benchmarks.catalog_cache [--products 5000] [--requests 500]
+"""
+import argparse
+import logging
+import random
+import time
+import uuid
+import warnings
+
+from flask import Flask
+from sqlalchemy import event
+
+from api.utils.db.connection import db
+from api.benchmarks.catalog_listing import seed_catalog
+from api.category.routes import blueprint as category_blueprint
+from api.product.routes import blueprint as product_blueprint
+from api.utils.catalog_cache import bump_catalog_version, catalog_cache
+from api.utils.security.jwt.jwt_utils import generate_token
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--check-interval", type=float, default=1.0)
+    parser.add_argument("--bump-every", type=int, default=0, help="bump the catalog version every N requests")
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated database round trip per statement")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.simplefilter("ignore")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:////tmp/catalog-cache-{uuid.uuid4().hex}.db"
+    db.init_app(app)
+    app.register_blueprint(product_blueprint, url_prefix='/product')
+    app.register_blueprint(category_blueprint, url_prefix='/category')
+
+    statements = [0]
+    rtt = args.rtt_ms / 1000
+    with app.app_context():
+        seed_catalog(args.products)
+        token = generate_token(1)
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def count_statement(*_):
+            statements[0] += 1
+            if rtt:
+                time.sleep(rtt)
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    rng = random.Random(7)
+    catalog_cache.use_redis = False
+    catalog_cache.check_interval = args.check_interval
+
+    # Leituras por id com distribuição enviesada (poucos produtos recebem a maior parte do tráfego)
+    hot = [int(rng.paretovariate(1.2)) % args.products + 1 for _ in range(args.requests)]
+    cases = [
+        ("product by id", lambda i: f"/product/read/{hot[i]}", args.requests),
+        ("full listing", lambda i: "/product/read/all", max(args.requests // 50, 5)),
+        ("page newest, category filter", lambda i: f"/product/read/all?limit=50&category_id={1 + i % 4}", args.requests),
+        ("categories", lambda i: "/category/read/all", args.requests),
+    ]
+
+    print(f"{'route':<32}{'cache':>6}{'ms/req':>10}{'queries/req':>13}{'hit ratio':>11}")
+    for label, url, requests in cases:
+        for enabled in (False, True):
+            catalog_cache.enabled = enabled
+            catalog_cache._reset()
+            assert client.get(url(0), headers=headers).status_code == 200
+            statements[0] = 0
+            start = time.perf_counter()
+            for i in range(requests):
+                if args.bump_every and i and i % args.bump_every == 0:
+                    with app.app_context():
+                        bump_catalog_version()
+                        db.session.commit()
+                client.get(url(i), headers=headers)
+            elapsed = (time.perf_counter() - start) / requests * 1000
+            ratio = catalog_cache.stats()["hit_ratio"] if enabled else 0.0
+            print(f"{label:<32}{'on' if enabled else 'off':>6}{elapsed:>10.2f}{statements[0] / requests:>13.2f}{ratio:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Facet counts (category, gender, size, price bucket) for several filter combinations: four
+GROUP BY queries per request (each facet under the other facets' filters, the way /product/facets
+counts them) vs the in-memory bitsets of api/product/facets.py, plus the bitset build time paid
+once per catalog version. Both sides are checked to return the same counts.
+
+Runs on SQLite; --rtt-ms adds a sleep per statement to stand in for the MySQL round trip.
+
+Usage (from the repository root):
+    JWT_SECRET_KEY=... python -m api.benchmarks.catalog_facets [--products 100000] [--rounds 50]
+"""
+import argparse
+import logging
+import time
+import uuid
+import warnings
+
+from flask import Flask
+from sqlalchemy import case, event, func
+
+from api.utils.db.connection import db
+from api.benchmarks.catalog_listing import seed_catalog
+from api.product.facets import FACETS, PRICE_BUCKETS, build_facets
+from api.product.model import Product
+
+COLUMNS = {"category": Product.category_id, "gender": Product.gender_id, "size": Product.size_id}
+
+
+def price_case():
+    return case(*[((Product.price >= lower) & (Product.price < upper), key) if upper is not None
+                  else (Product.price >= lower, key) for key, lower, upper in PRICE_BUCKETS])
+
+
+def condition(facet, values):
+    if facet == "price":
+        return price_case().in_(values)
+    return COLUMNS[facet].in_(values)
+
+
+def group_by_counts(selection):
+    """What the route would cost without the engine: one GROUP BY per facet plus the total"""
+    facets = {}
+    for facet in FACETS:
+        column = price_case() if facet == "price" else COLUMNS[facet]
+        query = db.session.query(column, func.count()).group_by(column)
+        for other, values in selection.items():
+            if other != facet:
+                query = query.filter(condition(other, values))
+        facets[facet] = {value: count for value, count in query if value is not None}
+    total = db.session.query(func.count(Product.id))
+    for facet, values in selection.items():
+        total = total.filter(condition(facet, values))
+    return {"total": total.scalar(), "facets": facets}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated database round trip per statement")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.simplefilter("ignore")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:////tmp/catalog-facets-{uuid.uuid4().hex}.db"
+    db.init_app(app)
+    rtt = args.rtt_ms / 1000
+
+    selections = [
+        ("no filter", {}),
+        ("category", {"category": [3]}),
+        ("category + gender", {"category": [3], "gender": [1]}),
+        ("two sizes + price", {"size": [2, 3], "price": [PRICE_BUCKETS[2][0]]}),
+        ("all four", {"category": [5, 6], "gender": [3], "size": [4], "price": [PRICE_BUCKETS[3][0]]}),
+    ]
+
+    with app.app_context():
+        seed_catalog(args.products)
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def round_trip(*_):
+            if rtt:
+                time.sleep(rtt)
+
+        start = time.perf_counter()
+        snapshot = build_facets()
+        print(f"bitset build: {args.products} products in {(time.perf_counter() - start) * 1000:.0f} ms "
+              f"(once per catalog version)")
+        print(f"{'filters':<22}{'GROUP BY ms':>13}{'bitsets ms':>12}{'speedup':>9}{'matching':>10}")
+        for label, selection in selections:
+            expected = group_by_counts(selection)
+            counted = snapshot.counts(selection)
+            assert counted["total"] == expected["total"]
+            for facet in FACETS:
+                assert {value["id" if facet != "price" else "key"]: value["count"] for value in counted["facets"][facet]
+                        if value["count"]} == expected["facets"][facet], facet
+
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                group_by_counts(selection)
+            queries = (time.perf_counter() - start) / args.rounds * 1000
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                snapshot.counts(selection)
+            bitsets = (time.perf_counter() - start) / args.rounds * 1000
+            print(f"{label:<22}{queries:>13.2f}{bitsets:>12.3f}{queries / bitsets:>8.0f}x{counted['total']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+GET /product/read/all against a synthetic catalog: the whole table serialized (before) vs one
+keyset page of api/product/catalog.py, for several sort/filter combinations and for a deep page
+(reached through the cursor, so its cost should match the first page).
+
+Runs on SQLite with the composite indexes of the model. --rtt-ms adds a sleep per statement to
+stand in for the MySQL round trip.
+
+Usage (from the repository root):
+    JWT_SECRET_KEY=... python -m api.benchmarks.catalog_listing [--products 50000] [--page 50] [--rounds 20]
+"""
+import argparse
+import logging
+import random
+import time
+import uuid
+import warnings
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask
+from sqlalchemy import event, insert
+
+from api.utils.db.connection import db
+import api.utils.db.create_tables  # noqa: F401 - registra todos os modelos
+from api.category.model import Category
+from api.currency.model import Currency
+from api.gender.model import Gender
+from api.product import catalog
+from api.product.model import Product
+from api.size.model import Size
+from api.utils.pagination import decode_cursor, encode_cursor
+
+CATEGORIES = 24
+GENDERS = 3
+SIZES = 6
+WORDS = ["camiseta", "moletom", "calça", "boné", "jaqueta", "bermuda", "regata", "meia", "tênis", "vestido",
+         "algodão", "oversized", "básica", "estampada", "listrada", "preta", "branca", "azul", "verde", "edição"]
+
+
+def seed_catalog(products: int, seed: int = 42) -> None:
+    """Reference rows plus `products` synthetic products with varied names, prices, stock and dates"""
+    rng = random.Random(seed)
+    db.create_all()
+    db.session.add(Currency(id=1, code="BRL", name="Real"))
+    db.session.add_all(Gender(id=i, name=f"G{i}", long_name=["Masculino", "Feminino", "Unissex"][i - 1])
+                       for i in range(1, GENDERS + 1))
+    db.session.add_all(Category(id=i, name=f"{WORDS[i % 10].title()} {i}", gender_id=1 + i % GENDERS)
+                       for i in range(1, CATEGORIES + 1))
+    db.session.add_all(Size(id=i, name=["PP", "P", "M", "G", "GG", "XG"][i - 1]) for i in range(1, SIZES + 1))
+    db.session.commit()
+    start = datetime(2024, 1, 1)
+    for offset in range(0, products, 10000):
+        rows = []
+        for i in range(offset + 1, min(offset + 10000, products) + 1):
+            category_id = rng.randint(1, CATEGORIES)
+            words = rng.sample(WORDS, 3)
+            rows.append({
+                "id": i,
+                "name": " ".join(words)[:35],
+                "price": Decimal(rng.randint(1990, 49990)) / 100,
+                "currency_id": 1,
+                "size_id": rng.randint(1, SIZES),
+                "description": f"{' '.join(rng.sample(WORDS, 6))} {i}",
+                "inventory": rng.choice([0, 0, 1, 5, 20, 100]),
+                "category_id": category_id,
+                "gender_id": 1 + category_id % GENDERS,
+                "created_at": start + timedelta(minutes=rng.randint(0, 1_000_000)),
+                "updated_at": start,
+            })
+        db.session.execute(insert(Product), rows)
+    db.session.commit()
+
+
+def full_listing():
+    """read_all before this change"""
+    return [product.serialize() for product in Product.query.all()]
+
+
+def page(filters, sort, limit, after=None):
+    products, _ = catalog.product_page(filters, sort, limit, after)
+    return [product.serialize() for product in products], products
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated database round trip per statement")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.simplefilter("ignore")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:////tmp/catalog-{uuid.uuid4().hex}.db"
+    db.init_app(app)
+
+    statements = [0]
+    rtt = args.rtt_ms / 1000
+
+    with app.app_context():
+        seed_catalog(args.products)
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def count_statement(*_):
+            statements[0] += 1
+            if rtt:
+                time.sleep(rtt)
+
+        def measure(fn, rounds):
+            fn()
+            db.session.remove()
+            statements[0] = 0
+            start = time.perf_counter()
+            for _ in range(rounds):
+                fn()
+                db.session.remove()
+            return (time.perf_counter() - start) / rounds * 1000, statements[0] / rounds
+
+        print(f"{'listing':<42}{'ms':>10}{'queries':>9}")
+        ms, queries = measure(full_listing, 1)
+        print(f"{f'full catalog ({args.products} products)':<42}{ms:>10.1f}{queries:>9.0f}")
+
+        cases = [
+            ("newest", catalog.ProductFilters()),
+            ("price_asc", catalog.ProductFilters()),
+            ("newest", catalog.ProductFilters(category_id=7)),
+            ("price_desc", catalog.ProductFilters(category_id=7)),
+            ("newest", catalog.ProductFilters(gender_id=2, in_stock=True)),
+            ("price_asc", catalog.ProductFilters(min_price=Decimal("50"), max_price=Decimal("120"), size_id=3)),
+            ("name", catalog.ProductFilters()),
+        ]
+        for sort, filters in cases:
+            label = f"page {sort} {', '.join(f'{k}={v}' for k, v in vars(filters).items() if v not in (None, False)) or 'all'}"
+            ms, queries = measure(lambda: page(filters, sort, args.page), args.rounds)
+            print(f"{label[:42]:<42}{ms:>10.2f}{queries:>9.0f}")
+
+        # Página profunda: segue o cursor 20 páginas e mede a seguinte
+        after = None
+        for _ in range(20):
+            _, products = page(catalog.ProductFilters(), "newest", args.page, after)
+            cursor = encode_cursor(catalog.encode_sort_key(products[-1], "newest"))
+            after = catalog.decode_sort_key(decode_cursor(cursor, 2), "newest")
+        ms, queries = measure(lambda: page(catalog.ProductFilters(), "newest", args.page, after), args.rounds)
+        print(f"{'page newest all, 21st page (cursor)':<42}{ms:>10.2f}{queries:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
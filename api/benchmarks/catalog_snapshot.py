@@ -0,0 +1,86 @@
+"""
+GET /product/read/all once the catalog is cached: serialized dicts from the catalog cache passed
+to jsonify on every request (before) vs the prebuilt snapshot bytes, uncompressed, gzip and as a
+304 revalidation. Also reports the snapshot build time and the payload size per encoding.
+
+Runs on SQLite; the database is not touched after the first request of each case.
+
+Usage (from the repository root):
+    JWT_SECRET_KEY=... python -m api.benchmarks.catalog_snapshot [--products 5000] [--requests 200]
+"""
+import argparse
+import logging
+import time
+import uuid
+import warnings
+
+from flask import Flask, jsonify
+
+from api.utils.db.connection import db
+from api.benchmarks.catalog_listing import seed_catalog
+from api.product import catalog
+from api.product.model import Product
+from api.product.routes import blueprint as product_blueprint
+from api.product.snapshot import build_snapshot, catalog_snapshots
+from api.utils.catalog_cache import catalog_cache
+from api.utils.security.jwt.decorators import token_required
+from api.utils.security.jwt.jwt_utils import generate_token
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.simplefilter("ignore")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:////tmp/catalog-snapshot-{uuid.uuid4().hex}.db"
+    db.init_app(app)
+    app.register_blueprint(product_blueprint, url_prefix='/product')
+
+    # read_all antes desta mudança (já com o cache da versão do catálogo)
+    @app.route("/before/read/all")
+    @token_required
+    def before(current_user_id):
+        products_data = catalog_cache.get_or_load("products:all", lambda: [
+            product.serialize() for product in Product.query.options(*catalog.eager_options()).all()
+        ])
+        return jsonify({"data": products_data, "message": "Products retrieved successfully."}), 200
+
+    with app.app_context():
+        seed_catalog(args.products)
+        token = generate_token(1)
+        snapshot = build_snapshot()
+    catalog_cache.use_redis = False
+    catalog_cache.check_interval = 3600
+
+    sizes = snapshot.get("all").variants
+    print(f"snapshot build: {snapshot.build_seconds * 1000:.0f} ms for {len(snapshot.renditions)} renditions; "
+          + ", ".join(f"{encoding} {len(body) / 1024:.0f} KiB" for encoding, body in sizes.items()))
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    etag = client.get("/product/read/all", headers=headers).headers["ETag"]
+    cases = [
+        ("cache + jsonify", "/before/read/all", {}),
+        ("snapshot identity", "/product/read/all", {}),
+        ("snapshot gzip", "/product/read/all", {"Accept-Encoding": "gzip"}),
+        ("snapshot 304", "/product/read/all", {"If-None-Match": etag}),
+        ("category slice gzip", "/product/read/category/7", {"Accept-Encoding": "gzip"}),
+    ]
+    print(f"{'case':<22}{'ms/req':>10}{'bytes':>12}")
+    for label, url, extra in cases:
+        response = client.get(url, headers={**headers, **extra})
+        assert response.status_code in (200, 304)
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            client.get(url, headers={**headers, **extra}).get_data()
+        elapsed = (time.perf_counter() - start) / args.requests * 1000
+        print(f"{label:<22}{elapsed:>10.3f}{len(response.get_data()):>12}")
+    print(f"snapshot builds during the run: {catalog_snapshots.builds}")
+
+
+if __name__ == "__main__":
+    main()
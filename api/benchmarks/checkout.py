@@ -0,0 +1,142 @@
+"""
+Checkout latency against cart size: per-item lookups (before) vs the batched pricing stage and
+bulk inserts of api/purchases/purchase/checkout.py (after).
+
+Runs the database part of /purchase/create on SQLite; the Stripe call is left out since it costs the
+same in both paths. --rtt-ms adds a sleep per statement to stand in for the MySQL round trip.
+
+Usage (from the repository root):
+    JWT_SECRET_KEY=... python -m api.benchmarks.checkout [--sizes 1 5 10 25 50] [--rounds 20] [--rtt-ms 0.5]
+"""
+import argparse
+import logging
+import time
+import uuid
+import warnings
+from decimal import Decimal
+
+from flask import Flask
+from sqlalchemy import event
+
+from api.utils.db.connection import db
+import api.utils.db.create_tables  # noqa: F401 - registra todos os modelos
+from api.address.model import Address
+from api.currency.model import Currency
+from api.payment_status.model import PaymentStatus
+from api.product.model import Product
+from api.purchases.history.model import PurchaseHistory
+from api.purchases.product.model import PurchaseItem
+from api.purchases.purchase.checkout import price_cart, write_purchase
+from api.purchases.purchase.model import Purchase
+from api.transaction.method.model import TransactionMethod
+from api.transaction.payment.model import Transaction
+from api.user.model import AuthProviderEnum, User
+
+PRODUCTS = 200
+
+
+def seed():
+    db.create_all()
+    db.session.add(Currency(id=1, code="BRL", name="Real"))
+    db.session.add(PaymentStatus(id=1, name="Pending"))
+    db.session.add(PaymentStatus(id=2, name="awaiting_intent"))
+    db.session.add(TransactionMethod(id=1, name="stripe", display_name="Stripe"))
+    db.session.add(User(id=1, name="bench", email="bench@example.com", auth_provider=AuthProviderEnum.GOOGLE,
+                        provider_id="bench"))
+    db.session.add(Address(id=1, user_id=1, street="Rua", number=1, city="SP", state="SP", zip_code="00000-000",
+                           country="BR"))
+    db.session.add_all(
+        Product(id=i, name=f"Product {i}", price=Decimal("99.90"), currency_id=1, size_id=1, description="bench",
+                inventory=1_000_000, category_id=1, gender_id=1)
+        for i in range(1, PRODUCTS + 1)
+    )
+    db.session.commit()
+
+
+def legacy_checkout(items, user_id=1, address_id=1):
+    """Database steps of handle_create_purchase before the pricing stage"""
+    session = db.session
+    user = User.query.get(user_id)
+    shipping_address = Address.query.get(address_id)
+    assert shipping_address.user_id == user.id
+    first_product = Product.query.get(int(items[0]['product_id']))
+    currency = Currency.query.get(first_product.currency_id)
+    subtotal = Decimal('0.00')
+    processed = []
+    for item in items:
+        product = Product.query.get(item['product_id'])
+        unit_price = Decimal(str(item['unit_price_at_purchase']))
+        subtotal += unit_price * item['quantity']
+        processed.append((product.id, item['size_id'], item['quantity'], unit_price))
+
+    purchase = Purchase(user_id=user.id, currency_id=currency.id, shipping_address_id=shipping_address.id,
+                        subtotal=subtotal, total_amount=subtotal)
+    session.add(purchase)
+    session.flush()
+    for product_id, size_id, quantity, unit_price in processed:
+        purchase_item = PurchaseItem(purchase_id=purchase.id, product_id=product_id, size_id=size_id,
+                                     quantity=quantity, unit_price_at_purchase=unit_price)
+        purchase_item.calculate_total()
+        session.add(purchase_item)
+    pending_status = PaymentStatus.query.filter_by(name="Pending").first()
+    transaction_method = TransactionMethod.query.filter_by(name="stripe").first()
+    session.add(Transaction(user_id=user.id, purchase_id=purchase.id, method_id=transaction_method.id,
+                            amount=subtotal, currency_id=currency.id, gateway_payment_id="pi_bench",
+                            payment_status_id=pending_status.id))
+    session.add(PurchaseHistory(purchase_id=purchase.id, created_by=f"user:{user.id}"))
+    session.commit()
+
+
+def batched_checkout(items, user_id=1, address_id=1):
+    session = db.session
+    shipping_address = Address.query.filter_by(id=address_id, user_id=user_id).first()
+    cart = price_cart(items)
+    write_purchase(cart, str(uuid.uuid4()), user_id, shipping_address.id)
+    session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated database round trip per statement")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    # O caminho "before" usa Query.get, marcado como legado no SQLAlchemy 2
+    warnings.simplefilter("ignore")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+
+    statements = [0]
+    rtt = args.rtt_ms / 1000
+
+    with app.app_context():
+        seed()
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def count_statement(*_):
+            statements[0] += 1
+            if rtt:
+                time.sleep(rtt)
+
+        print(f"{'items':>6}{'before ms':>12}{'queries':>9}{'after ms':>11}{'queries':>9}{'speedup':>9}")
+        for size in args.sizes:
+            items = [{"product_id": 1 + i % PRODUCTS, "size_id": 1, "quantity": 1, "unit_price_at_purchase": "99.90"}
+                     for i in range(size)]
+            row = []
+            for checkout in (legacy_checkout, batched_checkout):
+                checkout(items)  # aquece caches (ex.: ids de referência)
+                statements[0] = 0
+                start = time.perf_counter()
+                for _ in range(args.rounds):
+                    checkout(items)
+                    db.session.remove()
+                row.append(((time.perf_counter() - start) / args.rounds * 1000, statements[0] / args.rounds))
+            (before, before_queries), (after, after_queries) = row
+            print(f"{size:>6}{before:>12.2f}{before_queries:>9.0f}{after:>11.2f}{after_queries:>9.0f}{before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
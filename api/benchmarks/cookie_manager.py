@@ -0,0 +1,62 @@
+"""
+Cookie validation throughput: legacy JSON cookie vs compact HMAC cookie, with and without the
+verified-cookie cache.
+
+Usage (from the repository root):
+    python -m api.benchmarks.cookie_manager [--cookies 1000] [--validations 200000]
+"""
+import argparse
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+
+from api.utils.security.DDOS.cookie_manager import cookie_manager
+
+
+def legacy_cookie(client_id: str) -> str:
+    timestamp = datetime.utcnow().isoformat()
+    signature = cookie_manager._generate_signature(client_id, timestamp)
+    return json.dumps({"id": client_id, "ts": timestamp, "sig": signature})
+
+
+def legacy_validate(cookie: str):
+    """Validation as done before the compact format: JSON decode + SHA-256 on every request"""
+    cookie_data = json.loads(cookie)
+    if cookie_manager._verify_signature(cookie_data['id'], cookie_data['ts'], cookie_data['sig']):
+        return cookie_data['id']
+    return None
+
+
+def measure(validate, cookies, validations: int) -> float:
+    start = time.perf_counter()
+    for i in range(validations):
+        assert validate(cookies[i % len(cookies)]) is not None
+    return validations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cookies", type=int, default=1000, help="distinct clients in the request stream")
+    parser.add_argument("--validations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    client_ids = [str(uuid.uuid4()) for _ in range(args.cookies)]
+    legacy = [legacy_cookie(client_id) for client_id in client_ids]
+    compact = [cookie_manager.encode_cookie(client_id) for client_id in client_ids]
+
+    results = [
+        ("legacy JSON (before)", measure(legacy_validate, legacy, args.validations)),
+        ("compact HMAC, no cache", measure(cookie_manager._decode_compact, compact, args.validations)),
+        ("compact HMAC, cached", measure(cookie_manager.verify_cookie_value, compact, args.validations)),
+    ]
+    print(f"legacy cookie: {len(legacy[0])} bytes, compact cookie: {len(compact[0])} bytes")
+    print(f"{'mode':<26}{'validations/s':>16}")
+    for name, rate in results:
+        print(f"{name:<26}{rate:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+1,000 buyers racing for 50 units of one product: read-then-write stock update (before) vs the
+conditional UPDATE of api/purchases/reservation/engine.py, on the product row and over shards.
+
+Each buyer reserves one unit in its own transaction from a pool of --concurrency threads.
+"sold" counts buyers told their purchase went through; anything above the stock is oversold.
+
+Runs on a SQLite file by default, where writers are serialized by the database lock, so the
+shards only show their effect on a server database (--database-url mysql+pymysql://...).
+
+Usage (from the repository root):
+    JWT_SECRET_KEY=... python -m api.benchmarks.inventory_race [--buyers 1000] [--units 50] [--shards 8]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+import uuid
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask
+from sqlalchemy import insert
+
+from api.utils.db.connection import db
+from api.benchmarks.checkout import seed
+from api.product.model import Product
+from api.purchases.purchase.checkout import CheckoutError
+from api.purchases.purchase.model import Purchase
+from api.purchases.reservation import engine as inventory
+from api.purchases.reservation.model import InventoryReservation
+
+HOT_PRODUCT = 1
+
+
+def naive_buy(purchase_id):
+    """Stock check and decrement as two statements, like the commented-out check in the old checkout"""
+    product = db.session.get(Product, HOT_PRODUCT, populate_existing=True)
+    if product.inventory < 1:
+        db.session.rollback()
+        return False
+    time.sleep(0)  # cede a vez: outra thread pode ler o mesmo estoque aqui
+    db.session.execute(
+        Product.__table__.update().where(Product.id == HOT_PRODUCT).values(inventory=product.inventory - 1)
+    )
+    db.session.execute(insert(InventoryReservation), [{
+        "purchase_id": purchase_id, "product_id": HOT_PRODUCT, "quantity": 1,
+        "status": InventoryReservation.HELD, "expires_at": datetime.utcnow() + timedelta(minutes=15),
+    }])
+    db.session.commit()
+    return True
+
+
+def reserve_buy(purchase_id):
+    try:
+        inventory.reserve(purchase_id, {HOT_PRODUCT: 1})
+        db.session.commit()
+        return True
+    except CheckoutError:
+        db.session.rollback()
+        return False
+
+
+def race(app, buy, purchase_ids, concurrency):
+    def buyer(purchase_id):
+        with app.app_context():
+            for _ in range(20):
+                try:
+                    return buy(purchase_id)
+                except Exception:  # "database is locked" / deadlock: o cliente tenta de novo
+                    db.session.rollback()
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(buyer, purchase_ids))
+    return time.perf_counter() - start, sum(results)
+
+
+def reset(units, shards, buyers):
+    db.session.query(InventoryReservation).delete()
+    db.session.query(Purchase).delete()
+    db.session.query(Product).filter_by(id=HOT_PRODUCT).update({"inventory": units})
+    db.session.commit()
+    inventory.shard_product(HOT_PRODUCT, shards)
+    purchase_ids = [str(uuid.uuid4()) for _ in range(buyers)]
+    db.session.execute(insert(Purchase), [{
+        "id": purchase_id, "user_id": 1, "currency_id": 1, "shipping_address_id": 1,
+        "subtotal": Decimal("99.90"), "total_amount": Decimal("99.90"),
+    } for purchase_id in purchase_ids])
+    db.session.commit()
+    return purchase_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buyers", type=int, default=1000)
+    parser.add_argument("--units", type=int, default=50)
+    parser.add_argument("--shards", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.simplefilter("ignore")
+    app = Flask(__name__)
+    path = None
+    if args.database_url:
+        app.config["SQLALCHEMY_DATABASE_URI"] = args.database_url
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "inventory_race.db")
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"connect_args": {"timeout": 30, "check_same_thread": False}}
+    db.init_app(app)
+
+    with app.app_context():
+        seed()
+
+    print(f"{args.buyers} buyers, {args.units} units, {args.concurrency} threads")
+    print(f"{'strategy':>22}{'sold':>7}{'oversold':>10}{'left':>7}{'seconds':>9}{'buyers/s':>10}")
+    strategies = (
+        ("read-then-write", naive_buy, 0),
+        ("conditional UPDATE", reserve_buy, 0),
+        (f"{args.shards} shards", reserve_buy, args.shards),
+    )
+    for name, buy, shards in strategies:
+        with app.app_context():
+            purchase_ids = reset(args.units, shards, args.buyers)
+            db.session.remove()
+        elapsed, sold = race(app, buy, purchase_ids, args.concurrency)
+        with app.app_context():
+            left = inventory.available([HOT_PRODUCT])[HOT_PRODUCT]
+        print(f"{name:>22}{sold:>7}{max(0, sold - args.units):>10}{left:>7}{elapsed:>9.2f}{args.buyers / elapsed:>10.0f}")
+
+    if path:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+SQL statements and latency of GET /purchase/user/me against the number of orders: lazy loading per
+purchase, item and transaction (before) vs the real endpoint, keyset page with the selectinload plan
+of Purchase.loader_options (after), called through the Flask test client.
+
+Every order has --items items and one transaction; all include_* flags are on and the page holds
+every order (limit=100). The statements issued by the "after" request must not grow with the number
+of orders: the script exits with status 1 if they do, so it doubles as the query-count regression
+check for the endpoint (a dropped loader option or a lazy access in serialize shows up here).
+
+Usage (from the repository root):
+    JWT_SECRET_KEY=... python -m api.benchmarks.order_history [--orders 1 10 40 100] [--items 3] [--rounds 20]
+"""
+import argparse
+import logging
+import sys
+import time
+import uuid
+import warnings
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask
+from sqlalchemy import event, insert
+
+from api.utils.db.connection import db
+from api.benchmarks.checkout import PRODUCTS, seed
+from api.address.model import Address
+from api.category.model import Category
+from api.purchases.product.model import PurchaseItem
+from api.purchases.purchase.model import Purchase
+from api.purchases.purchase.routes import purchase_bp
+from api.size.model import Size
+from api.transaction.payment.model import Transaction
+from api.user.model import AuthProviderEnum, User
+from api.utils.security.jwt.jwt_utils import generate_token
+
+FLAGS = dict(include_items=True, include_transactions=True, include_shipping=True)
+QUERY = {"limit": 100, "include_address": "true", **{flag: "true" for flag in FLAGS}}
+
+
+def seed_orders(user_id, orders, items):
+    db.session.add(User(id=user_id, name=f"bench {user_id}", email=f"bench{user_id}@example.com",
+                        auth_provider=AuthProviderEnum.GOOGLE, provider_id=f"bench{user_id}"))
+    start = datetime(2026, 1, 1)
+    purchases, purchase_items, transactions = [], [], []
+    for n in range(orders):
+        purchase_id = str(uuid.uuid4())
+        purchases.append({"id": purchase_id, "user_id": user_id, "currency_id": 1, "shipping_address_id": 1,
+                          "subtotal": Decimal("99.90") * items, "total_amount": Decimal("99.90") * items,
+                          "created_at": start + timedelta(minutes=n), "updated_at": start + timedelta(minutes=n)})
+        purchase_items += [{"purchase_id": purchase_id, "product_id": 1 + (n * items + i) % PRODUCTS, "size_id": 1,
+                            "quantity": 1, "unit_price_at_purchase": Decimal("99.90"),
+                            "total_price": Decimal("99.90")} for i in range(items)]
+        transactions.append({"user_id": user_id, "purchase_id": purchase_id, "method_id": 1,
+                             "amount": Decimal("99.90") * items, "currency": "BRL", "currency_id": 1,
+                             "gateway_payment_id": f"pi_{purchase_id}", "payment_status_id": 1})
+    db.session.execute(insert(Purchase), purchases)
+    db.session.execute(insert(PurchaseItem), purchase_items)
+    db.session.execute(insert(Transaction), transactions)
+    db.session.commit()
+
+
+def lazy_history(user_id):
+    """get_user_purchases before the keyset page: every relation loaded on first access"""
+    result = []
+    for p in Purchase.get_all_for_user(user_id):
+        data = p.serialize(**FLAGS)
+        addr = Address.query.get(p.shipping_address_id)
+        data['shipping_address'] = addr.serialize()
+        result.append(data)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, nargs="+", default=[1, 10, 40, 100])
+    parser.add_argument("--items", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated database round trip per statement")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.simplefilter("ignore")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+
+    app.register_blueprint(purchase_bp, url_prefix='/purchase')
+
+    statements = [0]
+    rtt = args.rtt_ms / 1000
+    after_counts = set()
+
+    with app.app_context():
+        seed()
+        db.session.add(Size(id=1, name="M"))
+        db.session.add(Category(id=1, name="Bench", gender_id=1))
+        db.session.commit()
+        tokens = {}
+        for user_id, orders in enumerate(args.orders, start=100):
+            seed_orders(user_id, orders, args.items)
+            tokens[user_id] = generate_token(user_id)
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def count_statement(*_):
+            statements[0] += 1
+            if rtt:
+                time.sleep(rtt)
+
+    client = app.test_client()
+
+    def endpoint_history(user_id):
+        response = client.get("/purchase/user/me", query_string=QUERY,
+                              headers={"Authorization": f"Bearer {tokens[user_id]}"})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return response.get_json()["data"]
+
+    print(f"{'orders':>7}{'before ms':>12}{'queries':>9}{'after ms':>11}{'queries':>9}{'speedup':>9}")
+    for user_id, orders in enumerate(args.orders, start=100):
+        with app.app_context():
+            assert len(lazy_history(user_id)) == orders
+            db.session.remove()
+            statements[0] = 0
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                lazy_history(user_id)
+                db.session.remove()
+            before, before_queries = (time.perf_counter() - start) / args.rounds * 1000, statements[0] / args.rounds
+
+        assert len(endpoint_history(user_id)) == orders
+        # Cada requisição precisa emitir o mesmo número de comandos, não só a média
+        for _ in range(args.rounds):
+            statements[0] = 0
+            endpoint_history(user_id)
+            after_counts.add(statements[0])
+        statements[0] = 0
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            endpoint_history(user_id)
+        after, after_queries = (time.perf_counter() - start) / args.rounds * 1000, statements[0] / args.rounds
+        print(f"{orders:>7}{before:>12.2f}{before_queries:>9.0f}{after:>11.2f}{after_queries:>9.0f}{before / after:>8.1f}x")
+
+    if len(after_counts) > 1:
+        print(f"FAIL: GET /purchase/user/me issued a varying number of statements: {sorted(after_counts)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Order listing from the source tables (keyset page of Purchase with the selectinload plan) vs the
+order_summaries projection (one indexed table), and the throughput of the batched rebuild.
+
+Every order has --items items and one transaction. --rtt-ms adds a sleep per statement to stand in
+for the MySQL round trip. Runs on SQLite.
+
+Usage (from the repository root):
+    JWT_SECRET_KEY=... python -m api.benchmarks.order_summaries [--orders 20000] [--page 20] [--rounds 50]
+"""
+import argparse
+import logging
+import time
+import uuid
+import warnings
+
+from flask import Flask
+from sqlalchemy import event
+
+from api.utils.db.connection import db
+from api.benchmarks.checkout import seed
+from api.benchmarks.order_history import FLAGS, seed_orders
+from api.category.model import Category
+from api.purchases.purchase.model import Purchase
+from api.purchases.summary import projection
+from api.purchases.summary.model import OrderSummary
+from api.size.model import Size
+
+USER_ID = 100
+
+
+def source_page(limit):
+    purchases, _ = Purchase.page_for_user(USER_ID, limit, options=Purchase.loader_options(include_address=True, **FLAGS))
+    return [p.serialize(include_address=True, **FLAGS) for p in purchases]
+
+
+def summary_page(limit):
+    rows, _ = OrderSummary.page(limit, user_id=USER_ID)
+    return [row.serialize() for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--items", type=int, default=3)
+    parser.add_argument("--page", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated database round trip per statement")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.simplefilter("ignore")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:////tmp/order-summaries-{uuid.uuid4().hex}.db"
+    db.init_app(app)
+
+    with app.app_context():
+        seed()
+        db.session.add(Size(id=1, name="M"))
+        db.session.add(Category(id=1, name="Bench", gender_id=1))
+        db.session.commit()
+        seed_orders(USER_ID, args.orders, args.items)
+
+    with app.app_context():
+        start = time.perf_counter()
+        written = projection.rebuild(args.batch_size)
+        elapsed = time.perf_counter() - start
+    print(f"rebuild: {written} orders in {elapsed:.1f}s ({written / elapsed:.0f} orders/s, batch {args.batch_size})")
+
+    statements = [0]
+    rtt = args.rtt_ms / 1000
+    with app.app_context():
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def count_statement(*_):
+            statements[0] += 1
+            if rtt:
+                time.sleep(rtt)
+
+        print(f"{'listing':>16}{'ms/page':>10}{'queries':>9}")
+        for name, page in (("source tables", source_page), ("order_summaries", summary_page)):
+            assert len(page(args.page)) == args.page
+            db.session.remove()
+            statements[0] = 0
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                page(args.page)
+                db.session.remove()
+            print(f"{name:>16}{(time.perf_counter() - start) / args.rounds * 1000:>10.2f}{statements[0] / args.rounds:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+ProductSearchIndex (api/product/search.py) over a synthetic catalog: full build time, latency
+percentiles per kind of query (exact words, several words, type-ahead prefixes, typos), and the
+incremental sync after a batch of product updates. The target is p99 under 2 ms at 100k products.
+
+Names combine a product type, a style, a color and a model word from a few thousand generated
+ones; descriptions draw from the whole vocabulary. Runs on SQLite.
+
+Usage (from the repository root):
+    JWT_SECRET_KEY=... python -m api.benchmarks.product_search [--products 100000] [--queries 2000]
+"""
+import argparse
+import logging
+import random
+import time
+import uuid
+import warnings
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask
+from sqlalchemy import insert, update
+
+from api.utils.db.connection import db
+from api.benchmarks.catalog_listing import CATEGORIES, GENDERS, SIZES, seed_catalog
+from api.product.model import Product
+from api.product.search import ProductSearchIndex
+from api.utils.catalog_cache import bump_catalog_version, catalog_cache
+
+TYPES = ["camiseta", "camisa", "moletom", "calça", "bermuda", "jaqueta", "regata", "boné", "meia", "tênis",
+         "vestido", "saia", "blusa", "casaco", "shorts", "polo", "cropped", "macacão", "cardigã", "colete"]
+STYLES = ["básica", "oversized", "estampada", "listrada", "slim", "esportiva", "clássica", "vintage",
+          "bordada", "lisa", "xadrez", "canelada", "térmica", "leve", "premium"]
+COLORS = ["preta", "branca", "azul", "verde", "vermelha", "cinza", "bege", "marrom", "rosa", "amarela",
+          "laranja", "roxa", "vinho", "marinho"]
+MATERIALS = ["algodão", "linho", "poliéster", "malha", "moletinho", "jeans", "couro", "seda", "lã", "viscose"]
+SYLLABLES = ["ba", "ca", "da", "fe", "gi", "lo", "mu", "na", "pe", "ri", "sa", "to", "vu", "xa", "ze", "lu", "mar", "ton"]
+
+
+def model_words(count: int, rng: random.Random):
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def seed_products(products: int, rng: random.Random, models):
+    seed_catalog(0)
+    start = datetime(2024, 1, 1)
+    vocabulary = TYPES + STYLES + COLORS + MATERIALS
+    for offset in range(0, products, 10000):
+        rows = []
+        for i in range(offset + 1, min(offset + 10000, products) + 1):
+            category_id = rng.randint(1, CATEGORIES)
+            name = f"{rng.choice(TYPES)} {rng.choice(STYLES)} {rng.choice(COLORS)} {rng.choice(models)}"
+            description = " ".join(rng.sample(vocabulary, 5) + rng.sample(models, 3) + [rng.choice(MATERIALS)])
+            rows.append({
+                "id": i, "name": name[:35], "price": Decimal(rng.randint(1990, 49990)) / 100, "currency_id": 1,
+                "size_id": rng.randint(1, SIZES), "description": description[:120], "inventory": rng.randint(0, 50),
+                "category_id": category_id, "gender_id": 1 + category_id % GENDERS,
+                "created_at": start + timedelta(minutes=i), "updated_at": start + timedelta(minutes=i),
+            })
+        db.session.execute(insert(Product), rows)
+    db.session.commit()
+
+
+def typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(word) - 1)
+    edit = rng.choice(["swap", "drop", "replace"])
+    if edit == "swap":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if edit == "drop":
+        return word[:i] + word[i + 1:]
+    return word[:i] + rng.choice("aeiourst") + word[i + 1:]
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--models", type=int, default=3000, help="distinct model words")
+    parser.add_argument("--queries", type=int, default=2000, help="queries per kind")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--updates", type=int, default=200, help="products changed before the incremental sync")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.simplefilter("ignore")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:////tmp/product-search-{uuid.uuid4().hex}.db"
+    db.init_app(app)
+    rng = random.Random(42)
+    models = model_words(args.models, rng)
+    catalog_cache.use_redis = False
+    catalog_cache.check_interval = 0
+
+    with app.app_context():
+        seed_products(args.products, rng, models)
+        index = ProductSearchIndex()
+        start = time.perf_counter()
+        index.ensure_current(wait=True)
+        print(f"build (background thread): {args.products} products in {time.perf_counter() - start:.1f}s "
+              f"({index.stats()['terms']} terms, {index.stats()['words']} words)")
+
+        kinds = {
+            "one word": lambda: rng.choice(TYPES + COLORS),
+            "two words": lambda: f"{rng.choice(TYPES)} {rng.choice(COLORS)}",
+            "three words": lambda: f"{rng.choice(TYPES)} {rng.choice(STYLES)} {rng.choice(COLORS)}",
+            "rare word": lambda: rng.choice(models),
+            "type-ahead": lambda: (lambda w: w[:rng.randint(2, len(w))])(rng.choice(TYPES + STYLES + models)),
+            "words + prefix": lambda: f"{rng.choice(TYPES)} {rng.choice(COLORS)[:3]}",
+            "typo": lambda: typo(rng.choice([w for w in TYPES + STYLES + COLORS if len(w) >= 5]), rng),
+        }
+        print(f"{'query':<16}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'hits':>7}")
+        worst = 0.0
+        for kind, make in kinds.items():
+            queries = [make() for _ in range(args.queries)]
+            for query in queries[:50]:
+                index.search(query, args.limit)
+            latencies = []
+            hits = 0
+            for query in queries:
+                start = time.perf_counter()
+                results = index.search(query, args.limit)
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += bool(results)
+            latencies.sort()
+            worst = max(worst, percentile(latencies, 0.99))
+            print(f"{kind:<16}{percentile(latencies, 0.5):>9.3f}{percentile(latencies, 0.99):>9.3f}"
+                  f"{latencies[-1]:>9.2f}{hits / len(queries):>7.0%}")
+        print(f"worst p99: {worst:.3f} ms ({'within' if worst < 2 else 'above'} the 2 ms target)")
+
+        changed = rng.sample(range(1, args.products + 1), args.updates)
+        for product_id in changed:
+            db.session.execute(update(Product).where(Product.id == product_id)
+                               .values(name=f"{rng.choice(TYPES)} {rng.choice(models)} novidade"))
+        bump_catalog_version()
+        db.session.commit()
+        start = time.perf_counter()
+        index.ensure_current()
+        elapsed = time.perf_counter() - start
+        assert set(changed) <= set(index.search("novidade", args.updates + 10))
+        first = time.perf_counter()
+        index.search("camiseta preta", args.limit)
+        print(f"incremental sync: {index.stats()['reindexed'] - args.products} products re-indexed in {elapsed * 1000:.0f} ms; "
+              f"first search after it {(time.perf_counter() - first) * 1000:.1f} ms (recomputes the touched terms it uses)")
+
+
+if __name__ == "__main__":
+    main()
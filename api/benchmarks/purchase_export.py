@@ -0,0 +1,80 @@
+"""
+Peak memory and time of the admin purchase listing (GET /purchase/) against the number of purchases:
+the JSON array built in memory (before) vs the streamed ndjson and csv exports of
+api/purchases/purchase/export.py (after).
+
+Peak memory of the exports should stay flat: they hold one chunk of purchases at a time and the
+response body is consumed as it is produced. Runs on SQLite; every purchase has --items items and
+one transaction.
+
+Usage (from the repository root):
+    JWT_SECRET_KEY=... python -m api.benchmarks.purchase_export [--purchases 2000 8000] [--items 3]
+"""
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+import uuid
+import warnings
+
+from flask import Flask
+
+from api.utils.db.connection import db
+from api.benchmarks.checkout import seed
+from api.benchmarks.order_history import seed_orders
+from api.purchases.purchase.export import PurchaseFilters, buffered, csv_rows, ndjson_rows
+from api.purchases.purchase.model import Purchase
+
+
+def json_listing():
+    """get_all_purchases before the export: every purchase serialized into one array"""
+    data = [p.serialize(include_items=True, include_transactions=True, include_address=True)
+            for p in Purchase.query.order_by(Purchase.created_at.desc()).all()]
+    return [json.dumps({"data": data})]
+
+
+def measure(body):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = sum(len(piece) for piece in body())
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.remove()
+    return elapsed, peak / 2**20, size / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--purchases", type=int, nargs="+", default=[2000, 8000])
+    parser.add_argument("--items", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.simplefilter("ignore")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:////tmp/purchase-export-{uuid.uuid4().hex}.db"
+    db.init_app(app)
+    with app.app_context():
+        seed()
+
+    modes = [
+        ("json", json_listing),
+        ("ndjson", lambda: buffered(ndjson_rows(PurchaseFilters()))),
+        ("csv", lambda: buffered(csv_rows(PurchaseFilters()))),
+    ]
+    print(f"{'purchases':>10}{'mode':>8}{'seconds':>9}{'body MiB':>10}{'peak MiB':>10}")
+    seeded = 0
+    for total in args.purchases:
+        with app.app_context():
+            seed_orders(1000 + total, total - seeded, args.items)
+        seeded = total
+        for name, body in modes:
+            with app.app_context():
+                elapsed, peak, size = measure(body)
+            print(f"{total:>10}{name:>8}{elapsed:>9.2f}{size:>10.1f}{peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
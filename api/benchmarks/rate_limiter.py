@@ -0,0 +1,70 @@
+"""
+Micro-benchmark of the rate limiter algorithms (sliding window vs GCRA).
+
+The storage is sized for every simulated client (--max-keys, twice the client count by default,
+since capacity is split across the lock shards), so the timings are of tracked clients and not
+of LRU eviction; the evictions column shows what the storage still had to drop.
+
+Usage (from the repository root):
+    JWT_SECRET_KEY=... python -m api.benchmarks.rate_limiter [--clients 10000 100000 1000000] [--requests-per-client 3] [--max-keys N]
+"""
+import argparse
+import gc
+import logging
+import time
+import tracemalloc
+
+from api.utils.security.DDOS.rate_limiter import RateLimiter, RateLimitAlgorithms
+from api.utils.security.DDOS.storage import MemoryStorage
+
+
+# tracemalloc deixa tudo várias vezes mais lento, então a memória é medida numa amostra
+MEMORY_SAMPLE_CLIENTS = 10_000
+
+
+def simulate(limiter: RateLimiter, clients: int, requests_per_client: int):
+    for _ in range(requests_per_client):
+        for i in range(clients):
+            limiter.evaluate_request(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", f"client-{i}", False, 50, 60)
+
+
+def run(algorithm: str, clients: int, requests_per_client: int, max_keys: int):
+    storage = MemoryStorage(max_keys=max_keys)
+    limiter = RateLimiter(storage, algorithm=algorithm)
+    gc.collect()
+    start = time.perf_counter()
+    simulate(limiter, clients, requests_per_client)
+    elapsed = time.perf_counter() - start
+    total = clients * requests_per_client
+    evictions = storage.stats()["evictions"]
+
+    sample = min(clients, MEMORY_SAMPLE_CLIENTS)
+    limiter = RateLimiter(MemoryStorage(max_keys=max_keys), algorithm=algorithm)
+    gc.collect()
+    tracemalloc.start()
+    simulate(limiter, sample, requests_per_client)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return total / elapsed, elapsed / total * 1e6, current / sample, evictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--requests-per-client", type=int, default=3)
+    parser.add_argument("--max-keys", type=int, help="MemoryStorage max_keys (default: twice the client count)")
+    args = parser.parse_args()
+
+    # O rate limiter loga em DEBUG por padrão; isso dominaria a medição
+    logging.disable(logging.WARNING)
+
+    print(f"{'algorithm':<16}{'clients':>10}{'req/s':>14}{'us/req':>10}{'bytes/client':>14}{'evictions':>11}")
+    for clients in args.clients:
+        for algorithm in (RateLimitAlgorithms.SLIDING_WINDOW, RateLimitAlgorithms.GCRA):
+            max_keys = args.max_keys or 2 * clients
+            throughput, latency, memory, evictions = run(algorithm, clients, args.requests_per_client, max_keys)
+            print(f"{algorithm:<16}{clients:>10}{throughput:>14,.0f}{latency:>10.2f}{memory:>14,.0f}{evictions:>11,}")
+
+
+if __name__ == "__main__":
+    main()
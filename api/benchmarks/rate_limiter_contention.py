@@ -0,0 +1,69 @@
+"""
+Threaded contention benchmark for the in-process rate limiter.
+
+Compares the previous request path (one global lock, separate is_ip_blocked / add_request /
+check_rate_limit calls) with the lock-striped storage and the single check_and_record call.
+
+Usage (from the repository root):
+    python -m api.benchmarks.rate_limiter_contention [--threads 1 4 8 16] [--requests 200000]
+"""
+import argparse
+import logging
+import threading
+import time
+
+from api.utils.security.DDOS.rate_limiter import RateLimiter
+from api.utils.security.DDOS.storage import MemoryStorage
+
+
+def legacy_request(limiter: RateLimiter, ip: str, client_id: str):
+    if limiter.is_ip_blocked(ip):
+        return
+    limiter.add_request(ip, client_id, 60)
+    limiter.calculate_trust_score(ip, client_id, False)
+    if limiter.check_rate_limit(ip, client_id, 1000, 60):
+        limiter.block_ip(ip, 300)
+
+
+def striped_request(limiter: RateLimiter, ip: str, client_id: str):
+    limiter.check_and_record(ip, client_id, False, 1000, 60, 300)
+
+
+def run(request_fn, limiter: RateLimiter, threads: int, total_requests: int) -> float:
+    per_thread = total_requests // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(offset: int):
+        barrier.wait()
+        for i in range(per_thread):
+            n = (offset * per_thread + i) % 50_000
+            request_fn(limiter, f"10.0.{n >> 8 & 255}.{n & 255}", f"client-{n}")
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=200_000)
+    args = parser.parse_args()
+
+    # O rate limiter loga em DEBUG por padrão; isso dominaria a medição
+    logging.disable(logging.WARNING)
+
+    print(f"{'threads':>8}{'global lock req/s':>20}{'striped req/s':>16}{'speedup':>10}")
+    for threads in args.threads:
+        legacy = run(legacy_request, RateLimiter(MemoryStorage(shards=1)), threads, args.requests)
+        striped = run(striped_request, RateLimiter(MemoryStorage(shards=16)), threads, args.requests)
+        print(f"{threads:>8}{legacy:>20,.0f}{striped:>16,.0f}{striped / legacy:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Throughput and peak memory of api/transaction/payment/reconciliation.py against a local Stripe
+stand-in, for growing numbers of PaymentIntents. Peak memory should stay flat: the reconciler holds
+one page of intents and one batch of corrections at a time.
+
+The stand-in serves GET /v1/payment_intents with cursor pagination; intents cycle through
+succeeded / canceled / declined / processing. Every local transaction starts as Pending, as after
+a webhook outage, so most intents produce a correction. Runs on SQLite.
+
+Usage (from the repository root):
+    JWT_SECRET_KEY=... python -m api.benchmarks.reconciliation [--intents 10000 50000] [--batch-size 500]
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+import tracemalloc
+import uuid
+import warnings
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from flask import Flask
+from sqlalchemy import insert
+
+from api.utils.db.connection import db
+from api.benchmarks.checkout import seed
+from api.payment_status.model import PaymentStatus
+from api.purchases.history.model import PurchaseHistory
+from api.transaction.payment.model import Transaction
+from api.transaction.payment.reconciliation import PaymentReconciler
+from api.utils.payments import stripe_gateway
+
+STATES = [("succeeded", None)] * 7 + [("canceled", None), ("requires_payment_method", {"code": "card_declined"}),
+                                      ("processing", None)]
+
+
+class FakeStripeList(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    total = 0
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        limit = int(query.get("limit", ["10"])[0])
+        start = int(query["starting_after"][0][3:]) + 1 if "starting_after" in query else 0
+        end = min(start + limit, FakeStripeList.total)
+        data = []
+        for i in range(start, end):
+            status, error = STATES[i % len(STATES)]
+            data.append({"id": f"pi_{i:010d}", "object": "payment_intent", "status": status,
+                         "last_payment_error": error, "metadata": {"purchase_id": f"purchase-{i}"}})
+        body = json.dumps({"object": "list", "data": data, "has_more": end < FakeStripeList.total,
+                           "url": "/v1/payment_intents"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+def seed_transactions(total):
+    db.session.query(PurchaseHistory).delete()
+    db.session.query(Transaction).delete()
+    for start in range(0, total, 10000):
+        db.session.execute(insert(Transaction), [{
+            "user_id": 1, "purchase_id": f"purchase-{i}", "method_id": 1, "amount": Decimal("99.90"),
+            "currency": "BRL", "currency_id": 1, "gateway_payment_id": f"pi_{i:010d}", "payment_status_id": 1,
+        } for i in range(start, min(start + 10000, total))])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--intents", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.simplefilter("ignore")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeStripeList)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stripe_gateway.api_base = f"http://127.0.0.1:{server.server_address[1]}"
+    stripe_gateway.api_key = "sk_test_bench"
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:////tmp/reconciliation-{uuid.uuid4().hex}.db"
+    db.init_app(app)
+    with app.app_context():
+        seed()
+        db.session.add_all([PaymentStatus(id=3, name="Paid"), PaymentStatus(id=4, name="failed")])
+        db.session.commit()
+
+    print(f"{'intents':>9}{'pages':>7}{'corrected':>11}{'seconds':>9}{'intents/s':>11}{'peak MiB':>10}")
+    for total in args.intents:
+        FakeStripeList.total = total
+        with app.app_context():
+            seed_transactions(total)
+        tracemalloc.start()
+        start = time.perf_counter()
+        with app.app_context():
+            stats = PaymentReconciler(batch_size=args.batch_size).run()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{total:>9}{stats['pages']:>7}{stats['corrected']:>11}{elapsed:>9.1f}{total / elapsed:>11.0f}{peak / 2**20:>10.1f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Stripe call latency with the library defaults (before) vs api/utils/payments/stripe_gateway.py (after),
+against a local fake Stripe server, while Stripe is healthy, slow and failing.
+
+- healthy: answers every call after --latency-ms
+- slow:    hangs for --hang-s on every call (past the gateway's read timeout)
+- failing: answers 500 to every call
+
+Before: stripe.max_network_retries=2 and the library's 80s read timeout. After: the gateway with a
+1s read timeout and a breaker that opens after 5 failures. Reports per-call p50/p99, how many
+requests reached the server and how many TCP connections were opened.
+
+Usage (from the repository root):
+    python -m api.benchmarks.stripe_gateway [--calls 50] [--latency-ms 20] [--hang-s 3]
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import stripe
+
+from api.utils.payments.stripe_gateway import CircuitBreaker, StripeGateway
+
+
+class FakeStripe(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    mode = "healthy"
+    latency = 0.02
+    hang = 3.0
+    requests = 0
+    connections = 0
+
+    def setup(self):
+        FakeStripe.connections += 1
+        super().setup()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        FakeStripe.requests += 1
+        if FakeStripe.mode == "slow":
+            time.sleep(FakeStripe.hang)
+        else:
+            time.sleep(FakeStripe.latency)
+        if FakeStripe.mode == "failing":
+            self._reply(500, {"error": {"message": "boom", "type": "api_error"}})
+        else:
+            pid = "pi_" + uuid.uuid4().hex[:12]
+            self._reply(200, {"id": pid, "object": "payment_intent", "client_secret": pid + "_secret"})
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except OSError:
+            pass  # o cliente desistiu por timeout
+
+    def log_message(self, *_):
+        pass
+
+
+def library_defaults(base):
+    stripe.default_http_client = None
+    stripe.max_network_retries = 2
+    stripe.api_base = base
+    return lambda i: stripe.PaymentIntent.create(amount=100, currency="brl", idempotency_key=f"bench-{i}")
+
+
+def gateway(base):
+    gw = StripeGateway(connect_timeout=1, read_timeout=1, max_retries=2, backoff_base=0.05, backoff_cap=0.2,
+                       breaker=CircuitBreaker(failure_threshold=5, recovery_timeout=60), api_base=base)
+    return lambda i: gw.create_payment_intent(amount=100, currency="brl", idempotency_key=f"bench-{i}")
+
+
+def run(create, calls):
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        try:
+            create(f"{uuid.uuid4().hex}-{i}")
+        except stripe.error.StripeError:
+            pass
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--hang-s", type=float, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    FakeStripe.latency = args.latency_ms / 1000
+    FakeStripe.hang = args.hang_s
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeStripe)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    stripe.api_key = "sk_test_bench"
+
+    print(f"{'scenario':>9}{'client':>10}{'p50 ms':>10}{'p99 ms':>10}{'requests':>10}{'conns':>7}")
+    for mode in ("healthy", "slow", "failing"):
+        # Stripe lenta com os padrões da biblioteca leva minutos; limita o número de chamadas
+        calls = args.calls if mode != "slow" else min(args.calls, 5)
+        for name, factory in (("before", library_defaults), ("after", gateway)):
+            FakeStripe.mode = mode
+            FakeStripe.requests = FakeStripe.connections = 0
+            p50, p99 = run(factory(base), calls)
+            print(f"{mode:>9}{name:>10}{p50:>10.1f}{p99:>10.1f}{FakeStripe.requests:>10}{FakeStripe.connections:>7}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,8 @@ from api.shippings.status.routes import blueprint as shipping_status_blueprint
 from api.shippings.conclusion.routes import blueprint as shipping_conclusion_blueprint
 from api.stripe_webhook import stripe_webhook_bp
 from api.favorites.routes import favorites_bp as favorites_blueprint
+from api.utils.security.DDOS.routes import blueprint as ddos_blueprint
+from api.admin.routes import blueprint as admin_blueprint
 
 def register_blueprints(app):
     app.register_blueprint(address_blueprint, url_prefix='/address')
@@ -41,4 +43,6 @@ def register_blueprints(app):
     app.register_blueprint(shipping_status_blueprint, url_prefix='/shipping-status')
     app.register_blueprint(shipping_conclusion_blueprint, url_prefix='/shipping-conclusion')
     app.register_blueprint(stripe_webhook_bp, url_prefix='/webhooks/stripe')
-    app.register_blueprint(favorites_blueprint, url_prefix='/favorites')
\ No newline at end of file
+    app.register_blueprint(favorites_blueprint, url_prefix='/favorites')
+    app.register_blueprint(ddos_blueprint, url_prefix='/admin/ddos')
+    app.register_blueprint(admin_blueprint, url_prefix='/admin')
\ No newline at end of file
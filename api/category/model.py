@@ -1,4 +1,5 @@
 from api.utils.db.connection import db  # Add this import
+from api.utils.catalog_cache import bump_catalog_version
 from datetime import datetime
 import pytz
 from typing import Dict, Optional
@@ -35,6 +36,7 @@ def create_category(category_data: Dict) -> Optional[Category]:
             gender_id=category_data["gender_id"]
         )
         db.session.add(new_category)
+        bump_catalog_version()
         db.session.commit()
         
         current_app.logger.info(f"Category created successfully: {new_category.name}")
@@ -56,6 +58,7 @@ def update_category(category_id: int, category_data: Dict) -> Optional[Category]
             category.name = category_data["name"]
         if "gender_id" in category_data:
             category.gender_id = category_data["gender_id"]
+        bump_catalog_version()
         db.session.commit()
         return category
     return None
@@ -65,6 +68,7 @@ def delete_category(category_id: int) -> Optional[Category]:
     category = get_category(category_id)
     if category:
         db.session.delete(category)
+        bump_catalog_version()
         db.session.commit()
         return category
     return None
\ No newline at end of file
@@ -1,6 +1,7 @@
 from flask import request, jsonify, Blueprint
 from api.category.model import Category, create_category, get_category, update_category, delete_category
 from api.utils.security.jwt.decorators import token_required
+from api.utils.catalog_cache import catalog_cache
 
 blueprint = Blueprint('category', __name__)
 
@@ -24,24 +25,27 @@ def create(current_user_id):
         "message": "Category created successfully."
     }), 201
 
+def _load_category(id):
+    category = get_category(id)
+    return category.serialize() if category else None
+
 # Read
 @blueprint.route("/read/<int:id>", methods=["GET"])
 @token_required
 def read(current_user_id, id):
-    category = get_category(id)
-    if category is None:
+    category_data = catalog_cache.get_or_load(f"category:{id}", lambda: _load_category(id))
+    if category_data is None:
         return jsonify({"error": "Category not found"}), 404
 
     return jsonify({
-        "data": category.serialize(),
+        "data": category_data,
         "message": "Category retrieved successfully."
     }), 200
 
 @blueprint.route("/read/all", methods=["GET"])
 @token_required
 def read_all(current_user_id):
-    categories = Category.query.all()
-    categories_data = [category.serialize() for category in categories]
+    categories_data = catalog_cache.get_or_load("categories:all", lambda: [category.serialize() for category in Category.query.all()])
 
     return jsonify({
         "data": categories_data,
@@ -6,6 +6,7 @@ from flask import current_app
 from sqlalchemy import UniqueConstraint, Index
 from sqlalchemy.orm import joinedload
 from api.product.model import Product
+from api.product import catalog
 
 class Favorite(db.Model):
     __tablename__ = "favorites"
@@ -78,7 +79,7 @@ def remove_favorite(user_id: int, product_id: int) -> bool:
 def get_user_favorites(user_id: int) -> List[Favorite]:
     """Retrieves all favorite records for a given user, pre-loading product data."""
     return Favorite.query.filter_by(user_id=user_id).options(
-        joinedload(Favorite.product_rel)
+        joinedload(Favorite.product_rel).options(*catalog.eager_options())
     ).all()
 
 def is_favorite(user_id: int, product_id: int) -> bool:
@@ -1,4 +1,5 @@
 from api.utils.db.connection import db  # Add this import
+from api.utils.catalog_cache import bump_catalog_version
 from datetime import datetime
 import pytz
 from typing import Dict, Optional
@@ -36,6 +37,7 @@ def create_gender(gender_data: Dict) -> Optional[Gender]:
             long_name=gender_data["long_name"]
         )
         db.session.add(new_gender)
+        bump_catalog_version()
         db.session.commit()
         
         current_app.logger.info(f"Gender created successfully: {new_gender.name}")
@@ -57,6 +59,7 @@ def update_gender(gender_id: int, gender_data: Dict) -> Optional[Gender]:
             gender.name = gender_data["name"]
         if "long_name" in gender_data:
             gender.long_name = gender_data["long_name"]
+        bump_catalog_version()
         db.session.commit()
         return gender
     return None
@@ -66,6 +69,7 @@ def delete_gender(gender_id: int) -> Optional[Gender]:
     gender = get_gender(gender_id)
     if gender:
         db.session.delete(gender)
+        bump_catalog_version()
         db.session.commit()
         return gender
     return None
@@ -1,6 +1,7 @@
 from flask import request, jsonify, Blueprint
 from api.gender.model import Gender, create_gender, get_gender, update_gender, delete_gender
 from api.utils.security.jwt.decorators import token_required
+from api.utils.catalog_cache import catalog_cache
 
 blueprint = Blueprint('gender', __name__)
 
@@ -23,24 +24,27 @@ def create(current_user_id):
         "message": "Gender created successfully."
     }), 201
 
+def _load_gender(id):
+    gender = get_gender(id)
+    return gender.serialize() if gender else None
+
 # Read
 @blueprint.route("/read/<int:id>", methods=["GET"])
 @token_required
 def read(current_user_id, id):
-    gender = get_gender(id)
-    if gender is None:
+    gender_data = catalog_cache.get_or_load(f"gender:{id}", lambda: _load_gender(id))
+    if gender_data is None:
         return jsonify({"error": "Gender not found"}), 404
 
     return jsonify({
-        "data": gender.serialize(),
+        "data": gender_data,
         "message": "Gender retrieved successfully."
     }), 200
 
 @blueprint.route("/read/all", methods=["GET"])
 @token_required
 def read_all(current_user_id):
-    genders = Gender.query.all()
-    genders_data = [gender.serialize() for gender in genders]
+    genders_data = catalog_cache.get_or_load("genders:all", lambda: [gender.serialize() for gender in Gender.query.all()])
 
     return jsonify({
         "data": genders_data,
@@ -1,4 +1,5 @@
 from api.utils.db.connection import db  # Add this import
+from api.utils.catalog_cache import bump_catalog_version
 from datetime import datetime
 import pytz
 from typing import Dict, Optional
@@ -33,6 +34,7 @@ def create_image_category(image_category_data: Dict) -> Optional[ImageCategory]:
             url=image_category_data["url"]
         )
         db.session.add(new_image_category)
+        bump_catalog_version()
         db.session.commit()
         
         current_app.logger.info(f"Image category created successfully: {new_image_category.name}")
@@ -54,6 +56,7 @@ def update_image_category(image_category_id: int, image_category_data: Dict) ->
             image_category.name = image_category_data["name"]
         if "url" in image_category_data:
             image_category.url = image_category_data["url"]
+        bump_catalog_version()
         db.session.commit()
         return image_category
     return None
@@ -63,6 +66,7 @@ def delete_image_category(image_category_id: int) -> Optional[ImageCategory]:
     image_category = get_image_category(image_category_id)
     if image_category:
         db.session.delete(image_category)
+        bump_catalog_version()
         db.session.commit()
         return image_category
     return None
\ No newline at end of file
@@ -1,6 +1,7 @@
 from flask import request, jsonify, Blueprint
 from api.image_category.model import ImageCategory, create_image_category, get_image_category, update_image_category, delete_image_category
 from api.utils.security.jwt.decorators import token_required
+from api.utils.catalog_cache import catalog_cache
 
 blueprint = Blueprint('image_category', __name__)
 
@@ -23,24 +24,27 @@ def create(current_user_id):
         "message": "Image category created successfully."
     }), 201
 
+def _load_image_category(id):
+    image_category = get_image_category(id)
+    return image_category.serialize() if image_category else None
+
 # Read
 @blueprint.route("/read/<int:id>", methods=["GET"])
 @token_required
 def read(current_user_id, id):
-    image_category = get_image_category(id)
-    if image_category is None:
+    image_category_data = catalog_cache.get_or_load(f"image_category:{id}", lambda: _load_image_category(id))
+    if image_category_data is None:
         return jsonify({"error": "Image category not found"}), 404
 
     return jsonify({
-        "data": image_category.serialize(),
+        "data": image_category_data,
         "message": "Image category retrieved successfully."
     }), 200
 
 @blueprint.route("/read/all", methods=["GET"])
 @token_required
 def read_all(current_user_id):
-    image_categories = ImageCategory.query.all()
-    image_categories_data = [image_category.serialize() for image_category in image_categories]
+    image_categories_data = catalog_cache.get_or_load("image_categories:all", lambda: [image_category.serialize() for image_category in ImageCategory.query.all()])
 
     return jsonify({
         "data": image_categories_data,
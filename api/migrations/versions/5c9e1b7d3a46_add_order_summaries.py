@@ -0,0 +1,58 @@
+"""add order_summaries
+
+Revision ID: 5c9e1b7d3a46
+Revises: 8b6d2e4a1c73
+Create Date: 2026-10-18 19:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c9e1b7d3a46'
+down_revision = '8b6d2e4a1c73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Preencher depois com: python -m api.purchases.summary.projection
+    op.create_table('order_summaries',
+    sa.Column('purchase_id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('currency_id', sa.Integer(), nullable=False),
+    sa.Column('currency_code', sa.String(length=3), nullable=True),
+    sa.Column('subtotal', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('shipping_cost', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('taxes', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('item_count', sa.Integer(), nullable=False),
+    sa.Column('line_items', sa.Text(), nullable=False),
+    sa.Column('payment_status_id', sa.Integer(), nullable=True),
+    sa.Column('payment_status', sa.String(length=50), nullable=True),
+    sa.Column('gateway_payment_id', sa.String(length=255), nullable=True),
+    sa.Column('shipping_status_id', sa.Integer(), nullable=True),
+    sa.Column('shipping_status', sa.String(length=256), nullable=True),
+    sa.Column('shipping_conclusion', sa.String(length=50), nullable=True),
+    sa.Column('tracking_number', sa.String(length=100), nullable=True),
+    sa.Column('estimated_delivery_date', sa.Date(), nullable=True),
+    sa.Column('shipping_address', sa.Text(), nullable=True),
+    sa.Column('purchase_created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['purchase_id'], ['purchases.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('purchase_id')
+    )
+    with op.batch_alter_table('order_summaries', schema=None) as batch_op:
+        batch_op.create_index('ix_order_summaries_created_at', ['purchase_created_at', 'purchase_id'], unique=False)
+        batch_op.create_index('ix_order_summaries_payment_status_created_at', ['payment_status_id', 'purchase_created_at'], unique=False)
+        batch_op.create_index('ix_order_summaries_user_id_created_at', ['user_id', 'purchase_created_at', 'purchase_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('order_summaries', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_summaries_user_id_created_at')
+        batch_op.drop_index('ix_order_summaries_payment_status_created_at')
+        batch_op.drop_index('ix_order_summaries_created_at')
+
+    op.drop_table('order_summaries')
@@ -0,0 +1,50 @@
+"""add payment_intent_outbox
+
+Revision ID: 7b3f2d91c4e6
+Revises: 5e1a7c3d9b20
+Create Date: 2026-10-18 14:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3f2d91c4e6'
+down_revision = '5e1a7c3d9b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('payment_intent_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('purchase_id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('payment_intent_id', sa.String(length=255), nullable=True),
+    sa.Column('client_secret', sa.String(length=255), nullable=True),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['purchase_id'], ['purchases.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('purchase_id')
+    )
+    with op.batch_alter_table('payment_intent_outbox', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_payment_intent_outbox_next_attempt_at'), ['next_attempt_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_payment_intent_outbox_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payment_intent_outbox', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_payment_intent_outbox_status'))
+        batch_op.drop_index(batch_op.f('ix_payment_intent_outbox_next_attempt_at'))
+
+    op.drop_table('payment_intent_outbox')
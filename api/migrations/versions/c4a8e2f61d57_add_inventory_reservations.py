@@ -0,0 +1,52 @@
+"""add inventory_reservations and inventory_stripes
+
+Revision ID: c4a8e2f61d57
+Revises: 9d4e6a2b8c13
+Create Date: 2026-10-18 16:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a8e2f61d57'
+down_revision = '9d4e6a2b8c13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('inventory_stripes',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('stripe', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('inventory', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'stripe')
+    )
+    op.create_table('inventory_reservations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('purchase_id', sa.String(length=36), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('stripe', sa.Integer(), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('released_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.ForeignKeyConstraint(['purchase_id'], ['purchases.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('inventory_reservations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_inventory_reservations_purchase_id'), ['purchase_id'], unique=False)
+        batch_op.create_index('ix_inventory_reservations_status_expires_at', ['status', 'expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('inventory_reservations', schema=None) as batch_op:
+        batch_op.drop_index('ix_inventory_reservations_status_expires_at')
+        batch_op.drop_index(batch_op.f('ix_inventory_reservations_purchase_id'))
+
+    op.drop_table('inventory_reservations')
+    op.drop_table('inventory_stripes')
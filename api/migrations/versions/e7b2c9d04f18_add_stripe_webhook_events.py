@@ -0,0 +1,44 @@
+"""add stripe_webhook_events
+
+Revision ID: e7b2c9d04f18
+Revises: c4a8e2f61d57
+Create Date: 2026-10-18 17:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b2c9d04f18'
+down_revision = 'c4a8e2f61d57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stripe_webhook_events',
+    sa.Column('id', sa.String(length=255), nullable=False),
+    sa.Column('type', sa.String(length=100), nullable=False),
+    sa.Column('payload', sa.Text(length=16777215), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('claim_token', sa.String(length=32), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stripe_webhook_events', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stripe_webhook_events_claim_token'), ['claim_token'], unique=False)
+        batch_op.create_index('ix_stripe_webhook_events_status_next_attempt_at', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('stripe_webhook_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_stripe_webhook_events_status_next_attempt_at')
+        batch_op.drop_index(batch_op.f('ix_stripe_webhook_events_claim_token'))
+
+    op.drop_table('stripe_webhook_events')
@@ -0,0 +1,35 @@
+"""rename inventory_stripes to inventory_shards
+
+Revision ID: f3a6d8b21c49
+Revises: d41b7e9a2c63
+Create Date: 2026-10-19 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a6d8b21c49'
+down_revision = 'd41b7e9a2c63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # "stripe" já é o gateway de pagamento: os sub-contadores de estoque passam a se chamar shards
+    op.rename_table('inventory_stripes', 'inventory_shards')
+    with op.batch_alter_table('inventory_shards', schema=None) as batch_op:
+        batch_op.alter_column('stripe', new_column_name='shard', existing_type=sa.Integer(),
+                              existing_nullable=False, autoincrement=False)
+    with op.batch_alter_table('inventory_reservations', schema=None) as batch_op:
+        batch_op.alter_column('stripe', new_column_name='shard', existing_type=sa.Integer(), existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('inventory_reservations', schema=None) as batch_op:
+        batch_op.alter_column('shard', new_column_name='stripe', existing_type=sa.Integer(), existing_nullable=True)
+    with op.batch_alter_table('inventory_shards', schema=None) as batch_op:
+        batch_op.alter_column('shard', new_column_name='stripe', existing_type=sa.Integer(),
+                              existing_nullable=False, autoincrement=False)
+    op.rename_table('inventory_shards', 'inventory_stripes')
@@ -0,0 +1,130 @@
+from api.utils.db.connection import db
+from api.utils.pagination import keyset_condition
+from api.product.model import Product
+from api.purchases.reservation.model import InventoryShard
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy.orm import joinedload, selectinload
+from typing import Dict, List, Optional, Tuple
+
+# sort -> (colunas da chave, decrescente?); cada uma tem um índice composto (ver a migração dos índices do catálogo)
+SORTS: Dict[str, Tuple[tuple, bool]] = {
+    "newest": ((Product.created_at, Product.id), True),
+    "price_asc": ((Product.price, Product.id), False),
+    "price_desc": ((Product.price, Product.id), True),
+    "name": ((Product.name, Product.id), False),
+}
+DEFAULT_SORT = "newest"
+
+
+def _parse_int(args, key: str) -> Optional[int]:
+    return int(args[key]) if args.get(key) not in (None, "") else None
+
+
+def _parse_price(args, key: str) -> Optional[Decimal]:
+    if args.get(key) in (None, ""):
+        return None
+    try:
+        value = Decimal(args[key])
+    except InvalidOperation:
+        raise ValueError(f"Invalid {key}")
+    if not value.is_finite():
+        raise ValueError(f"Invalid {key}")
+    return value
+
+
+class ProductFilters:
+    """Server-side filters of the catalog listing, parsed from the query string"""
+
+    def __init__(self, category_id: Optional[int] = None, gender_id: Optional[int] = None,
+                 size_id: Optional[int] = None, min_price: Optional[Decimal] = None,
+                 max_price: Optional[Decimal] = None, in_stock: bool = False):
+        self.category_id = category_id
+        self.gender_id = gender_id
+        self.size_id = size_id
+        self.min_price = min_price
+        self.max_price = max_price
+        self.in_stock = in_stock
+
+    @classmethod
+    def from_args(cls, args) -> 'ProductFilters':
+        """category_id, gender_id, size_id, min_price, max_price, in_stock=true; raises ValueError on a malformed value"""
+        return cls(
+            category_id=_parse_int(args, 'category_id'),
+            gender_id=_parse_int(args, 'gender_id'),
+            size_id=_parse_int(args, 'size_id'),
+            min_price=_parse_price(args, 'min_price'),
+            max_price=_parse_price(args, 'max_price'),
+            in_stock=str(args.get('in_stock', 'false')).lower() == 'true',
+        )
+
+    @property
+    def active(self) -> bool:
+        return any(value is not None for value in (self.category_id, self.gender_id, self.size_id,
+                                                   self.min_price, self.max_price)) or self.in_stock
+
+    def apply(self, query):
+        if self.category_id is not None:
+            query = query.filter(Product.category_id == self.category_id)
+        if self.gender_id is not None:
+            query = query.filter(Product.gender_id == self.gender_id)
+        if self.size_id is not None:
+            query = query.filter(Product.size_id == self.size_id)
+        if self.min_price is not None:
+            query = query.filter(Product.price >= self.min_price)
+        if self.max_price is not None:
+            query = query.filter(Product.price <= self.max_price)
+        if self.in_stock:
+            # O estoque de produtos disputados pode estar todo nas faixas (inventory_shards)
+            query = query.filter(db.or_(
+                Product.inventory > 0,
+                Product.inventory_shards.any(InventoryShard.inventory > 0),
+            ))
+        return query
+
+
+def eager_options() -> List:
+    """Loader options for Product.serialize: currency and category in the same query, inventory shards in one more"""
+    return [joinedload(Product.currency_rel), joinedload(Product.category_rel), selectinload(Product.inventory_shards)]
+
+
+def encode_sort_key(product: Product, sort: str) -> List:
+    """Cursor values for the last product of a page; prices go as strings to keep them exact"""
+    columns, _ = SORTS[sort]
+    values = [getattr(product, column.key) for column in columns]
+    return [str(value) if isinstance(value, Decimal) else value for value in values]
+
+
+def decode_sort_key(values: List, sort: str) -> tuple:
+    """Inverse of encode_sort_key for values from decode_cursor; raises ValueError when they do not fit the sort"""
+    columns, _ = SORTS[sort]
+    decoded = []
+    try:
+        for column, value in zip(columns, values):
+            if column.key == "created_at":
+                decoded.append(datetime.fromisoformat(value))
+            elif column.key == "price":
+                decoded.append(Decimal(value))
+            elif column.key == "id":
+                decoded.append(int(value))
+            else:
+                decoded.append(str(value))
+    except (TypeError, InvalidOperation):
+        raise ValueError("Invalid cursor")
+    return tuple(decoded)
+
+
+def product_page(filters: ProductFilters, sort: str, limit: int,
+                 after: Optional[tuple] = None) -> Tuple[List[Product], bool]:
+    """
+    One page of the catalog in sort order, keyset-paginated on the sort key plus id.
+    Costs one query (with currency and category joined) plus the selectin query of the
+    inventory shards, whatever the page size. Returns (products, has_more).
+    """
+    columns, descending = SORTS[sort]
+    query = filters.apply(Product.query)
+    if after is not None:
+        query = query.filter(keyset_condition(columns, after, descending=descending))
+    order = [column.desc() if descending else column.asc() for column in columns]
+    products = query.options(*eager_options()).order_by(*order).limit(limit + 1).all()
+    return products[:limit], len(products) > limit
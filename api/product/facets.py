@@ -0,0 +1,205 @@
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+from api.utils.db.connection import db
+from api.category.model import Category
+from api.gender.model import Gender
+from api.product.model import Product
+from api.size.model import Size
+from api.utils.catalog_cache import catalog_cache
+
+logger = logging.getLogger(__name__)
+
+# Limites das faixas de preço: "0,50,100" -> 0-50, 50-100, 100+
+PRICE_BOUNDS = tuple(Decimal(bound) for bound in os.getenv("CATALOG_FACET_PRICE_BUCKETS", "0,50,100,200,500").split(","))
+FACETS = ("category", "gender", "size", "price")
+FACET_COLUMNS = (Product.id, Product.category_id, Product.gender_id, Product.size_id, Product.price)
+
+
+def _bucket_key(lower: Decimal, upper: Optional[Decimal]) -> str:
+    return f"{lower:f}-{upper:f}" if upper is not None else f"{lower:f}+"
+
+
+PRICE_BUCKETS: Tuple[Tuple[str, Decimal, Optional[Decimal]], ...] = tuple(
+    (_bucket_key(lower, upper), lower, upper)
+    for lower, upper in zip(PRICE_BOUNDS, PRICE_BOUNDS[1:] + (None,))
+)
+
+
+def price_bucket(price: Decimal) -> Optional[str]:
+    """Key of the bucket holding price (lower bound inclusive), or None below the first bound"""
+    found = None
+    for key, lower, _ in PRICE_BUCKETS:
+        if price < lower:
+            break
+        found = key
+    return found
+
+
+def parse_selection(args) -> Dict[str, List]:
+    """
+    category, gender and size (ids) and price (bucket keys) from the query string, each one value
+    or several comma-separated (any of them matches); raises ValueError on a malformed value
+    """
+    selection = {}
+    names = [key for key, _, _ in PRICE_BUCKETS]
+    for facet in FACETS:
+        raw = args.get(facet)
+        if raw in (None, ""):
+            continue
+        values = [value.strip() for value in raw.split(",") if value.strip()]
+        if facet == "price":
+            unknown = [value for value in values if value not in names]
+            if unknown:
+                raise ValueError(f"Invalid price bucket: {unknown[0]}. Use one of: {', '.join(names)}")
+        else:
+            try:
+                values = [int(value) for value in values]
+            except ValueError:
+                raise ValueError(f"Invalid {facet}: must be an integer or a comma-separated list of integers")
+        selection[facet] = values
+    return selection
+
+
+class FacetSnapshot:
+    """
+    Facet bitsets of one catalog version. Products are numbered 0..n-1 in id order, and every
+    facet value holds an int whose bit i is set when product i has that value, so a filter is
+    an AND/OR of ints and a count is int.bit_count().
+    """
+
+    def __init__(self, version: Optional[int], bits: Dict[str, Dict], names: Dict[str, Dict], products: int,
+                 build_seconds: float):
+        self.version = version
+        self.bits = bits
+        self.names = names
+        self.products = products
+        self.all = (1 << products) - 1
+        self.build_seconds = build_seconds
+        self.built_at = time.time()
+
+    def _matching(self, selection: Dict[str, List], skip: Optional[str] = None) -> int:
+        matching = self.all
+        for facet, values in selection.items():
+            if facet == skip:
+                continue
+            chosen = 0
+            for value in values:
+                chosen |= self.bits[facet].get(value, 0)
+            matching &= chosen
+        return matching
+
+    def counts(self, selection: Dict[str, List]) -> Dict:
+        """
+        Matching product count plus, per facet, the count of every value. Each facet is counted
+        under the other facets' filters only, so the alternatives to a chosen value keep their
+        counts (a shopper in "Tees" still sees how many "Hoodies" there are).
+        """
+        facets = {}
+        for facet in FACETS:
+            matching = self._matching(selection, skip=facet)
+            chosen = selection.get(facet, ())
+            facets[facet] = [
+                {**self._describe(facet, value), "count": (matching & bits).bit_count(), "selected": value in chosen}
+                for value, bits in self.bits[facet].items()
+            ]
+        return {"total": self._matching(selection).bit_count(), "facets": facets}
+
+    def _describe(self, facet: str, value) -> Dict:
+        if facet == "price":
+            _, lower, upper = self.names["price"][value]
+            return {"key": value, "min": float(lower), "max": float(upper) if upper is not None else None}
+        return {"id": value, "name": self.names[facet].get(value)}
+
+
+def _to_int(buffer: Optional[bytearray]) -> int:
+    return int.from_bytes(buffer, "little") if buffer is not None else 0
+
+
+def build_facets(version: Optional[int] = None) -> FacetSnapshot:
+    """Reads (id, category, gender, size, price) of every product once and sets the bits of each facet value"""
+    start = time.perf_counter()
+    names = {
+        "category": {row.id: row.name for row in db.session.query(Category.id, Category.name)},
+        "gender": {row.id: row.long_name for row in db.session.query(Gender.id, Gender.long_name)},
+        "size": {row.id: row.name for row in db.session.query(Size.id, Size.name)},
+        "price": {key: (key, lower, upper) for key, lower, upper in PRICE_BUCKETS},
+    }
+    # Um bytearray por valor (setar bits num int recriaria o int a cada produto)
+    buffers: Dict[str, Dict] = {facet: {} for facet in FACETS}
+    rows = db.session.query(*FACET_COLUMNS).order_by(Product.id).all()
+    size = len(rows) // 8 + 1
+    for position, row in enumerate(rows):
+        byte, bit = position >> 3, 1 << (position & 7)
+        for facet, value in (("category", row.category_id), ("gender", row.gender_id),
+                             ("size", row.size_id), ("price", price_bucket(row.price))):
+            if value is None:
+                continue
+            buffer = buffers[facet].get(value)
+            if buffer is None:
+                buffer = buffers[facet][value] = bytearray(size)
+            buffer[byte] |= bit
+    # Valores sem produto também aparecem, com contagem zero; faixas de preço na ordem dos limites
+    bits = {facet: {value: _to_int(buffers[facet].get(value)) for value in sorted(set(names[facet]) | set(buffers[facet]))}
+            for facet in ("category", "gender", "size")}
+    bits["price"] = {key: _to_int(buffers["price"].get(key)) for key, _, _ in PRICE_BUCKETS}
+    elapsed = time.perf_counter() - start
+    logger.info(f"Catalog facets of version {version} built: {len(rows)} products in {elapsed * 1000:.0f} ms")
+    return FacetSnapshot(version, bits, names, len(rows), elapsed)
+
+
+class CatalogFacets:
+    """
+    Per-worker holder of the current FacetSnapshot, rebuilt when the catalog version changes
+    (checked through catalog_cache, so at most once per version check interval). Facets only
+    read category, gender, size and price, which are all behind the catalog version, so there is
+    no ttl. One thread builds while the others wait for it; if the version cannot be read, every
+    request builds its own snapshot.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._current: Optional[FacetSnapshot] = None
+        self.builds = 0
+        self.requests = 0
+
+    def get(self) -> FacetSnapshot:
+        if self._pid != os.getpid():
+            self._reset()
+        self.requests += 1
+        version = catalog_cache.version()
+        if version is None:
+            return build_facets()
+        if self._current is None or self._current.version != version:
+            with self._lock:
+                if self._current is None or self._current.version != version:
+                    self._current = build_facets(version)
+                    self.builds += 1
+        return self._current
+
+    def counts(self, selection: Dict[str, List]) -> Dict:
+        return self.get().counts(selection)
+
+    def stats(self) -> Dict:
+        snapshot = self._current
+        return {
+            "version": snapshot.version if snapshot else None,
+            "age": round(time.time() - snapshot.built_at, 3) if snapshot else None,
+            "products": snapshot.products if snapshot else 0,
+            "values": {facet: len(snapshot.bits[facet]) for facet in FACETS} if snapshot else None,
+            "builds": self.builds,
+            "last_build_ms": round(snapshot.build_seconds * 1000, 1) if snapshot else None,
+            "requests": self.requests,
+            "price_buckets": [key for key, _, _ in PRICE_BUCKETS],
+        }
+
+
+catalog_facets = CatalogFacets()
@@ -1,4 +1,5 @@
 from api.utils.db.connection import db  # Add this import
+from api.utils.catalog_cache import bump_catalog_version
 from datetime import datetime
 import pytz
 from typing import Dict, Optional
@@ -22,6 +23,19 @@ class Product(db.Model):
     currency_rel = db.relationship('Currency', back_populates='products')
     favorited_by = db.relationship('Favorite', back_populates='product_rel', lazy='dynamic', cascade="all, delete-orphan")
     category_rel = db.relationship('Category', back_populates='products')
+    # Sub-contadores de estoque de produtos muito disputados (ver api/purchases/reservation); carga preguiçosa,
+    # as listagens os trazem com catalog.eager_options()
+    inventory_shards = db.relationship('InventoryShard', back_populates='product_rel', cascade="all, delete-orphan")
+
+    # Ordenações e filtros da listagem paginada do catálogo (api/product/catalog.py)
+    __table_args__ = (
+        db.Index('ix_products_created_at_id', 'created_at', 'id'),
+        db.Index('ix_products_price_id', 'price', 'id'),
+        db.Index('ix_products_name_id', 'name', 'id'),
+        db.Index('ix_products_category_id_created_at_id', 'category_id', 'created_at', 'id'),
+        db.Index('ix_products_category_id_price_id', 'category_id', 'price', 'id'),
+        db.Index('ix_products_gender_id_created_at_id', 'gender_id', 'created_at', 'id'),
+    )
 
     def __repr__(self):
         return f"<Product {self.id}, Name: {self.name}, Price: {self.price} (Currency ID: {self.currency_id})>"
@@ -36,7 +50,7 @@ class Product(db.Model):
             "size_id": self.size_id,
             "description": self.description,
             "image_category_id": self.image_category_id,
-            "inventory": self.inventory,
+            "inventory": self.inventory + sum(shard.inventory for shard in self.inventory_shards),
             "category_id": self.category_id,
             "category_name": self.category_rel.name if self.category_rel else None,
             "gender_id": self.gender_id,
@@ -63,6 +77,7 @@ def create_product(product_data: Dict) -> Optional[Product]:
             image_category_id=product_data.get("image_category_id")
         )
         db.session.add(product)
+        bump_catalog_version()
         db.session.commit()
         current_app.logger.info(f"Product created successfully: {product.name}")
         return product
@@ -89,6 +104,7 @@ def update_product(product_id: int, product_data: Dict) -> Optional[Product]:
                     updated = True
 
         if updated:
+            bump_catalog_version()
             db.session.commit()
         return product
     return None
@@ -98,6 +114,7 @@ def delete_product(product_id: int) -> Optional[Product]:
     product = get_product(product_id)
     if product:
         db.session.delete(product)
+        bump_catalog_version()
         db.session.commit()
         return product
     return None
\ No newline at end of file
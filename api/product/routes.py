@@ -1,12 +1,22 @@
 from flask import request, jsonify, Blueprint, current_app
 from api.product.model import Product, create_product, get_product, update_product, delete_product
 from api.currency.model import Currency
-from api.utils.security.jwt.decorators import token_required
+from api.utils.security.jwt.decorators import token_required, admin_required
+from api.purchases.reservation import engine as inventory
 from api.size.model import Size
+from api.product import catalog # Listagem paginada e filtrada do catálogo
+from api.utils.pagination import decode_cursor, encode_cursor, parse_limit
+from api.utils.catalog_cache import catalog_cache
+from api.product.snapshot import catalog_snapshots # JSON do catálogo pré-renderizado por versão
+from api.product.search import SearchIndexNotReady, product_search, tokenize # Índice invertido em memória (BM25, prefixo, erros de digitação)
+from api.product.facets import catalog_facets, parse_selection # Contagens por categoria/gênero/tamanho/preço em bitsets
+from urllib.parse import urlencode
 import traceback
 
 blueprint = Blueprint('product', __name__, url_prefix='/products')
 
+SEARCH_MAX_LENGTH = 100
+
 # Create
 @blueprint.route("/create", methods=["POST"])
 @token_required
@@ -49,13 +59,10 @@ def create(current_user_id):
         "message": "Product created successfully."
     }), 201
 
-# Read
-@blueprint.route("/read/<int:id>", methods=["GET"])
-@token_required
-def read(current_user_id, id):
+def _load_product(id):
     product = get_product(id)
     if product is None:
-        return jsonify({"error": "Product not found"}), 404
+        return None
 
     # Serialize product and include related sizes
     product_data = product.serialize()
@@ -66,6 +73,16 @@ def read(current_user_id, id):
     # Query sizes from database
     sizes = Size.query.filter(Size.id.in_(size_ids)).all()
     product_data['sizes'] = [size.serialize() for size in sizes]
+    return product_data
+
+# Read
+@blueprint.route("/read/<int:id>", methods=["GET"])
+@token_required
+def read(current_user_id, id):
+    product_data = catalog_cache.get_or_load(f"product:{id}", lambda: _load_product(id))
+    if product_data is None:
+        return jsonify({"error": "Product not found"}), 404
+
     return jsonify({
         "data": product_data,
         "message": "Product retrieved successfully."
@@ -74,14 +91,109 @@ def read(current_user_id, id):
 @blueprint.route("/read/all", methods=["GET"])
 @token_required
 def read_all(current_user_id):
-    products = Product.query.all()
-    products_data = [product.serialize() for product in products]
+    """
+    Catalog listing. With limit, cursor, sort or any filter (category_id, gender_id, size_id,
+    min_price, max_price, in_stock) it returns one keyset-paginated page plus a pagination block;
+    without them, the whole catalog as before, served from the prebuilt catalog snapshot (ETag,
+    If-None-Match and gzip/br). Pages are kept in the catalog cache until the catalog version changes.
+    """
+    paginated = any(request.args.get(key) for key in ('limit', 'cursor', 'sort'))
+    try:
+        filters = catalog.ProductFilters.from_args(request.args)
+        sort = request.args.get('sort') or catalog.DEFAULT_SORT
+        if sort not in catalog.SORTS:
+            raise ValueError(f"Invalid sort. Use one of: {', '.join(catalog.SORTS)}")
+        limit = parse_limit(request.args.get('limit'))
+        after = None
+        if request.args.get('cursor'):
+            after = catalog.decode_sort_key(decode_cursor(request.args['cursor'], 2), sort)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e) or "Invalid query parameters"}), 400
+
+    if not paginated and not filters.active:
+        return catalog_snapshots.respond(catalog_snapshots.get("all"))
+
+    def load_page():
+        products, has_more = catalog.product_page(filters, sort, limit, after)
+        next_cursor = encode_cursor(catalog.encode_sort_key(products[-1], sort)) if has_more else None
+        return {
+            "data": [product.serialize() for product in products],
+            "pagination": {"limit": limit, "sort": sort, "next_cursor": next_cursor, "has_more": has_more},
+        }
+
+    # Mesma página (mesmos parâmetros) na mesma versão do catálogo vem do cache
+    page = catalog_cache.get_or_load(f"products:page:{urlencode(sorted(request.args.items(multi=True)))}", load_page)
+    return jsonify({**page, "message": "Products retrieved successfully."}), 200
+
+@blueprint.route("/read/category/<int:category_id>", methods=["GET"])
+@token_required
+def read_category(current_user_id, category_id):
+    """Every product of a category, unpaginated, from the catalog snapshot"""
+    return catalog_snapshots.respond(catalog_snapshots.get(f"category:{category_id}"))
+
+@blueprint.route("/read/gender/<int:gender_id>", methods=["GET"])
+@token_required
+def read_gender(current_user_id, gender_id):
+    """Every product of a gender, unpaginated, from the catalog snapshot"""
+    return catalog_snapshots.respond(catalog_snapshots.get(f"gender:{gender_id}"))
 
+@blueprint.route("/search", methods=["GET"])
+@token_required
+def search(current_user_id):
+    """
+    Full-text search over name, description, category and gender, best match first. Every word of
+    q must match, accents and plurals aside; the last one also as a prefix while the user is still
+    typing it (q not ending in a space), and words with no match within one or two typos.
+    """
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({"error": "Missing required parameter: q"}), 400
+    if len(query) > SEARCH_MAX_LENGTH:
+        return jsonify({"error": f"q must have at most {SEARCH_MAX_LENGTH} characters"}), 400
+    try:
+        limit = parse_limit(request.args.get('limit'))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid limit"}), 400
+    prefix = not query.endswith(" ")
+
+    def load_results():
+        ids = product_search.search(query, limit, prefix=prefix)
+        products = {product.id: product for product in
+                    Product.query.options(*catalog.eager_options()).filter(Product.id.in_(ids))} if ids else {}
+        return [products[id].serialize() for id in ids if id in products]
+
+    # Mesma busca (normalizada) na mesma versão do catálogo vem do cache
+    key = f"products:search:{limit}:{int(prefix)}:{' '.join(tokenize(query))}"
+    try:
+        data = catalog_cache.get_or_load(key, load_results)
+    except SearchIndexNotReady:
+        # Primeiro build do índice deste worker ainda em andamento (segundos após o start)
+        response = jsonify({"error": "Search is warming up, try again shortly."})
+        response.headers["Retry-After"] = "2"
+        return response, 503
     return jsonify({
-        "data": products_data,
+        "data": data,
         "message": "Products retrieved successfully."
     }), 200
 
+@blueprint.route("/facets", methods=["GET"])
+@token_required
+def facets(current_user_id):
+    """
+    Product counts per category, gender, size and price bucket under the filters in the query
+    string (category, gender, size, price; comma-separated values match any of them), computed in
+    memory from per-value bitsets of the current catalog version
+    """
+    try:
+        selection = parse_selection(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "data": catalog_facets.counts(selection),
+        "message": "Facets retrieved successfully."
+    }), 200
+
 # Update
 @blueprint.route("/update/<int:id>", methods=["PUT"])
 @token_required
@@ -121,6 +233,30 @@ def update(current_user_id, id):
         "message": "Product updated successfully."
     }), 200
 
+# Hot SKUs: divide o estoque em sub-contadores para reduzir a disputa pela linha do produto
+@blueprint.route("/<int:id>/inventory/shards", methods=["PUT"])
+@token_required
+@admin_required
+def set_inventory_shards(current_user_id, id):
+    data = request.get_json(silent=True) or {}
+    shards = data.get("shards")
+    if not isinstance(shards, int) or isinstance(shards, bool) or not 0 <= shards <= 64:
+        return jsonify({"error": "shards must be an integer between 0 and 64"}), 400
+
+    try:
+        stock = inventory.shard_product(id, shards)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 404
+    except Exception as e:
+        current_app.logger.error(f"Erro inesperado ao redistribuir estoque do produto {id}: {str(e)}")
+        current_app.logger.error(traceback.format_exc())
+        return jsonify({"error": "Failed to update inventory shards due to an internal server error."}), 500
+
+    return jsonify({
+        "data": {"product_id": id, "shards": shards, "inventory": stock.get(id, 0)},
+        "message": "Inventory shards updated successfully."
+    }), 200
+
 # Delete
 @blueprint.route("/delete/<int:id>", methods=["DELETE"])
 @token_required
@@ -0,0 +1,669 @@
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import heapq
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from flask import current_app
+
+from api.utils.db.connection import db
+from api.category.model import Category
+from api.gender.model import Gender
+from api.product.model import Product
+from api.utils.catalog_cache import catalog_cache
+
+logger = logging.getLogger(__name__)
+
+# Peso de cada campo no tf do BM25 (BM25F simplificado)
+FIELD_WEIGHTS = {"name": 3.0, "category": 2.0, "gender": 1.5, "description": 1.0}
+K1 = 1.2
+B = 0.75
+PREFIX_WEIGHT = 0.9
+FUZZY_WEIGHT = 0.6
+MIN_PREFIX = 2
+PREFIX_SCAN = 256       # palavras do vocabulário examinadas por prefixo
+PREFIX_EXPANSIONS = 16  # as mais frequentes entre elas entram na busca
+FUZZY_MIN_LENGTH = 4
+LOAD_CHUNK_SIZE = 1000
+BITSET_CACHE = 512      # stems com faixas em bitset guardadas
+SCORE_DRIFT = 0.05      # variação de documentos vivos que recalcula todas as pontuações
+SYNC_MARGIN = timedelta(minutes=5)
+DRIVER_SCAN = 1000      # até este df a palavra mais rara é percorrida inteira
+INTERSECTION_SCAN = 100  # até este tamanho a interseção de todas as palavras é pontuada inteira
+TIER_CUTS = (1 / 64, 1 / 32, 1 / 16, 1 / 8, 1 / 4, 1 / 2, 1)  # faixas de cada stem (fração da lista)
+FINE_BANDS = (0, 1, 2, 3, 4, 5, 6)    # faixa de busca de cada faixa do stem, com duas palavras
+COARSE_BANDS = (0, 0, 0, 1, 1, 2, 3)  # com três ou mais
+MIN_TIER = 64
+BAND_RATIO = 0.85       # faixas de uma palavra expandida em vários stems
+
+STOPWORDS = frozenset("""
+a ao aos as com da das de do dos e em na nas no nos o os ou para pela pelas pelo pelos por
+que se sem um uma umas uns the and of for
+""".split())
+
+# Plurais mais comuns, testados em ordem (a palavra já está sem acentos)
+PLURALS = (("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"), ("ois", "ol"),
+           ("res", "r"), ("les", "l"), ("ns", "m"), ("s", ""))
+DIMINUTIVES = ("zinho", "zinha", "inho", "inha", "mente")
+
+
+
+class SearchIndexNotReady(Exception):
+    """Raised while the first build of this worker's index is still running"""
+
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+TEXT_COLUMNS = (Product.id, Product.name, Product.description, Product.category_id, Product.gender_id, Product.updated_at)
+
+
+def fold(text: str) -> str:
+    """Lowercase without accents: 'Calça Básica' -> 'calca basica'"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """
+    Light Portuguese stemmer on a folded word: plurals, diminutives/-mente and the final
+    gender vowel, so 'camisetas', 'camiseta' and 'camisetinha' share the stem 'camiset'.
+    """
+    if len(word) < 4 or word.isdigit():
+        return word
+    for suffix, replacement in PLURALS:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            if suffix == "s" and word.endswith(("ss", "us")):
+                break
+            word = word[:-len(suffix)] + replacement
+            break
+    for suffix in DIMINUTIVES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    if len(word) > 3 and word[-1] in "aeo":
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Folded words of text, without stopwords and single letters"""
+    if not text:
+        return []
+    return [word for word in _TOKEN.findall(fold(text)) if len(word) > 1 and word not in STOPWORDS]
+
+
+def max_edits(word: str) -> int:
+    if len(word) < FUZZY_MIN_LENGTH:
+        return 0
+    return 1 if len(word) < 8 else 2
+
+
+def _deletes(word: str) -> Iterable[str]:
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _members(bits: int) -> List[int]:
+    """Positions of the set bits of bits"""
+    digits = bin(bits)
+    last = len(digits) - 1
+    members = []
+    position = digits.find("1", 2)
+    while position != -1:
+        members.append(last - position)
+        position = digits.find("1", position + 1)
+    return members
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (an adjacent swap is one edit), or limit + 1 once it is exceeded"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def document_terms(name: str, description: str, category: str, gender: str) -> Tuple[Dict[str, float], float, List[str]]:
+    """(weighted tf per stem, weighted length, distinct words) of one product"""
+    tf: Dict[str, float] = {}
+    length = 0.0
+    words = set()
+    for field, text in (("name", name), ("description", description), ("category", category), ("gender", gender)):
+        weight = FIELD_WEIGHTS[field]
+        for word in tokenize(text):
+            words.add(word)
+            term = stem(word)
+            tf[term] = tf.get(term, 0.0) + weight
+            length += weight
+    return tf, length, list(words)
+
+
+class ProductSearchIndex:
+    """
+    In-process inverted index over product name, description, category name and gender, one per
+    worker, ranked with BM25 (fields weighted by FIELD_WEIGHTS).
+
+    Products get internal document numbers in insertion order, so every posting list (stem ->
+    ascending document numbers plus weighted tf, in compact arrays) only ever grows at the end.
+    A changed product is appended again under a new number and the old one is marked dead;
+    removed products are only marked dead. Like Lucene segments, dead documents still count in
+    document frequencies until the index is rebuilt, which happens once they pass compact_ratio.
+
+    The index follows the catalog version (api/utils/catalog_cache). When it moves, sync() reads
+    the products updated since the last sync (by updated_at), the product ids when the count shows
+    deletions, and the category and gender names, and re-tokenizes only the products whose text changed.
+    Full builds (the first one of the worker, started by init_app, and compactions) never run in a
+    request: a background thread builds a new index while searches keep using the current one,
+    which is then swapped in. Until the first build is done search() raises SearchIndexNotReady.
+
+    Query words match their stem exactly; the last word also matches as a prefix of vocabulary
+    words (type-ahead); a word with neither match is looked up within a bounded edit distance
+    (1 edit from 4 letters, 2 from 8) through a single-deletion index of the vocabulary. Every
+    word must match. Per stem the index lazily keeps the BM25 score of each posting, the postings
+    sorted best-first and those cut into tiers kept as bitsets. One word reads the top of its
+    sorted list. Several words score every document of the rarest one when it is rare, or of
+    their whole intersection when it is small; otherwise they walk combinations of one tier per
+    word by decreasing score bound, ANDing their bitsets, and stop once no remaining combination
+    can enter the top results.
+    """
+
+    def __init__(self, compact_ratio: float = 0.25, warm_terms: int = 256):
+        self.compact_ratio = compact_ratio
+        self.warm_terms = warm_terms
+        self._lock = threading.Lock()
+        self._clear()
+        self.app = None
+        self._builder: Optional[threading.Thread] = None
+        self._builder_pid: Optional[int] = None
+        self.version: Optional[int] = None
+        self.synced_at: Optional[float] = None
+        self.full_builds = 0
+        self.syncs = 0
+        self.reindexed = 0
+        self.searches = 0
+
+    def _clear(self) -> None:
+        self._product_ids = array("I")      # documento -> id do produto
+        self._lengths = array("f")          # documento -> tamanho ponderado
+        self._live = bytearray()            # documento -> 1 vivo, 0 removido/substituído
+        self._dead_bits = 0
+        self._documents: Dict[int, int] = {}  # id do produto -> documento vivo
+        self._signatures: Dict[int, int] = {}  # id do produto -> hash do texto indexado
+        self._category_names: Dict[int, str] = {}
+        self._gender_names: Dict[int, str] = {}
+        self._high_water: Optional[datetime] = None
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._words: Dict[str, str] = {}    # palavra -> stem
+        self._sorted_words: List[str] = []
+        self._deletes: Dict[str, List[str]] = {}
+        self._live_count = 0
+        self._live_length = 0.0
+        self._touched = set()
+        self._reset_scores()
+
+    def _reset_scores(self) -> None:
+        self._scores: Dict[str, array] = {}
+        self._impacts: Dict[str, Tuple[array, array]] = {}
+        self._tiers: Dict[str, List[Tuple[float, int]]] = {}
+        self._merged: Dict[Tuple, List[Tuple[float, int]]] = {}
+        self._scored_count = self._live_count
+        self._average = self._live_length / self._live_count if self._live_count else 1.0
+
+    # --- escrita ---
+
+    def _add_word(self, word: str, term: str, incremental: bool) -> None:
+        self._words[word] = term
+        if incremental:
+            insort(self._sorted_words, word)
+        if len(word) >= FUZZY_MIN_LENGTH:
+            for key in (word, *_deletes(word)):
+                self._deletes.setdefault(key, []).append(word)
+
+    def _add(self, product_id: int, signature: int, text: Tuple[str, str, str, str], incremental: bool) -> None:
+        self._remove(product_id)
+        tf, length, words = document_terms(*text)
+        document = len(self._product_ids)
+        self._product_ids.append(product_id)
+        self._lengths.append(length)
+        self._live.append(1)
+        self._documents[product_id] = document
+        self._signatures[product_id] = signature
+        self._live_count += 1
+        self._live_length += length
+        for term, frequency in tf.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("f"))
+            postings[0].append(document)
+            postings[1].append(frequency)
+            if incremental:
+                self._touched.add(term)
+        for word in words:
+            if word not in self._words:
+                self._add_word(word, stem(word), incremental)
+
+    def _remove(self, product_id: int) -> None:
+        document = self._documents.pop(product_id, None)
+        if document is None:
+            return
+        self._signatures.pop(product_id, None)
+        self._live[document] = 0
+        self._dead_bits |= 1 << document
+        self._live_count -= 1
+        self._live_length -= self._lengths[document]
+
+    def _index_rows(self, rows, incremental: bool) -> int:
+        """(Re)indexes rows of (id, name, description, category_id, gender_id, updated_at) whose text changed"""
+        count = 0
+        for row in rows:
+            if self._high_water is None or row.updated_at > self._high_water:
+                self._high_water = row.updated_at
+            category = self._category_names.get(row.category_id, "")
+            gender = self._gender_names.get(row.gender_id, "")
+            signature = hash((row.name, row.description, category, gender))
+            if self._signatures.get(row.id) == signature and row.id in self._documents:
+                continue
+            self._add(row.id, signature, (row.name, row.description, category, gender), incremental)
+            count += 1
+        return count
+
+    def _load_names(self) -> Tuple[set, set]:
+        """Refreshes category and gender names; returns the ids whose name changed"""
+        categories = {row.id: row.name for row in db.session.query(Category.id, Category.name)}
+        genders = {row.id: f"{row.name} {row.long_name}" for row in db.session.query(Gender.id, Gender.name, Gender.long_name)}
+        renamed_categories = {id for id, name in categories.items() if self._category_names.get(id, name) != name}
+        renamed_genders = {id for id, name in genders.items() if self._gender_names.get(id, name) != name}
+        self._category_names, self._gender_names = categories, genders
+        return renamed_categories, renamed_genders
+
+    def build(self) -> int:
+        """Indexes the whole catalog from scratch; returns the number of products"""
+        self._clear()
+        self._load_names()
+        count = self._index_rows(db.session.query(*TEXT_COLUMNS).order_by(Product.id).yield_per(LOAD_CHUNK_SIZE), False)
+        self._sorted_words = sorted(self._words)
+        self._reset_scores()
+        self.full_builds += 1
+        return count
+
+    def needs_compaction(self) -> bool:
+        return len(self._product_ids) - self._live_count > self.compact_ratio * max(self._live_count, 1000)
+
+    def sync(self) -> int:
+        """Re-indexes the products whose text changed since the last sync; returns how many"""
+        renamed_categories, renamed_genders = self._load_names()
+        query = db.session.query(*TEXT_COLUMNS)
+        conditions = []
+        if self._high_water is not None:
+            # Margem para relógios diferentes entre workers e gravações no mesmo instante
+            conditions.append(Product.updated_at >= self._high_water - SYNC_MARGIN)
+        if renamed_categories:
+            conditions.append(Product.category_id.in_(renamed_categories))
+        if renamed_genders:
+            conditions.append(Product.gender_id.in_(renamed_genders))
+        if conditions:
+            query = query.filter(db.or_(*conditions))
+        count = self._index_rows(query.yield_per(LOAD_CHUNK_SIZE), True)
+
+        # Todo produto existente já está no índice: se a contagem bate, nada foi apagado
+        if db.session.query(db.func.count(Product.id)).scalar() != self._live_count:
+            existing = {product_id for (product_id,) in db.session.query(Product.id)}
+            for product_id in [product_id for product_id in self._documents if product_id not in existing]:
+                self._remove(product_id)
+                count += 1
+
+        # Estatísticas globais mudaram pouco: só os termos dos documentos novos são recalculados
+        if abs(self._live_count - self._scored_count) > SCORE_DRIFT * max(self._scored_count, 1):
+            self._reset_scores()
+        else:
+            for term in self._touched:
+                self._scores.pop(term, None)
+                self._impacts.pop(term, None)
+                self._tiers.pop(term, None)
+            self._merged.clear()
+        self._touched = set()
+        return count
+
+    def warm(self) -> None:
+        """Computes scores, best-first order and bitsets of the warm_terms most frequent stems"""
+        for term in heapq.nlargest(self.warm_terms, self._postings, key=lambda term: len(self._postings[term][0])):
+            self._tiers_of(term)
+
+    def init_app(self, app, start: bool = True):
+        """Starts the first build in the background so no request waits for it"""
+        self.app = app
+        if start:
+            self._start_build()
+
+    def _start_build(self) -> threading.Thread:
+        # Um build por vez; threads não sobrevivem a um fork, então vale só no processo que o iniciou
+        if self._builder is not None and self._builder.is_alive() and self._builder_pid == os.getpid():
+            return self._builder
+        app = self.app or current_app._get_current_object()
+        self._builder = threading.Thread(target=self._build_in_background, args=(app,), name="product-search-build", daemon=True)
+        self._builder_pid = os.getpid()
+        self._builder.start()
+        return self._builder
+
+    def _build_in_background(self, app) -> None:
+        start = time.perf_counter()
+        fresh = ProductSearchIndex(self.compact_ratio, self.warm_terms)
+        try:
+            with app.app_context():
+                # Versão lida antes da leitura dos produtos: o que mudar durante o build vem no próximo sync
+                version = catalog_cache.version()
+                count = fresh.build()
+                fresh.warm()
+        except Exception as e:
+            logger.error(f"Product search index build failed: {str(e)}", exc_info=True)
+            return
+        with self._lock:
+            for name in INDEX_STATE:
+                setattr(self, name, getattr(fresh, name))
+            self.version = version
+            self.synced_at = time.time()
+            self.full_builds += 1
+            self.syncs += 1
+            self.reindexed += count
+        logger.info(f"Product search index built for catalog version {version}: "
+                    f"{count} products in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def ensure_current(self, wait: bool = False) -> None:
+        """
+        Syncs the index when the catalog version moved since the last sync. Without an index yet it
+        starts the build and raises SearchIndexNotReady, or blocks until it is done when wait is set.
+        """
+        version = catalog_cache.version()
+        if version is not None and version == self.version:
+            return
+        if self.synced_at is None:
+            builder = self._start_build()
+            if not wait:
+                raise SearchIndexNotReady("Product search index is still being built")
+            builder.join()
+            return
+        start = time.perf_counter()
+        with self._lock:
+            if version is not None and version == self.version:
+                return
+            count = self.sync()
+            if not self._tiers:
+                # Depois de um sync os termos tocados são recalculados na primeira busca que os usa
+                self.warm()
+            self.version = version
+            self.synced_at = time.time()
+            self.syncs += 1
+            self.reindexed += count
+            # Muitos documentos mortos: o índice compactado é montado ao lado e trocado quando pronto
+            if self.needs_compaction():
+                self._start_build()
+        logger.info(f"Product search index synced for catalog version {version}: "
+                    f"{count} products in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    # --- leitura ---
+
+    def _scores_of(self, term: str) -> array:
+        """BM25 score of each posting of term, aligned with its posting list"""
+        scores = self._scores.get(term)
+        if scores is None:
+            documents, frequencies = self._postings[term]
+            idf = math.log(1 + (self._live_count - len(documents) + 0.5) / (len(documents) + 0.5))
+            lengths, average = self._lengths, self._average
+            scores = self._scores[term] = array("f", [
+                idf * frequency * (K1 + 1) / (frequency + K1 * (1 - B + B * lengths[document] / average))
+                for document, frequency in zip(documents, frequencies)
+            ])
+        return scores
+
+    def _impacts_of(self, term: str) -> Tuple[array, array]:
+        """Documents of term sorted by score, best first (ties by document number)"""
+        impacts = self._impacts.get(term)
+        if impacts is None:
+            documents, scores = self._postings[term][0], self._scores_of(term)
+            order = sorted(range(len(documents)), key=scores.__getitem__, reverse=True)
+            impacts = self._impacts[term] = (array("I", [documents[i] for i in order]), array("f", [scores[i] for i in order]))
+        return impacts
+
+    def _prefix_terms(self, word: str) -> List[str]:
+        start = bisect_left(self._sorted_words, word)
+        terms = set()
+        for candidate in self._sorted_words[start:start + PREFIX_SCAN]:
+            if not candidate.startswith(word):
+                break
+            terms.add(self._words[candidate])
+        if len(terms) > PREFIX_EXPANSIONS:
+            return heapq.nlargest(PREFIX_EXPANSIONS, terms, key=lambda term: len(self._postings[term][0]))
+        return list(terms)
+
+    def _fuzzy_terms(self, word: str) -> List[str]:
+        limit = max_edits(word)
+        if not limit:
+            return []
+        probes = {word, *_deletes(word)}
+        if limit > 1:
+            probes.update(deleted for once in list(probes) for deleted in _deletes(once))
+        candidates = {candidate for probe in probes for candidate in self._deletes.get(probe, ())}
+        return list({self._words[candidate] for candidate in candidates if edit_distance(word, candidate, limit) <= limit})
+
+    def _expand(self, word: str, last: bool, prefix: bool, fuzzy: bool) -> Dict[str, float]:
+        """Query word -> {stem: weight}"""
+        expanded: Dict[str, float] = {}
+        term = stem(word)
+        if term in self._postings:
+            expanded[term] = 1.0
+        if last and prefix and len(word) >= MIN_PREFIX:
+            for candidate in self._prefix_terms(word):
+                expanded.setdefault(candidate, PREFIX_WEIGHT)
+        if not expanded and fuzzy:
+            for candidate in self._fuzzy_terms(word):
+                expanded.setdefault(candidate, FUZZY_WEIGHT)
+        return expanded
+
+    def _best_first(self, group: Dict[str, float]):
+        """(weighted score, document) of a query word's stems merged best first; a document may repeat"""
+        streams = []
+        for term, weight in group.items():
+            documents, scores = self._impacts_of(term)
+            streams.append(((-weight * score, document) for document, score in zip(documents, scores)))
+        return heapq.merge(*streams)
+
+    def _top_single(self, group: Dict[str, float], limit: int) -> List[int]:
+        top, seen, live = [], set(), self._live
+        for _, document in self._best_first(group):
+            if document in seen or not live[document]:
+                continue
+            seen.add(document)
+            top.append(document)
+            if len(top) == limit:
+                break
+        return top
+
+    def _tiers_of(self, term: str) -> List[Tuple[float, int]]:
+        """
+        Documents of term, best first, cut at each of TIER_CUTS of the list into tiers of (best
+        score in the tier, bitset of its documents); the top tiers are small, so their
+        intersections are too. Tiers left empty by MIN_TIER are (0.0, 0).
+        """
+        tiers = self._tiers.get(term)
+        if tiers is None:
+            documents, scores = self._impacts_of(term)
+            tiers = []
+            start = 0
+            for cut in TIER_CUTS:
+                end = max(start, int(len(documents) * cut), min(start + MIN_TIER, len(documents)))
+                buffer = bytearray(len(self._live) // 8 + 1)
+                for document in documents[start:end]:
+                    buffer[document >> 3] |= 1 << (document & 7)
+                tiers.append((scores[start] if end > start else 0.0, int.from_bytes(buffer, "little")))
+                start = end
+            if len(self._tiers) >= BITSET_CACHE:
+                self._tiers.clear()
+            self._tiers[term] = tiers
+        return tiers
+
+    def _bands(self, group: Dict[str, float], bands_of_tier: Tuple[int, ...]) -> List[Tuple[float, int]]:
+        """
+        Score bands of a query word: the tiers of its stems merged as bands_of_tier says or, for a
+        word expanded into several stems, by how far each tier is below the word's best weighted
+        score (BAND_RATIO per band)
+        """
+        key = (tuple(sorted(group.items())), bands_of_tier)
+        merged = self._merged.get(key)
+        if merged is not None:
+            return merged
+        entries = [(weight * upper, bits, bands_of_tier[i])
+                   for term, weight in group.items() for i, (upper, bits) in enumerate(self._tiers_of(term)) if bits]
+        best = max(upper for upper, _, _ in entries)
+        last = bands_of_tier[-1]
+        bands = [[0.0, 0] for _ in range(last + 1)]
+        for upper, bits, band in entries:
+            if len(group) > 1:
+                band = last if upper <= 0 else min(last, int(math.log(best / upper) / -math.log(BAND_RATIO)))
+            bands[band][0] = max(bands[band][0], upper)
+            bands[band][1] |= bits
+        merged = [(upper, bits) for upper, bits in bands if bits]
+        if len(group) > 1:
+            # Só as palavras expandidas (prefixo, erro de digitação) custam a fusão
+            if len(self._merged) >= BITSET_CACHE:
+                self._merged.clear()
+            self._merged[key] = merged
+        return merged
+
+    def _top_intersection(self, groups: List[Dict[str, float]], limit: int) -> List[int]:
+        groups = sorted(groups, key=lambda group: sum(len(self._postings[term][0]) for term in group))
+        # (postings, pontuações, peso) de cada stem de cada palavra, para pontuar sem chamadas extras
+        lookups = [[(self._postings[term][0], self._scores_of(term), weight) for term, weight in group.items()]
+                   for group in groups]
+        top: List[Tuple[float, int]] = []
+        seen = set()
+
+        def offer(document: int) -> None:
+            if document in seen:
+                return
+            seen.add(document)
+            total = 0.0
+            for group in lookups:
+                best = 0.0
+                for documents, scores, weight in group:
+                    position = bisect_left(documents, document)
+                    if position < len(documents) and documents[position] == document and weight * scores[position] > best:
+                        best = weight * scores[position]
+                if not best:
+                    return
+                total += best
+            # Empate: menor documento primeiro, para o resultado ser estável
+            entry = (total, -document)
+            if len(top) < limit:
+                heapq.heappush(top, entry)
+            elif entry > top[0]:
+                heapq.heapreplace(top, entry)
+
+        if sum(len(self._postings[term][0]) for term in groups[0]) <= DRIVER_SCAN:
+            # Palavra rara: pontua cada documento dela (quem falta em outra palavra sai no primeiro zero)
+            live = self._live
+            for term in groups[0]:
+                for document in self._postings[term][0]:
+                    if live[document]:
+                        offer(document)
+        else:
+            # Combinações de faixas, da maior soma de limites para a menor; a interseção de cada uma
+            # sai de um AND de bitsets e para quando nenhuma combinação restante supera o top atual
+            # Com três palavras ou mais as combinações se multiplicam: faixas mais largas
+            bands_of_tier = FINE_BANDS if len(groups) == 2 else COARSE_BANDS
+            bands = [self._bands(group, bands_of_tier) for group in groups]
+            alive = ~self._dead_bits
+            for word in bands:
+                union = 0
+                for _, bits in word:
+                    union |= bits
+                alive &= union
+            if alive.bit_count() <= INTERSECTION_SCAN:
+                # Interseção completa pequena (o caso comum com três palavras): pontua todos
+                for document in _members(alive):
+                    offer(document)
+                bands = []
+            start = (0,) * len(bands)
+            queue = [(-sum(band[0][0] for band in bands), start)] if bands else []
+            queued = {start}
+            while queue:
+                negative_bound, combination = heapq.heappop(queue)
+                if len(top) == limit and -negative_bound <= top[0][0]:
+                    break
+                bits = alive
+                for band, index in zip(bands, combination):
+                    bits &= band[index][1]
+                    if not bits:
+                        break
+                if bits:
+                    for document in _members(bits):
+                        offer(document)
+                for i in range(len(bands)):
+                    if combination[i] + 1 < len(bands[i]):
+                        following = combination[:i] + (combination[i] + 1,) + combination[i + 1:]
+                        if following not in queued:
+                            queued.add(following)
+                            bound = sum(band[index][0] for band, index in zip(bands, following))
+                            heapq.heappush(queue, (-bound, following))
+        return [-negative_document for _, negative_document in sorted(top, reverse=True)]
+
+    def search(self, query: str, limit: int = 20, prefix: bool = True, fuzzy: bool = True) -> List[int]:
+        """Product ids best first; every query word must match (exactly, as a prefix or within the edit bound)"""
+        self.ensure_current()
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words or limit <= 0:
+            return []
+        with self._lock:
+            self.searches += 1
+            groups = [self._expand(word, i == len(words) - 1, prefix, fuzzy) for i, word in enumerate(words)]
+            if not all(groups):
+                return []
+            documents = self._top_single(groups[0], limit) if len(groups) == 1 else self._top_intersection(groups, limit)
+            return [self._product_ids[document] for document in documents]
+
+    def stats(self) -> Dict:
+        return {
+            "version": self.version,
+            "age": round(time.time() - self.synced_at, 3) if self.synced_at else None,
+            "products": self._live_count,
+            "dead_documents": len(self._product_ids) - self._live_count,
+            "terms": len(self._postings),
+            "words": len(self._words),
+            "cached_terms": len(self._impacts),
+            "full_builds": self.full_builds,
+            "syncs": self.syncs,
+            "reindexed": self.reindexed,
+            "searches": self.searches,
+        }
+
+
+# Estrutura do índice trocada de uma vez quando um build em segundo plano termina
+_probe = ProductSearchIndex.__new__(ProductSearchIndex)
+_probe._clear()
+INDEX_STATE = tuple(vars(_probe))
+del _probe
+
+product_search = ProductSearchIndex()
+
+
+def init_product_search(app):
+    """Builds this process's search index in the background at start unless PRODUCT_SEARCH_PREBUILD=false"""
+    start = os.getenv("PRODUCT_SEARCH_PREBUILD", "true").lower() != "false"
+    product_search.init_app(app, start=start)
@@ -0,0 +1,171 @@
+from flask import Response, current_app, request
+from typing import Dict, List, Optional
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from api.product.model import Product
+from api.product import catalog
+from api.utils.catalog_cache import catalog_cache
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele só há as variantes gzip e identity
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MESSAGE = "Products retrieved successfully."
+GZIP_LEVEL = int(os.getenv("CATALOG_SNAPSHOT_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("CATALOG_SNAPSHOT_BROTLI_QUALITY", "5"))
+
+
+class Rendition:
+    """
+    One catalog response rendered to bytes, with its gzip (and brotli, when installed) variants.
+    The ETag is a hash of the JSON, so every worker that builds the same catalog hands out the same
+    tag; each encoding gets its own suffix, as strong tags must differ between representations.
+    """
+
+    __slots__ = ("etag", "variants")
+
+    def __init__(self, body: bytes):
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.variants: Dict[str, bytes] = {"identity": body}
+        self.variants["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    def etag_for(self, encoding: str) -> str:
+        return self.etag if encoding == "identity" else f"{self.etag}-{encoding}"
+
+    @property
+    def etags(self) -> List[str]:
+        return [self.etag_for(encoding) for encoding in self.variants]
+
+
+class Snapshot:
+    """Renditions of one catalog version: the whole catalog ("all") and one slice per category and per gender"""
+
+    def __init__(self, version: Optional[int], renditions: Dict[str, Rendition], empty: Rendition, build_seconds: float):
+        self.version = version
+        self.renditions = renditions
+        self.empty = empty
+        self.build_seconds = build_seconds
+        self.built_at = time.time()
+        self.built_at_monotonic = time.monotonic()
+
+    def get(self, key: str) -> Rendition:
+        return self.renditions.get(key, self.empty)
+
+
+def _render(data: List[Dict]) -> bytes:
+    # Mesmo encoder, conteúdo e separadores compactos do jsonify da listagem completa
+    return current_app.json.dumps({"data": data, "message": MESSAGE}, separators=(",", ":")).encode() + b"\n"
+
+
+def build_snapshot(version: Optional[int] = None) -> Snapshot:
+    """Serializes the catalog once (one query plus the inventory shards) and renders every slice"""
+    start = time.perf_counter()
+    products = Product.query.options(*catalog.eager_options()).order_by(Product.id).all()
+    groups: Dict[str, List[Dict]] = {"all": []}
+    for product in products:
+        data = product.serialize()
+        groups["all"].append(data)
+        groups.setdefault(f"category:{product.category_id}", []).append(data)
+        groups.setdefault(f"gender:{product.gender_id}", []).append(data)
+    renditions = {key: Rendition(_render(data)) for key, data in groups.items()}
+    elapsed = time.perf_counter() - start
+    logger.info(f"Catalog snapshot of version {version} built: {len(products)} products, "
+                f"{len(renditions)} renditions in {elapsed * 1000:.0f} ms")
+    return Snapshot(version, renditions, Rendition(_render([])), elapsed)
+
+
+class CatalogSnapshots:
+    """
+    Per-worker holder of the current Snapshot. It is rebuilt when the catalog version changes
+    (checked through catalog_cache, so at most once per version check interval) or after ttl
+    seconds, which bounds how stale the listed inventory gets. One thread builds while the others
+    wait for it; if the version cannot be read, every request builds its own snapshot.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._current: Optional[Snapshot] = None
+        self.builds = 0
+        self.responses = {"200": 0, "304": 0}
+        self.encodings: Dict[str, int] = {}
+
+    def _fresh(self, snapshot: Optional[Snapshot], version: int) -> bool:
+        return (snapshot is not None and snapshot.version == version
+                and time.monotonic() - snapshot.built_at_monotonic < self.ttl)
+
+    def get(self, key: str) -> Rendition:
+        if self._pid != os.getpid():
+            self._reset()
+        version = catalog_cache.version()
+        if version is None:
+            return build_snapshot().get(key)
+        if not self._fresh(self._current, version):
+            with self._lock:
+                if not self._fresh(self._current, version):
+                    self._current = build_snapshot(version)
+                    self.builds += 1
+        return self._current.get(key)
+
+    def respond(self, rendition: Rendition) -> Response:
+        """
+        200 with the best encoding the client accepts, or 304 when If-None-Match holds the ETag of
+        any encoding. The body is the prebuilt bytes object, passed to the WSGI server as is.
+        """
+        encoding = request.accept_encodings.best_match(
+            [encoding for encoding in ("br", "gzip") if encoding in rendition.variants]) or "identity"
+        etag = rendition.etag_for(encoding)
+        matched = request.if_none_match and (
+            request.if_none_match.star_tag or any(request.if_none_match.contains_weak(tag) for tag in rendition.etags))
+
+        response = Response(status=304 if matched else 200, mimetype="application/json")
+        if not matched:
+            body = rendition.variants[encoding]
+            response.response = [body]
+            response.direct_passthrough = True
+            response.content_length = len(body)
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        response.headers["Vary"] = "Accept-Encoding"
+        # O catálogo é igual para todos: CDN pode guardar, mas revalida (com o token) a cada requisição
+        response.headers["Cache-Control"] = "public, no-cache"
+
+        with self._stats_lock:
+            self.responses[str(response.status_code)] += 1
+            if not matched:
+                self.encodings[encoding] = self.encodings.get(encoding, 0) + 1
+        return response
+
+    def stats(self) -> Dict:
+        snapshot = self._current
+        return {
+            "version": snapshot.version if snapshot else None,
+            "age": round(time.time() - snapshot.built_at, 3) if snapshot else None,
+            "ttl": self.ttl,
+            "builds": self.builds,
+            "last_build_ms": round(snapshot.build_seconds * 1000, 1) if snapshot else None,
+            "renditions": len(snapshot.renditions) if snapshot else 0,
+            "catalog_bytes": {encoding: len(body) for encoding, body in snapshot.get("all").variants.items()} if snapshot else None,
+            "responses": dict(self.responses),
+            "encodings": dict(self.encodings),
+            "brotli": brotli is not None,
+        }
+
+
+catalog_snapshots = CatalogSnapshots(ttl=catalog_cache.ttl)
@@ -0,0 +1,94 @@
+from api.utils.db.connection import db
+from datetime import datetime, timedelta
+import pytz
+from typing import Dict, List, Optional
+from flask import current_app
+
+class PaymentIntentOutbox(db.Model):
+    """
+    Transactional outbox of the checkout: one row per purchase whose Stripe PaymentIntent is still
+    to be created. Written in the same commit as the purchase and consumed by PaymentIntentWorker.
+    """
+    __tablename__ = "payment_intent_outbox"
+
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+    id = db.Column(db.Integer, primary_key=True)
+    purchase_id = db.Column(db.String(36), db.ForeignKey('purchases.id'), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    amount = db.Column(db.Integer, nullable=False) # em centavos, como a Stripe espera
+    currency = db.Column(db.String(3), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=PENDING, index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # Agendamento em UTC (naive)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    payment_intent_id = db.Column(db.String(255), nullable=True)
+    client_secret = db.Column(db.String(255), nullable=True)
+    last_error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(pytz.timezone('America/Sao_Paulo')))
+    updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(pytz.timezone('America/Sao_Paulo')), onupdate=lambda: datetime.now(pytz.timezone('America/Sao_Paulo')))
+
+    def __repr__(self):
+        return f"<PaymentIntentOutbox {self.id} purchase={self.purchase_id} status={self.status}>"
+
+    def serialize(self) -> Dict:
+        """Poll view for the purchase owner; client_secret only once the intent exists"""
+        return {
+            "purchase_id": self.purchase_id,
+            "status": self.status,
+            "payment_intent_id": self.payment_intent_id,
+            "client_secret": self.client_secret if self.status == self.DONE else None,
+            "attempts": self.attempts,
+            "error": self.last_error if self.status == self.FAILED else None,
+        }
+
+    @classmethod
+    def get_for_purchase(cls, purchase_id: str) -> Optional['PaymentIntentOutbox']:
+        return cls.query.filter_by(purchase_id=purchase_id).first()
+
+    @classmethod
+    def due_ids(cls, limit: int = 20) -> List[int]:
+        """Ids ready to be processed: pending and due, or processing with an expired lease (worker died)"""
+        now = datetime.utcnow()
+        rows = (
+            db.session.query(cls.id)
+            .filter(db.or_(
+                db.and_(cls.status == cls.PENDING, cls.next_attempt_at <= now),
+                db.and_(cls.status == cls.PROCESSING, cls.locked_until < now),
+            ))
+            .order_by(cls.next_attempt_at)
+            .limit(limit)
+            .all()
+        )
+        return [row.id for row in rows]
+
+    @classmethod
+    def claim(cls, outbox_id: int, lease_seconds: int = 60) -> bool:
+        """Atomically takes a row for this worker; False if another worker already has it"""
+        now = datetime.utcnow()
+        claimed = (
+            cls.query
+            .filter(cls.id == outbox_id)
+            .filter(db.or_(
+                cls.status == cls.PENDING,
+                db.and_(cls.status == cls.PROCESSING, cls.locked_until < now),
+            ))
+            .update({
+                cls.status: cls.PROCESSING,
+                cls.locked_until: now + timedelta(seconds=lease_seconds),
+                cls.attempts: cls.attempts + 1,
+            }, synchronize_session=False)
+        )
+        db.session.commit()
+        return claimed == 1
+
+    def schedule_retry(self, error: str, delay_seconds: float) -> None:
+        self.status = self.PENDING
+        self.locked_until = None
+        self.last_error = error[:255]
+        self.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay_seconds)
+        current_app.logger.warning(f"PaymentIntent da purchase {self.purchase_id} reagendado em {delay_seconds:.0f}s: {error}")
@@ -0,0 +1,246 @@
+from api.utils.db.connection import db
+from api.purchases.outbox.model import PaymentIntentOutbox
+from api.transaction.payment.model import Transaction
+from api.payment_status.model import PaymentStatus
+from api.purchases.reservation import engine as inventory
+from api.purchases.summary import projection as order_summaries
+from api.utils.payments import stripe_gateway
+from typing import Dict, Optional
+import logging
+import os
+import queue
+import random
+import stripe
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentIntentWorker:
+    """
+    Consumes the PaymentIntentOutbox: creates the Stripe PaymentIntent outside the checkout transaction,
+    stores its id on the Transaction and publishes the client_secret for the poll endpoint.
+
+    Each gunicorn worker runs one daemon thread. The request that wrote the outbox row notifies the
+    local thread so the intent is usually created right away; rows left behind (Stripe errors, a dead
+    worker) are picked up by the scan every thread runs each poll_interval, busy or not. With
+    PAYMENT_OUTBOX_WORKER=false the web processes start no thread and a dedicated consumer does it all. Rows are claimed with a conditional
+    UPDATE, so concurrent threads never process the same purchase twice, and Stripe is called with
+    the purchase id as idempotency key so a retried call never creates a second intent.
+    """
+
+    def __init__(self, poll_interval: float = 5.0, batch_size: int = 20, max_attempts: int = 5,
+                 lease_seconds: int = 60, retry_base_delay: float = 2.0):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.retry_base_delay = retry_base_delay
+        self.app = None
+        self.enabled = False
+        self._queue: "queue.Queue[int]" = queue.Queue()
+        self._waiters: Dict[str, threading.Event] = {}
+        self._waiters_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._stop = threading.Event()
+
+    def init_app(self, app, start: bool = True):
+        self.app = app
+        self.enabled = start
+        if start:
+            self.start()
+
+    def start(self):
+        # Threads não sobrevivem a um fork; reinicia no processo filho
+        if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="payment-intent-worker", daemon=True)
+        self._thread_pid = os.getpid()
+        self._thread.start()
+        logger.info(f"Payment intent worker started (pid {self._thread_pid})")
+
+    def stop(self):
+        self._stop.set()
+
+    def notify(self, outbox_id: int, purchase_id: Optional[str] = None) -> None:
+        """
+        Hands a freshly committed outbox row to this process's thread; pass purchase_id to wait_for it.
+        No-op when a dedicated consumer runs instead.
+        """
+        if not self.enabled:
+            return
+        if purchase_id is not None:
+            # Registrado antes de enfileirar para que o sinal não se perca se a thread terminar primeiro
+            with self._waiters_lock:
+                self._waiters.setdefault(purchase_id, threading.Event())
+        if self._thread_pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            self.start()
+        self._queue.put(outbox_id)
+
+    def wait_for(self, purchase_id: str, timeout: float) -> bool:
+        """Blocks until the local thread finished the purchase's row (done or failed), or timeout"""
+        if not self.enabled:
+            # Nenhuma thread local vai sinalizar: o cliente acompanha pelo endpoint de poll
+            return False
+        with self._waiters_lock:
+            event = self._waiters.setdefault(purchase_id, threading.Event())
+        try:
+            return event.wait(timeout)
+        finally:
+            with self._waiters_lock:
+                self._waiters.pop(purchase_id, None)
+
+    def _signal(self, purchase_id: str) -> None:
+        with self._waiters_lock:
+            event = self._waiters.get(purchase_id)
+        if event is not None:
+            event.set()
+
+    def _run(self):
+        # A varredura roda por prazo, não só com a fila vazia: sob checkouts contínuos as
+        # retentativas e as linhas de workers mortos (lease expirado) também precisam sair
+        next_scan = time.monotonic() + self.poll_interval
+        while not self._stop.is_set():
+            try:
+                outbox_id = self._queue.get(timeout=max(next_scan - time.monotonic(), 0))
+            except queue.Empty:
+                outbox_id = None
+            try:
+                with self.app.app_context():
+                    if outbox_id is not None:
+                        self.process(outbox_id)
+                    if time.monotonic() >= next_scan:
+                        next_scan = time.monotonic() + self.poll_interval
+                        self.run_once()
+            except Exception as e:
+                logger.error(f"Payment intent worker error: {str(e)}", exc_info=True)
+
+    def run_once(self) -> int:
+        """Processes the due outbox rows; needs an app context. Returns how many were claimed"""
+        processed = 0
+        try:
+            for outbox_id in PaymentIntentOutbox.due_ids(self.batch_size):
+                processed += self.process(outbox_id)
+        finally:
+            db.session.remove()
+        return processed
+
+    def process(self, outbox_id: int) -> bool:
+        """Claims one row and creates its PaymentIntent; needs an app context"""
+        purchase_id = None
+        try:
+            if not PaymentIntentOutbox.claim(outbox_id, self.lease_seconds):
+                return False
+            row = db.session.get(PaymentIntentOutbox, outbox_id)
+            purchase_id = row.purchase_id
+            params = self.payment_intent_params(row)
+            # Nenhuma transação fica aberta durante a chamada à Stripe
+            db.session.commit()
+
+            try:
+                payment_intent = stripe_gateway.create_payment_intent(**params)
+            except stripe.error.StripeError as e:
+                self._handle_failure(outbox_id, e, retryable=self._is_retryable(e))
+                return True
+
+            self._complete(outbox_id, payment_intent)
+            return True
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            if purchase_id is not None:
+                self._signal(purchase_id)
+            db.session.remove()
+
+    @staticmethod
+    def payment_intent_params(row: PaymentIntentOutbox) -> Dict:
+        return {
+            'amount': row.amount,
+            'currency': row.currency,
+            'metadata': {
+                'purchase_id': row.purchase_id,
+                'user_id': str(row.user_id)
+            },
+            'description': f'Lure E-commerce Purchase ID: {row.purchase_id}',
+            'automatic_payment_methods': {'enabled': True},
+            'idempotency_key': f"purchase-{row.purchase_id}",
+        }
+
+    def _complete(self, outbox_id: int, payment_intent) -> None:
+        row = db.session.get(PaymentIntentOutbox, outbox_id)
+        pending_status = PaymentStatus.get_by_name("Pending")
+        transaction = Transaction.query.filter_by(purchase_id=row.purchase_id).first()
+        if transaction:
+            transaction.gateway_payment_id = payment_intent.id
+            if pending_status:
+                transaction.payment_status_id = pending_status.id
+                order_summaries.set_payment_status([{
+                    "purchase_id": row.purchase_id, "payment_status_id": pending_status.id,
+                    "payment_status": pending_status.name, "gateway_payment_id": payment_intent.id,
+                }])
+        row.payment_intent_id = payment_intent.id
+        row.client_secret = payment_intent.client_secret
+        row.status = PaymentIntentOutbox.DONE
+        row.locked_until = None
+        row.last_error = None
+        db.session.commit()
+        logger.info(f"PaymentIntent {payment_intent.id} criado para a purchase {row.purchase_id} (tentativa {row.attempts})")
+
+    @staticmethod
+    def _is_retryable(error: stripe.error.StripeError) -> bool:
+        # Erros de rede (inclui circuito aberto), rate limit e 5xx; erros de validação (4xx) não mudam numa nova tentativa
+        if isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+            return True
+        return (error.http_status or 500) >= 500
+
+    def _handle_failure(self, outbox_id: int, error: Exception, retryable: bool) -> None:
+        row = db.session.get(PaymentIntentOutbox, outbox_id)
+        message = f"{type(error).__name__}: {str(error)}"
+        if retryable and row.attempts < self.max_attempts:
+            # Backoff exponencial com jitter
+            delay = self.retry_base_delay * 2 ** (row.attempts - 1) * random.uniform(0.5, 1.5)
+            row.schedule_retry(message, delay)
+        else:
+            row.status = PaymentIntentOutbox.FAILED
+            row.locked_until = None
+            row.last_error = message[:255]
+            failed_status = PaymentStatus.get_by_name("failed")
+            transaction = Transaction.query.filter_by(purchase_id=row.purchase_id).first()
+            if transaction and failed_status:
+                transaction.payment_status_id = failed_status.id
+                order_summaries.set_payment_status([{
+                    "purchase_id": row.purchase_id, "payment_status_id": failed_status.id,
+                    "payment_status": failed_status.name,
+                }])
+            # Sem PaymentIntent a compra nunca será paga: devolve o estoque reservado
+            inventory.release(row.purchase_id, "(PaymentIntent falhou)")
+            logger.error(f"PaymentIntent da purchase {row.purchase_id} falhou após {row.attempts} tentativa(s): {message}")
+        db.session.commit()
+
+
+payment_intent_worker = PaymentIntentWorker(
+    poll_interval=float(os.getenv("PAYMENT_OUTBOX_POLL_INTERVAL", "5")),
+    batch_size=int(os.getenv("PAYMENT_OUTBOX_BATCH_SIZE", "20")),
+    max_attempts=int(os.getenv("PAYMENT_OUTBOX_MAX_ATTEMPTS", "5")),
+)
+
+
+def init_payment_intent_worker(app):
+    """Starts the outbox thread in this process unless PAYMENT_OUTBOX_WORKER=false"""
+    start = os.getenv("PAYMENT_OUTBOX_WORKER", "true").lower() != "false"
+    payment_intent_worker.init_app(app, start=start)
+
+
+if __name__ == "__main__":
+    # Consumidor dedicado, para rodar com PAYMENT_OUTBOX_WORKER=false nos processos web
+    from api.app import application
+    payment_intent_worker.init_app(application, start=False)
+    logging.basicConfig(level=logging.INFO)
+    while True:
+        with application.app_context():
+            if not payment_intent_worker.run_once():
+                time.sleep(payment_intent_worker.poll_interval)
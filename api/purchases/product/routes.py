@@ -5,6 +5,7 @@ from api.purchases.product.model import PurchaseItem
 from api.purchases.purchase.model import Purchase # Importar APENAS a CLASSE Purchase
 from api.utils.security.jwt.decorators import token_required
 from api.utils.db.connection import db # Importar db para commit se necessário
+from api.purchases.summary import projection as order_summaries # Mantém order_summaries em dia
 import traceback
 import uuid
 
@@ -30,6 +31,7 @@ def handle_create_purchase_item(current_user_id):
         # Recalcular totais da compra pai
         purchase.calculate_totals()
         db.session.add(purchase)
+        order_summaries.refresh([purchase.id])
 
         db.session.commit() # Commit item E atualização da compra
         return jsonify({
@@ -86,6 +88,7 @@ def handle_update_purchase_item(current_user_id, item_id):
         # Recalcular totais da compra pai
         purchase.calculate_totals()
         db.session.add(purchase)
+        order_summaries.refresh([purchase.id])
 
         db.session.commit() # Commit item E atualização da compra
         return jsonify({
@@ -121,6 +124,7 @@ def handle_delete_purchase_item(current_user_id, item_id):
         # Recalcular totais da compra pai
         purchase.calculate_totals()
         db.session.add(purchase)
+        order_summaries.refresh([purchase.id])
 
         db.session.commit() # Commit deletion E atualização da compra
         return jsonify({"message": "Purchase item deleted successfully."}), 200
@@ -0,0 +1,228 @@
+from api.utils.db.connection import db
+from api.product.model import Product
+from api.currency.model import Currency
+from api.payment_status.model import PaymentStatus
+from api.transaction.method.model import TransactionMethod
+from api.purchases.purchase.model import Purchase
+from api.purchases.product.model import PurchaseItem
+from api.purchases.history.model import PurchaseHistory
+from api.transaction.payment.model import Transaction
+from api.purchases.outbox.model import PaymentIntentOutbox
+from api.purchases.summary import projection as order_summaries
+from api.address.model import Address
+from decimal import Decimal, InvalidOperation
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert
+from typing import Dict, List, Optional, Tuple
+import pytz
+
+# ID 'c1b9f8f0-5c0c-4c9f-8c7b-9d6b4e2f3a1d' é "Credit Card" no setup inicial; usado se 'stripe' não existir
+FALLBACK_METHOD_ID = 'c1b9f8f0-5c0c-4c9f-8c7b-9d6b4e2f3a1d'
+
+
+class CheckoutError(ValueError):
+    """Validation error of the checkout pricing stage; status_code is the HTTP status to answer with"""
+
+    def __init__(self, message: str, status_code: int = 400, details: Optional[Dict] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details or {}
+
+
+class PricedLine:
+    def __init__(self, product_id: int, size_id: Optional[int], quantity: int, unit_price: Decimal,
+                 name: Optional[str] = None):
+        self.product_id = product_id
+        self.name = name
+        self.size_id = size_id
+        self.quantity = quantity
+        self.unit_price = unit_price
+        self.total_price = unit_price * quantity
+
+
+class PricedCart:
+    """Server-side priced cart, ready to be written by write_purchase"""
+
+    def __init__(self, lines: List[PricedLine], currency_id: int, currency_code: str,
+                 shipping_cost: Decimal, taxes: Decimal):
+        self.lines = lines
+        self.currency_id = currency_id
+        self.currency_code = currency_code
+        self.shipping_cost = shipping_cost
+        self.taxes = taxes
+        self.subtotal = sum((line.total_price for line in lines), Decimal('0.00'))
+        self.total_amount = self.subtotal + shipping_cost + taxes
+
+    @property
+    def amount_in_cents(self) -> int:
+        return int(self.total_amount * 100)
+
+    @property
+    def quantities(self) -> Dict[int, int]:
+        """Units per product across lines, as reserved by the inventory reservation engine"""
+        quantities: Dict[int, int] = {}
+        for line in self.lines:
+            quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+        return quantities
+
+
+def _parse_decimal(value, field: str) -> Decimal:
+    try:
+        parsed = Decimal(str(value))
+    except (InvalidOperation, TypeError):
+        raise CheckoutError(f"Invalid format for {field}. Must be a valid number.")
+    if not parsed.is_finite() or parsed < 0:
+        raise CheckoutError(f"Invalid value for {field}.")
+    return parsed
+
+
+def price_cart(items_data: List[Dict], shipping_cost="0.00", taxes="0.00") -> PricedCart:
+    """
+    Prices a cart against the database in a single query.
+    All referenced products and their currency are loaded with one IN query; quantities, currency
+    and the unit price the customer saw are then validated in memory. Stock is not checked here:
+    api/purchases/reservation/engine.reserve takes it atomically when the purchase is written.
+    """
+    if not isinstance(items_data, list) or not items_data:
+        raise CheckoutError("No items provided for purchase")
+
+    requested = []
+    for item_data in items_data:
+        try:
+            product_id = int(item_data['product_id'])
+            quantity = item_data['quantity']
+            seen_price = item_data['unit_price_at_purchase']
+        except (KeyError, TypeError, ValueError):
+            raise CheckoutError("Invalid item data: product_id, quantity, and unit_price_at_purchase are required.")
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+            raise CheckoutError(f"Invalid quantity for product {product_id}.")
+        requested.append((product_id, item_data.get('size_id'), quantity,
+                          _parse_decimal(seen_price, 'unit_price_at_purchase')))
+
+    product_ids = {product_id for product_id, _, _, _ in requested}
+    rows = (
+        db.session.query(Product.id, Product.name, Product.price, Product.currency_id, Currency.code)
+        .join(Currency, Currency.id == Product.currency_id)
+        .filter(Product.id.in_(product_ids))
+        .all()
+    )
+    products = {row.id: row for row in rows}
+
+    missing = sorted(product_ids - products.keys())
+    if missing:
+        raise CheckoutError(f"Product with ID {missing[0]} not found", 404, {"missing_product_ids": missing})
+
+    currencies = {products[product_id].currency_id for product_id in product_ids}
+    if len(currencies) > 1:
+        raise CheckoutError("All items of a purchase must share the same currency.")
+
+    lines = []
+    changed_prices = {}
+    for product_id, size_id, quantity, seen_price in requested:
+        product = products[product_id]
+        if seen_price != product.price:
+            changed_prices[product_id] = str(product.price)
+        lines.append(PricedLine(product_id, size_id, quantity, product.price, product.name))
+
+    if changed_prices:
+        current_app.logger.warning(f"Checkout com preços desatualizados: {changed_prices}")
+        raise CheckoutError("Product prices have changed. Please review your cart.", 409,
+                            {"current_prices": changed_prices})
+
+    any_product = products[lines[0].product_id]
+    return PricedCart(
+        lines,
+        currency_id=any_product.currency_id,
+        currency_code=any_product.code,
+        shipping_cost=_parse_decimal(shipping_cost, 'shipping_cost'),
+        taxes=_parse_decimal(taxes, 'taxes'),
+    )
+
+
+AWAITING_INTENT_STATUS = "awaiting_intent"
+
+_reference_ids: Dict[str, int] = {}
+
+
+def get_reference_ids() -> Tuple[int, int]:
+    """(awaiting_intent payment status id, stripe transaction method id); reference rows are looked up once per worker"""
+    if 'awaiting_status_id' not in _reference_ids:
+        awaiting_status = PaymentStatus.get_by_name(AWAITING_INTENT_STATUS)
+        if not awaiting_status:
+            awaiting_status = PaymentStatus.create({
+                "name": AWAITING_INTENT_STATUS,
+                "description": "Purchase committed, Stripe PaymentIntent not created yet",
+            })
+        transaction_method = TransactionMethod.get_by_name("stripe") or TransactionMethod.query.get(FALLBACK_METHOD_ID)
+        if not transaction_method:
+            raise CheckoutError("Internal configuration error for transaction status/method.", 500)
+        _reference_ids['awaiting_status_id'] = awaiting_status.id
+        _reference_ids['method_id'] = transaction_method.id
+    return _reference_ids['awaiting_status_id'], _reference_ids['method_id']
+
+
+def write_purchase(cart: PricedCart, purchase_id: str, user_id: int, shipping_address_id: int,
+                   shipping_address: Optional[Address] = None) -> PaymentIntentOutbox:
+    """
+    Adds the Purchase, its PurchaseItems, the Transaction, the first PurchaseHistory entry, the
+    OrderSummary and the PaymentIntentOutbox row to the session as bulk INSERTs: one statement per
+    table, whatever the cart size. The transaction starts as awaiting_intent; the caller commits
+    and notifies the worker. shipping_address (already loaded by the caller) feeds the summary snapshot.
+    """
+    awaiting_status_id, method_id = get_reference_ids()
+    now = datetime.now(pytz.timezone('America/Sao_Paulo'))
+    session = db.session
+
+    session.execute(insert(Purchase), [{
+        "id": purchase_id,
+        "user_id": user_id,
+        "currency_id": cart.currency_id,
+        "shipping_address_id": shipping_address_id,
+        "subtotal": cart.subtotal,
+        "shipping_cost": cart.shipping_cost,
+        "taxes": cart.taxes,
+        "total_amount": cart.total_amount,
+        "created_at": now,
+        "updated_at": now,
+    }])
+    session.execute(insert(PurchaseItem), [{
+        "purchase_id": purchase_id,
+        "product_id": line.product_id,
+        "size_id": line.size_id,
+        "quantity": line.quantity,
+        "unit_price_at_purchase": line.unit_price,
+        "total_price": line.total_price,
+        "created_at": now,
+    } for line in cart.lines])
+    session.execute(insert(Transaction), [{
+        "user_id": user_id,
+        "purchase_id": purchase_id,
+        "method_id": method_id,
+        "amount": cart.total_amount,
+        "currency": cart.currency_code.upper(),
+        "currency_id": cart.currency_id,
+        "gateway_payment_id": None,
+        "payment_status_id": awaiting_status_id,
+        "created_at": now,
+        "updated_at": now,
+    }])
+    session.execute(insert(PurchaseHistory), [{
+        "purchase_id": purchase_id,
+        "created_by": f"user:{user_id}",
+        "created_at": now,
+    }])
+    if shipping_address is None:
+        shipping_address = session.get(Address, shipping_address_id)
+    order_summaries.insert_row(order_summaries.cart_row(
+        cart, purchase_id, user_id, shipping_address, awaiting_status_id, AWAITING_INTENT_STATUS, now
+    ))
+    outbox = PaymentIntentOutbox(
+        purchase_id=purchase_id,
+        user_id=user_id,
+        amount=cart.amount_in_cents,
+        currency=cart.currency_code.lower(),
+    )
+    session.add(outbox)
+    current_app.logger.info(f"Purchase {purchase_id} written with {len(cart.lines)} items in bulk")
+    return outbox
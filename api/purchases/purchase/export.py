@@ -0,0 +1,162 @@
+from api.utils.db.connection import db
+from api.utils.pagination import keyset_condition
+from api.payment_status.model import PaymentStatus
+from api.purchases.purchase.model import Purchase
+from api.transaction.payment.model import Transaction
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+import csv
+import io
+import json
+
+# Compras carregadas (com as relações) por consulta durante a exportação
+EXPORT_CHUNK_SIZE = 500
+
+CSV_COLUMNS = [
+    "purchase_id", "created_at", "user_id", "payment_status", "gateway_payment_id",
+    "subtotal", "shipping_cost", "taxes", "total_amount", "currency_id",
+    "item_id", "product_id", "product_name", "size_id", "quantity", "unit_price", "item_total",
+    "shipping_status", "tracking_number",
+    "street", "number", "city", "state", "zip_code", "country",
+]
+
+
+class PurchaseFilters:
+    """Filters of the admin purchase listing, parsed from the query string"""
+
+    def __init__(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 status_ids: Optional[List[int]] = None, user_id: Optional[int] = None):
+        self.since = since
+        self.until = until
+        self.status_ids = status_ids
+        self.user_id = user_id
+
+    @classmethod
+    def from_args(cls, args) -> 'PurchaseFilters':
+        """
+        since/until: ISO dates or datetimes, [since, until) on created_at.
+        status: comma-separated PaymentStatus names of the purchase's transactions.
+        Raises ValueError on a malformed value or an unknown status.
+        """
+        since = datetime.fromisoformat(args['since']) if args.get('since') else None
+        until = datetime.fromisoformat(args['until']) if args.get('until') else None
+        user_id = int(args['user_id']) if args.get('user_id') else None
+        status_ids = None
+        if args.get('status'):
+            names = {name.strip().lower() for name in args['status'].split(',') if name.strip()}
+            statuses = PaymentStatus.query.filter(db.func.lower(PaymentStatus.name).in_(names)).all()
+            unknown = names - {status.name.lower() for status in statuses}
+            if unknown:
+                raise ValueError(f"Unknown payment status: {', '.join(sorted(unknown))}")
+            status_ids = [status.id for status in statuses]
+        return cls(since, until, status_ids, user_id)
+
+    def apply(self, query):
+        # created_at usa o índice (created_at, id); o status vira um EXISTS pelo índice (purchase_id, payment_status_id)
+        if self.since:
+            query = query.filter(Purchase.created_at >= self.since)
+        if self.until:
+            query = query.filter(Purchase.created_at < self.until)
+        if self.user_id is not None:
+            query = query.filter(Purchase.user_id == self.user_id)
+        if self.status_ids:
+            query = query.filter(Purchase.transactions.any(Transaction.payment_status_id.in_(self.status_ids)))
+        return query
+
+
+def iter_purchases(filters: PurchaseFilters, options: List, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[Purchase]:
+    """
+    Newest-first purchases matching filters, loaded chunk_size at a time with keyset pagination on
+    (created_at, id). Each chunk is its own short query plus the selectinload queries of options, and
+    the session is emptied between chunks, so memory stays at one chunk whatever the number of rows.
+    """
+    after = None
+    while True:
+        query = filters.apply(Purchase.query)
+        if after is not None:
+            query = query.filter(keyset_condition((Purchase.created_at, Purchase.id), after))
+        chunk = (
+            query.options(*options)
+            .order_by(Purchase.created_at.desc(), Purchase.id.desc())
+            .limit(chunk_size)
+            .all()
+        )
+        if not chunk:
+            return
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        after = (chunk[-1].created_at, chunk[-1].id)
+        # Libera o identity map: sem isso a sessão acumularia todas as compras exportadas
+        db.session.expunge_all()
+
+
+def ndjson_rows(filters: PurchaseFilters, include_items=True, include_transactions=True,
+                include_address=True) -> Iterator[str]:
+    """One serialized purchase (same shape as the JSON listing) per line"""
+    options = Purchase.loader_options(include_items=include_items, include_transactions=include_transactions,
+                                      include_address=include_address)
+    for purchase in iter_purchases(filters, options):
+        data = purchase.serialize(include_items=include_items, include_transactions=include_transactions,
+                                  include_address=include_address)
+        yield json.dumps(data, separators=(",", ":")) + "\n"
+
+
+def csv_rows(filters: PurchaseFilters) -> Iterator[str]:
+    """Header, then one line per purchase item (a purchase without items gets a single line)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return value
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+
+    options = Purchase.loader_options(include_items=True, include_transactions=True,
+                                      include_shipping=True, include_address=True)
+    for purchase in iter_purchases(filters, options):
+        # A transação mais recente, sem depender da ordem em que a relação foi carregada
+        transaction = max(purchase.transactions, key=lambda t: (t.created_at, t.id), default=None)
+        shipping = purchase.shipping_status_rel
+        address = purchase.shipping_address_rel
+        head = [
+            purchase.id, purchase.created_at.isoformat() if purchase.created_at else "", purchase.user_id,
+            transaction.status_rel.name if transaction and transaction.status_rel else "",
+            transaction.gateway_payment_id if transaction else "",
+            purchase.subtotal, purchase.shipping_cost, purchase.taxes, purchase.total_amount, purchase.currency_id,
+        ]
+        tail = [
+            shipping.description if shipping else "", shipping.tracking_number if shipping else "",
+        ] + ([address.street, address.number, address.city, address.state, address.zip_code, address.country]
+             if address else [""] * 6)
+        for item in purchase.items or [None]:
+            middle = [
+                item.id, item.product_id, item.product_rel.name if item.product_rel else "", item.size_id,
+                item.quantity, item.unit_price_at_purchase, item.total_price,
+            ] if item else [""] * 7
+            writer.writerow(head + middle + tail)
+        yield flush()
+
+
+def buffered(rows: Iterator[str], size: int = 64 * 1024) -> Iterator[str]:
+    """Groups small rows into ~size pieces so the WSGI server does not write once per row"""
+    parts, length = [], 0
+    for row in rows:
+        parts.append(row)
+        length += len(row)
+        if length >= size:
+            yield "".join(parts)
+            parts, length = [], 0
+    if parts:
+        yield "".join(parts)
+
+
+# formato -> (Content-Type, extensão do arquivo)
+EXPORT_FORMATS: Dict[str, tuple] = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
@@ -1,8 +1,10 @@
 from api.utils.db.connection import db
 from datetime import datetime
 import pytz
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 from flask import current_app
+from sqlalchemy.orm import joinedload, selectinload
+from api.utils.pagination import keyset_condition
 from api.transaction.payment.model import Transaction
 from api.purchases.history.model import PurchaseHistory
 import uuid # Importar UUID
@@ -32,9 +34,17 @@ class Purchase(db.Model):
     # 1:1 com ShippingStatus
     shipping_status_rel = db.relationship('ShippingStatus', back_populates='purchase', uselist=False)
 
-    items = db.relationship('PurchaseItem', back_populates='purchase_rel', cascade="all, delete-orphan", lazy='dynamic')
-    history = db.relationship('PurchaseHistory', back_populates='purchase_rel', cascade="all, delete-orphan", lazy='dynamic')
-    transactions = db.relationship('Transaction', back_populates='purchase_rel', lazy='dynamic')
+    # Coleções comuns (não 'dynamic') para poderem ser carregadas com selectinload, ver loader_options
+    items = db.relationship('PurchaseItem', back_populates='purchase_rel', cascade="all, delete-orphan", order_by='PurchaseItem.id')
+    history = db.relationship('PurchaseHistory', back_populates='purchase_rel', cascade="all, delete-orphan", order_by='PurchaseHistory.created_at')
+    transactions = db.relationship('Transaction', back_populates='purchase_rel', order_by='[Transaction.created_at, Transaction.id]')
+
+    __table_args__ = (
+        # Paginação keyset do histórico de pedidos do usuário
+        db.Index('ix_purchases_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        # Listagem/exportação administrativa por período
+        db.Index('ix_purchases_created_at_id', 'created_at', 'id'),
+    )
 
     def __repr__(self):
         return f"<Purchase {self.id} by User {self.user_id} (Currency ID: {self.currency_id})>"
@@ -61,9 +71,9 @@ class Purchase(db.Model):
         if include_items:
              data["items"] = [item.serialize() for item in self.items]
         if include_history:
-             data["history"] = [hist.serialize() for hist in self.history.order_by(PurchaseHistory.created_at.asc())]
+             data["history"] = [hist.serialize() for hist in self.history]
         if include_transactions:
-             data["transactions"] = [trans.serialize() for trans in self.transactions.order_by(Transaction.created_at.asc())]
+             data["transactions"] = [trans.serialize() for trans in self.transactions]
         if include_shipping and self.shipping_status_rel:
              data["shipping_status"] = self.shipping_status_rel.serialize()
         if include_address and self.shipping_address_rel:
@@ -103,6 +113,52 @@ class Purchase(db.Model):
         """Retrieves all purchases for a specific user"""
         return cls.query.filter_by(user_id=user_id).order_by(cls.created_at.desc()).all()
 
+    @staticmethod
+    def loader_options(include_items=True, include_history=False, include_transactions=False,
+                       include_shipping=False, include_address=False) -> List:
+        """
+        selectinload plan for serialize() with the same flags: one query per included relation,
+        whatever the number of purchases, instead of lazy loads per purchase and per item.
+        """
+        from api.product import catalog
+        from api.purchases.product.model import PurchaseItem
+
+        options = []
+        if include_items:
+            options.append(selectinload(Purchase.items).options(
+                selectinload(PurchaseItem.product_rel).options(*catalog.eager_options()),
+                selectinload(PurchaseItem.size_rel),
+            ))
+        if include_history:
+            options.append(selectinload(Purchase.history))
+        if include_transactions:
+            options.append(selectinload(Purchase.transactions).options(
+                joinedload(Transaction.status_rel), joinedload(Transaction.method_rel), joinedload(Transaction.currency_rel)
+            ))
+        if include_shipping:
+            options.append(selectinload(Purchase.shipping_status_rel))
+        if include_address:
+            options.append(selectinload(Purchase.shipping_address_rel))
+        return options
+
+    @classmethod
+    def page_for_user(cls, user_id: int, limit: int, after: Optional[Tuple[datetime, str]] = None,
+                      options: Optional[List] = None) -> Tuple[List['Purchase'], bool]:
+        """
+        Newest-first page of a user's purchases with keyset pagination on (created_at, id):
+        `after` is the sort key of the last purchase of the previous page. Returns (purchases, has_more).
+        """
+        query = cls.query.filter(cls.user_id == user_id)
+        if after is not None:
+            query = query.filter(keyset_condition((cls.created_at, cls.id), after))
+        purchases = (
+            query.options(*(options or []))
+            .order_by(cls.created_at.desc(), cls.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        return purchases[:limit], len(purchases) > limit
+
     @classmethod
     def update(cls, purchase_id: str, data: Dict) -> Optional['Purchase']:
         """Updates an existing purchase"""
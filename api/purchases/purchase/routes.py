@@ -1,19 +1,18 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from sqlalchemy.exc import SQLAlchemyError
 from api.utils.db.connection import db
-from api.utils.security.jwt.decorators import token_required
-from api.user.model import User
+from api.utils.security.jwt.decorators import token_required, admin_required
+from api.utils.idempotency import idempotent
+from api.utils.pagination import decode_cursor, encode_cursor, parse_limit # Paginação keyset
 from api.address.model import Address # Para buscar o endereço de entrega
-from api.product.model import Product # Para buscar o produto e sua moeda/preço
-from api.currency.model import Currency # Para buscar a moeda
 from .model import Purchase # SEU MODELO DE PURCHASE
-from api.purchases.product.model import PurchaseItem # Para criar os itens da compra
-from api.transaction.payment.model import Transaction # Para registrar a transação
-from api.transaction.method.model import TransactionMethod # Para o método de pagamento (Stripe)
-from api.payment_status.model import PaymentStatus # Para o status inicial (pending)
-from api.purchases.history.model import PurchaseHistory # Para o histórico inicial
-from decimal import Decimal
-import stripe
+from .checkout import CheckoutError, price_cart, write_purchase # Precificação e gravação em lote do checkout
+from .export import EXPORT_FORMATS, PurchaseFilters, buffered, csv_rows, ndjson_rows # Exportação em streaming
+from api.purchases.outbox.model import PaymentIntentOutbox
+from api.purchases.summary.model import OrderSummary # Projeção para as listagens
+from api.purchases.reservation import engine as inventory # Reserva atômica de estoque
+from api.purchases.outbox.worker import payment_intent_worker # Cria os PaymentIntents fora da transação do checkout
+from datetime import datetime
 import os
 import uuid
 from dotenv import load_dotenv
@@ -23,15 +22,15 @@ import traceback # Para logs de erro mais detalhados
 # Idealmente, isso é feito uma vez na inicialização do app (api/app.py)
 load_dotenv() 
 
-# Configure a chave da API Stripe globalmente
-# Idealmente, isso é feito uma vez na inicialização do app (api/app.py)
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+# Quanto o /purchase/create espera pelo client_secret antes de responder 202 para polling
+PAYMENT_INTENT_WAIT_SECONDS = float(os.getenv("PAYMENT_INTENT_WAIT_SECONDS", "3"))
 
 # Mantendo o nome do blueprint como no seu projeto original
 purchase_bp = Blueprint('purchase', __name__,) # [ Original: purchase_bp ]
 
 @purchase_bp.route('/create', methods=['POST']) # [ Original: /create ]
 @token_required
+@idempotent() # Retentativas com o mesmo Idempotency-Key recebem a resposta original
 def handle_create_purchase(current_user_id):
     current_app.logger.info(f"--- Rota /purchase/create INICIADA para user_id: {current_user_id} ---")
     data = request.get_json()
@@ -55,211 +54,78 @@ def handle_create_purchase(current_user_id):
         current_app.logger.warning("<<< FALHA: shipping_address_id faltando.")
         return jsonify({"error": "Shipping address ID is required"}), 400
 
-    user = User.query.get(current_user_id)
-    if not user:
-        current_app.logger.error(f"<<< FALHA CRÍTICA: Usuário ID {current_user_id} (do token) não encontrado no DB.")
-        return jsonify({"error": "Authenticated user not found"}), 404 # Erro mais apropriado
-
-    shipping_address = Address.query.get(shipping_address_id)
-    if not shipping_address or shipping_address.user_id != user.id:
+    # Um único SELECT valida o endereço e que ele pertence ao usuário do token
+    shipping_address = Address.query.filter_by(id=shipping_address_id, user_id=current_user_id).first()
+    if not shipping_address:
         current_app.logger.warning(f"<<< FALHA: Endereço de entrega ID {shipping_address_id} inválido ou não pertence ao usuário.")
         return jsonify({"error": "Invalid shipping address or not owned by user"}), 400
-    
-    determined_currency_id = None
-    try:
-        first_item_data = items_data[0]
-        first_product_id = int(first_item_data['product_id'])
-        product_for_currency = Product.query.get(first_product_id)
-        if not product_for_currency:
-            current_app.logger.warning(f"<<< FALHA: Produto {first_product_id} (do primeiro item) não encontrado.")
-            return jsonify({"error": f"Product with ID {first_product_id} not found."}), 404
-        if not product_for_currency.currency_id:
-            current_app.logger.error(f"<<< ERRO INTERNO: Produto {first_product_id} não tem currency_id configurado!")
-            return jsonify({"error": "Internal configuration error: Product is missing currency information."}), 500
-        determined_currency_id = product_for_currency.currency_id
-        currency_object = Currency.query.get(determined_currency_id)
-        if not currency_object:
-            current_app.logger.error(f"<<< ERRO INTERNO: Currency ID {determined_currency_id} (do produto) não encontrado na tabela de moedas.")
-            return jsonify({"error": f"Internal configuration error: Currency with ID {determined_currency_id} not found."}), 500
-        currency_code_for_stripe = currency_object.code.lower()
-        current_app.logger.info(f"Currency ID {determined_currency_id} ({currency_code_for_stripe}) determinada para a compra.")
-    except (KeyError, IndexError, ValueError, TypeError) as e:
-        current_app.logger.error(f"<<< FALHA: Erro ao processar dados do item para determinar moeda: {e}")
-        return jsonify({"error": "Invalid or missing product data in items to determine currency."}), 400
 
     session = db.session()
     try:
-        # Usando o método create do seu modelo Purchase
-        # Certifique-se que Purchase.create() NÃO faz commit()
-        # Ele deve apenas retornar a instância para ser adicionada à sessão.
-        # O payload do Purchase.create precisa ser ajustado se ele não espera 'items' diretamente.
-        # Conforme seu model.py, Purchase.create espera: user_id, currency_id, subtotal, shipping_cost, taxes, total_amount
-        # Vamos calcular isso ANTES de chamar Purchase.create
-        
-        temp_subtotal = Decimal('0.00')
-        processed_purchase_items = []
-
-        for item_data in items_data:
-            product_id = item_data.get('product_id')
-            quantity = item_data.get('quantity')
-            # unit_price_at_purchase DEVE vir do frontend, baseado no preço que o usuário viu
-            unit_price_str = item_data.get('unit_price_at_purchase')
-
-            if not product_id or not isinstance(quantity, int) or quantity <= 0 or unit_price_str is None:
-                current_app.logger.warning(f"<<< FALHA: Dados de item inválidos: {item_data}")
-                raise ValueError("Invalid item data: product_id, quantity, and unit_price_at_purchase are required.")
-
-            product = Product.query.get(product_id)
-            if not product:
-                current_app.logger.warning(f"<<< FALHA: Produto ID {product_id} não encontrado no DB.")
-                raise ValueError(f"Product with ID {product_id} not found")
-            
-            # Aqui é um bom lugar para verificar o estoque, se essa lógica for reintroduzida
-            # if product.stock < quantity:
-            #     raise ValueError(f"Not enough stock for product {product.name}")
-
-            unit_price = Decimal(str(unit_price_str)) # Converter string para Decimal
-            item_total_price = unit_price * Decimal(quantity)
-            temp_subtotal += item_total_price
-
-            # Adicionamos à lista para criar PurchaseItem depois que Purchase tiver ID
-            processed_purchase_items.append({
-                "product_id": product.id,
-                "size_id": item_data.get('size_id'), # Assumindo que size_id vem do frontend
-                "quantity": quantity,
-                "unit_price_at_purchase": unit_price,
-                # product.stock -= quantity # Lógica de estoque movida/removida conforme sua observação
-            })
-        
-        # Converter shipping_cost e taxes para Decimal
-        try:
-            shipping_cost = Decimal(shipping_cost_str)
-            taxes = Decimal(taxes_str)
-        except Exception: # decimal.InvalidOperation
-            current_app.logger.warning(f"<<< FALHA: shipping_cost ou taxes com formato inválido: '{shipping_cost_str}', '{taxes_str}'")
-            raise ValueError("Invalid format for shipping_cost or taxes. Must be valid numbers.")
+        # Etapa de precificação: produtos e moeda em um único IN, validação em memória
+        cart = price_cart(items_data, shipping_cost_str, taxes_str)
+        currency_code_for_stripe = cart.currency_code.lower()
+        purchase_id = str(uuid.uuid4())
+        current_app.logger.info(f"Carrinho precificado: {len(cart.lines)} itens, total {cart.total_amount} {currency_code_for_stripe}")
+
+        # Purchase, PurchaseItems, Transaction (awaiting_intent), PurchaseHistory, OrderSummary e a linha do outbox
+        # em INSERTs em lote e um único commit; a Stripe é chamada pelo worker, fora desta transação
+        outbox = write_purchase(cart, purchase_id, current_user_id, shipping_address.id, shipping_address)
+        session.flush()
+        outbox_id = outbox.id
+        # Por último antes do commit: os UPDATEs condicionais seguram as linhas de estoque até lá
+        inventory.reserve(purchase_id, cart.quantities)
+        session.commit()
+        current_app.logger.info(f"Commit da Purchase ID {purchase_id} e entidades relacionadas realizado com sucesso.")
 
-        temp_total_amount = temp_subtotal + shipping_cost + taxes
-        
-        purchase_data_for_model = {
-            "user_id": user.id,
-            "currency_id": determined_currency_id,
-            "shipping_address_id": shipping_address.id, # Adicionado, se seu Purchase model precisar
-            "subtotal": temp_subtotal,
-            "shipping_cost": shipping_cost,
-            "taxes": taxes,
-            "total_amount": temp_total_amount,
+        response = {
+            "purchase_id": purchase_id,
+            "total_amount": str(cart.total_amount),
+            "currency": currency_code_for_stripe.upper(),
+            "shipping_cost": float(cart.shipping_cost),
+            "taxes": float(cart.taxes),
+            "payment_intent_url": f"/purchase/{purchase_id}/payment-intent",
         }
-        current_app.logger.debug(f"Dados para Purchase.create: {purchase_data_for_model}")
-        new_purchase = Purchase.create(purchase_data_for_model) # .create() do seu modelo
-        session.add(new_purchase)
-        session.flush() 
-        current_app.logger.info(f"Purchase ID {new_purchase.id} adicionada à sessão.")
-
-        for item_detail in processed_purchase_items:
-            item_detail_for_model = {
-                "purchase_id": new_purchase.id,
-                "product_id": item_detail["product_id"],
-                "size_id": item_detail["size_id"], # Adicione size_id
-                "quantity": item_detail["quantity"],
-                "unit_price_at_purchase": item_detail["unit_price_at_purchase"]
-            }
-            # Usando o método create do PurchaseItem model
-            new_pi = PurchaseItem.create(item_detail_for_model)
-            session.add(new_pi)
-        current_app.logger.info(f"{len(processed_purchase_items)} PurchaseItems adicionados à sessão para Purchase ID {new_purchase.id}.")
-
-        # -- Stripe PaymentIntent Creation --
+
+        # Daqui em diante a compra já está gravada: nenhuma resposta 5xx, senão o @idempotent libera a
+        # chave e uma nova tentativa do cliente criaria outra compra e outra reserva
         try:
-            amount_in_cents = int(new_purchase.total_amount * 100)
-            current_app.logger.debug(f"Criando PaymentIntent para Stripe: Valor={amount_in_cents} {currency_code_for_stripe}")
-            
-            payment_intent_params = {
-                'amount': amount_in_cents,
-                'currency': currency_code_for_stripe,
-                'metadata': {
-                    'purchase_id': str(new_purchase.id),
-                    'user_id': str(user.id)
-                },
-                'description': f'Lure E-commerce Purchase ID: {new_purchase.id}',
-                'automatic_payment_methods': {'enabled': True},
-            }
-            payment_intent = stripe.PaymentIntent.create(**payment_intent_params)
-            current_app.logger.info(f"PaymentIntent {payment_intent.id} criado na Stripe.")
-            current_app.logger.info(f"→ [Stripe] PI criado: id={payment_intent.id}, secret={payment_intent.client_secret[:5]}…")
-        except stripe.error.StripeError as e:
-            current_app.logger.error(f"Erro da Stripe ao criar PaymentIntent: {str(e)}")
-            session.rollback()
-            return jsonify({"error": f"Stripe error: {str(e)}"}), 500
+            # Espera curta pelo worker deste processo; sem conexão do pool presa durante a espera
+            payment_intent_worker.notify(outbox_id, purchase_id)
+            payment_intent_worker.wait_for(purchase_id, PAYMENT_INTENT_WAIT_SECONDS)
+            intent = PaymentIntentOutbox.get_for_purchase(purchase_id).serialize()
         except Exception as e:
-            current_app.logger.error(f"Erro genérico ao criar PaymentIntent: {str(e)} \n{traceback.format_exc()}")
-            session.rollback()
-            return jsonify({"error": f"Error creating PaymentIntent: {str(e)}"}), 500
-
-        # -- Local Transaction Record --
-        pending_status = PaymentStatus.query.filter_by(name="Pending").first()
-        # O ID 'c1b9f8f0-5c0c-4c9f-8c7b-9d6b4e2f3a1d' é "Credit Card" no seu setup inicial
-        # Seria melhor ter um método "Stripe" ou "Online Payment"
-        transaction_method = TransactionMethod.query.filter_by(name="stripe").first() 
-        if not transaction_method: # Fallback se "stripe" não existir, use "Credit Card"
-             transaction_method = TransactionMethod.query.get('c1b9f8f0-5c0c-4c9f-8c7b-9d6b4e2f3a1d')
-
-        if not pending_status or not transaction_method:
-            current_app.logger.error("<<< ERRO INTERNO: Status 'Pending' ou método de transação 'stripe'/'Credit Card' não encontrado.")
-            session.rollback()
-            return jsonify({"error": "Internal configuration error for transaction status/method."}), 500
-        
-        # Seu Transaction.create pode precisar ser ajustado para aceitar user_id
-        transaction_data_for_model = {
-            "purchase_id": new_purchase.id,
-            "user_id": user.id, # Adicionando user_id
-            "method_id": transaction_method.id,
-            "amount": new_purchase.total_amount,
-            "currency_id": determined_currency_id, 
-            "gateway_payment_id": payment_intent.id,
-            "payment_status_id": pending_status.id
-        }
-        current_app.logger.debug(f"Dados para Transaction.create: {transaction_data_for_model}")
-        # Usando o método create do Transaction model
-        new_transaction = Transaction.create(transaction_data_for_model)
-        session.add(new_transaction)
-        current_app.logger.info(f"Transaction local {new_transaction.id} (gateway: {payment_intent.id}) adicionada à sessão.")
-
-        # -- Purchase History --
-        history_data_for_model = {
-            "purchase_id": new_purchase.id,
-            "user_id": user.id, # Adicionando user_id, se seu PurchaseHistory.create suportar
-            "status_description": "Order placed by customer. Awaiting payment confirmation from Stripe.",
-            "created_by": f"user:{user.id}" # Exemplo
-        }
-        current_app.logger.debug(f"Dados para PurchaseHistory.create: {history_data_for_model}")
-        # Usando o método create do PurchaseHistory model
-        new_history_entry = PurchaseHistory.create(history_data_for_model)
-        session.add(new_history_entry)
-        current_app.logger.info(f"PurchaseHistory {new_history_entry.id} adicionado à sessão.")
-        
-        # Limpeza do carrinho (opcional, pode ser movido para após confirmação de pagamento via webhook)
-        # cart = Cart.query.filter_by(user_id=user.id).first()
-        # if cart:
-        #     CartItem.query.filter_by(cart_id=cart.id).delete()
-
-        session.commit()
-        current_app.logger.info(f"Commit da Purchase ID {new_purchase.id} e entidades relacionadas realizado com sucesso.")
-
+            current_app.logger.error(f"Erro ao aguardar o PaymentIntent da Purchase ID {purchase_id} já gravada: {str(e)} \n{traceback.format_exc()}")
+            intent = {"status": PaymentIntentOutbox.PENDING, "client_secret": None}
+
+        if intent["status"] == PaymentIntentOutbox.DONE:
+            return jsonify({
+                **response,
+                "message": "Purchase intent created successfully. Please confirm payment.",
+                "status": intent["status"],
+                "client_secret": intent["client_secret"],
+            }), 201
+        if intent["status"] == PaymentIntentOutbox.FAILED:
+            # 202 e não 502: a compra existe e a resposta fica guardada para as novas tentativas com a mesma chave
+            return jsonify({
+                **response,
+                "error": "Purchase created, but the payment intent could not be created.",
+                "status": intent["status"],
+                "client_secret": None,
+            }), 202
+
+        current_app.logger.info(f"PaymentIntent da Purchase ID {purchase_id} ainda pendente; cliente fará polling.")
         return jsonify({
-            "message": "Purchase intent created successfully. Please confirm payment.",
-            "purchase_id": str(new_purchase.id),
-            "client_secret": payment_intent.client_secret,
-            "total_amount": str(new_purchase.total_amount),
-            "currency": currency_code_for_stripe.upper(),
-            "shipping_cost": float(new_purchase.shipping_cost),
-            "taxes": float(new_purchase.taxes)
-        }), 201
-
-    except ValueError as ve: # Erros de validação de dados
-        current_app.logger.error(f"<<< ERRO de Validação (ValueError) durante criação da compra: {str(ve)} \n{traceback.format_exc()}")
+            **response,
+            "message": "Purchase created. Payment intent is being created; poll payment_intent_url for the client_secret.",
+            "status": intent["status"],
+            "client_secret": None,
+        }), 202
+
+    except CheckoutError as ce: # Erros de validação do carrinho (preço, moeda) e falta de estoque na reserva
+        current_app.logger.warning(f"<<< FALHA na precificação do carrinho: {str(ce)} {ce.details}")
         if session: session.rollback()
-        return jsonify({"error": str(ve)}), 400
+        return jsonify({"error": str(ce), **ce.details}), ce.status_code
     except SQLAlchemyError as e: # Erros específicos do SQLAlchemy (ex: constraint violations)
         current_app.logger.error(f"<<< ERRO de Banco de Dados (SQLAlchemyError) durante criação da compra: {str(e)} \n{traceback.format_exc()}")
         if session: session.rollback()
@@ -322,18 +188,59 @@ def get_purchase_details(current_user_id, purchase_id): # Nome da função origi
     return jsonify({"data": serialized_data}), 200
 
 
-# Rota GET para buscar todas as compras de um usuário (mantida do seu código original, sem alterações)
+@purchase_bp.route("/<string:purchase_id>/payment-intent", methods=["GET"])
+@token_required
+def get_payment_intent(current_user_id, purchase_id):
+    """Short poll for the client_secret of a purchase whose PaymentIntent is created by the outbox worker"""
+    intent = PaymentIntentOutbox.get_for_purchase(purchase_id)
+    if not intent:
+        return jsonify({"error": "Purchase not found"}), 404
+    if intent.user_id != current_user_id:
+        return jsonify({"error": "Not authorized to view this purchase"}), 403
+
+    data = intent.serialize()
+    response = jsonify({"data": data})
+    if data["status"] in (PaymentIntentOutbox.PENDING, PaymentIntentOutbox.PROCESSING):
+        response.headers["Retry-After"] = "1"
+    return response, 200
+
+
+# Histórico de pedidos do usuário, paginado por (created_at, id) e com carga antecipada das relações
 @purchase_bp.route("/user/me", methods=["GET"])
 @token_required
 def get_user_purchases(current_user_id): # Nome da função original era handle_get_all_user_purchases
+    """
+    Newest-first order history of the current user.
+    Query params: limit (default 20, max 100), cursor (next_cursor of the previous page) and the
+    include_* flags. The number of SQL statements does not depend on the page size.
+    """
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        after = None
+        if cursor:
+            created_at, purchase_id = decode_cursor(cursor, 2)
+            after = (datetime.fromisoformat(created_at), str(purchase_id))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+
     try:
-        purchases = Purchase.get_all_for_user(current_user_id)
         # Parâmetros de query opcionais para serialização
         include_shipping = request.args.get('include_shipping', 'false').lower() == 'true'
         include_transactions = request.args.get('include_transactions', 'true').lower() == 'true'
         include_items = request.args.get('include_items', 'true').lower() == 'true'
         include_address = request.args.get('include_address', 'false').lower() == 'true'
 
+        purchases, has_more = Purchase.page_for_user(
+            current_user_id, limit, after,
+            options=Purchase.loader_options(
+                include_items=include_items,
+                include_transactions=include_transactions,
+                include_shipping=include_shipping,
+                include_address=include_address,
+            ),
+        )
+
         serialized_purchases = []
         for p in purchases:
             data = p.serialize(
@@ -341,35 +248,115 @@ def get_user_purchases(current_user_id): # Nome da função original era handle_
                 include_transactions=include_transactions,
                 include_shipping=include_shipping
             )
-            # Incluir endereço de entrega se solicitado
-            if include_address and p.shipping_address_id:
-                addr = Address.query.get(p.shipping_address_id)
-                if addr:
-                    data['shipping_address'] = addr.serialize()
+            # Incluir endereço de entrega se solicitado (já carregado pelo selectinload)
+            if include_address and p.shipping_address_rel:
+                data['shipping_address'] = p.shipping_address_rel.serialize()
             serialized_purchases.append(data)
-        return jsonify({"data": serialized_purchases}), 200
+
+        next_cursor = None
+        if has_more:
+            last = purchases[-1]
+            next_cursor = encode_cursor([last.created_at, last.id])
+        return jsonify({
+            "data": serialized_purchases,
+            "pagination": {"limit": limit, "next_cursor": next_cursor, "has_more": has_more},
+        }), 200
     except Exception as e:
         current_app.logger.error(f"Failed to retrieve purchases for user {current_user_id}: {str(e)}")
         current_app.logger.error(traceback.format_exc())
         return jsonify({"error": "Failed to retrieve purchases due to an internal error."}), 500
 
 
+def _summary_page(user_id=None, filters=None):
+    """Keyset page of OrderSummary for the summary listings; 400 on a bad limit or cursor"""
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        after = None
+        if request.args.get('cursor'):
+            created_at, purchase_id = decode_cursor(request.args['cursor'], 2)
+            after = (datetime.fromisoformat(created_at), str(purchase_id))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+
+    filters = filters or PurchaseFilters()
+    rows, has_more = OrderSummary.page(
+        limit, after,
+        user_id=user_id if user_id is not None else filters.user_id,
+        status_ids=filters.status_ids, since=filters.since, until=filters.until,
+    )
+    next_cursor = encode_cursor([rows[-1].purchase_created_at, rows[-1].purchase_id]) if has_more else None
+    return jsonify({
+        "data": [row.serialize() for row in rows],
+        "pagination": {"limit": limit, "next_cursor": next_cursor, "has_more": has_more},
+    }), 200
+
+
+# Listagens a partir da projeção order_summaries: uma tabela indexada, sem joins
+@purchase_bp.route("/user/me/summaries", methods=["GET"])
+@token_required
+def get_user_purchase_summaries(current_user_id):
+    """Newest-first order summaries of the current user; limit and cursor as in /purchase/user/me"""
+    return _summary_page(user_id=current_user_id)
+
+
+@purchase_bp.route("/summaries", methods=["GET"])
+@token_required
+@admin_required
+def get_purchase_summaries(current_user_id):
+    """Order summaries for the admin dashboard; accepts the filters of GET /purchase/ plus limit and cursor"""
+    try:
+        filters = PurchaseFilters.from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return _summary_page(filters=filters)
+
+
 @purchase_bp.route('/', methods=['GET'])
 @token_required
+@admin_required
 def get_all_purchases(current_user_id):
     """
-    Retrieves all purchase records.
-    Primarily for admin dashboard use.
-    TODO: Add admin role verification.
+    Retrieves all purchase records, with customers' shipping addresses. Admin only.
+    Filters: since, until (ISO dates, [since, until) on created_at), status (payment status names,
+    comma-separated) and user_id. format=ndjson|csv streams the export in constant memory instead
+    of building one JSON array.
     """
     current_app.logger.info(f"--- Rota GET /purchase/ (get_all_purchases) INICIADA por user_id: {current_user_id} ---")
     try:
-        # Parameters to control the amount of related data returned
-        include_items = request.args.get('include_items', 'true').lower() == 'true'
-        include_transactions = request.args.get('include_transactions', 'true').lower() == 'true'
-        include_address = request.args.get('include_address', 'true').lower() == 'true'
+        filters = PurchaseFilters.from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        all_purchases = Purchase.query.order_by(Purchase.created_at.desc()).all()
+    # Parameters to control the amount of related data returned
+    include_items = request.args.get('include_items', 'true').lower() == 'true'
+    include_transactions = request.args.get('include_transactions', 'true').lower() == 'true'
+    include_address = request.args.get('include_address', 'true').lower() == 'true'
+
+    export_format = request.args.get('format', 'json').lower()
+    if export_format in EXPORT_FORMATS:
+        if export_format == 'csv':
+            rows = csv_rows(filters)
+        else:
+            rows = ndjson_rows(filters, include_items, include_transactions, include_address)
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        filename = f"purchases-{datetime.utcnow():%Y%m%d%H%M%S}.{extension}"
+        current_app.logger.info(f"Exportando compras em {export_format} para user_id: {current_user_id}")
+        return Response(
+            stream_with_context(buffered(rows)),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Accel-Buffering": "no"},
+        )
+    if export_format != 'json':
+        return jsonify({"error": f"Unsupported format '{export_format}'. Use json, ndjson or csv."}), 400
+
+    try:
+        all_purchases = (
+            filters.apply(Purchase.query)
+            .options(*Purchase.loader_options(include_items=include_items, include_transactions=include_transactions,
+                                              include_address=include_address))
+            .order_by(Purchase.created_at.desc())
+            .all()
+        )
         
         serialized_data = []
         for p in all_purchases:
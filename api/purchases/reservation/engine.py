@@ -0,0 +1,335 @@
+from api.utils.db.connection import db
+from api.product.model import Product
+from api.purchases.reservation.model import InventoryReservation, InventoryShard
+from api.purchases.purchase.checkout import CheckoutError
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, update
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import random
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Tempo para o pagamento ser confirmado antes de o estoque voltar a ficar disponível
+RESERVATION_TTL_SECONDS = int(os.getenv("INVENTORY_RESERVATION_TTL", "900"))
+# Passadas pelos shards de um produto quando as dicas de estoque lidas antes ficaram velhas
+TAKE_ATTEMPTS = 3
+
+
+def _take_from_product(product_id: int, quantity: int) -> bool:
+    # UPDATE condicional: nunca deixa o estoque negativo e não precisa de SELECT ... FOR UPDATE
+    result = db.session.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.inventory >= quantity)
+        .values(inventory=Product.inventory - quantity)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _take_from_shard(product_id: int, shard: int, quantity: int) -> bool:
+    result = db.session.execute(
+        update(InventoryShard)
+        .where(InventoryShard.product_id == product_id, InventoryShard.shard == shard,
+               InventoryShard.inventory >= quantity)
+        .values(inventory=InventoryShard.inventory - quantity)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _give_back(product_id: int, shard: Optional[int], quantity: int) -> None:
+    if shard is not None:
+        result = db.session.execute(
+            update(InventoryShard)
+            .where(InventoryShard.product_id == product_id, InventoryShard.shard == shard)
+            .values(inventory=InventoryShard.inventory + quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            return
+        # Shard removido depois da reserva (shard_product com 0): devolve ao contador do produto
+    db.session.execute(
+        update(Product)
+        .where(Product.id == product_id)
+        .values(inventory=Product.inventory + quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _take(product_id: int, quantity: int, shards: List[Tuple[int, int]]) -> List[Tuple[Optional[int], int]]:
+    """
+    Takes quantity units of a product and returns where they came from as (shard, units) parts;
+    an empty list if there is not enough stock. shards are (shard, inventory seen) hints, tried in
+    random order so concurrent buyers of a hot product spread over different rows. A hint can be
+    stale (another buyer took from that shard since it was read), so when the shards and the
+    product counter fall short the shard inventories are read again and the rest is retried, up to
+    TAKE_ATTEMPTS passes. Parts already taken when the stock runs out are given back before
+    returning, so callers that carry on (commit() during reconciliation) do not lose them.
+    """
+    if not shards:
+        return [(None, quantity)] if _take_from_product(product_id, quantity) else []
+
+    taken: Dict[int, int] = {}
+    remaining = quantity
+    for attempt in range(TAKE_ATTEMPTS):
+        for shard, seen in random.sample(shards, len(shards)):
+            units = min(remaining, seen)
+            if units > 0 and _take_from_shard(product_id, shard, units):
+                taken[shard] = taken.get(shard, 0) + units
+                remaining -= units
+                if remaining == 0:
+                    return list(taken.items())
+        if _take_from_product(product_id, remaining):
+            return list(taken.items()) + [(None, remaining)]
+        # Releitura: o estoque visto antes pode ter ido para outro comprador
+        shards = _shard_hints([product_id]).get(product_id, [])
+        if not shards:
+            break
+    for shard, units in taken.items():
+        _give_back(product_id, shard, units)
+    return []
+
+
+def _shard_hints(product_ids) -> Dict[int, List[Tuple[int, int]]]:
+    rows = (
+        db.session.query(InventoryShard.product_id, InventoryShard.shard, InventoryShard.inventory)
+        .filter(InventoryShard.product_id.in_(product_ids), InventoryShard.inventory > 0)
+        .all()
+    )
+    hints: Dict[int, List[Tuple[int, int]]] = {}
+    for row in rows:
+        hints.setdefault(row.product_id, []).append((row.shard, row.inventory))
+    return hints
+
+
+def reserve(purchase_id: str, quantities: Dict[int, int], ttl_seconds: Optional[int] = None) -> None:
+    """
+    Reserves the stock of a purchase inside the caller's transaction: one conditional UPDATE per
+    product (or per shard touched for hot products) and one bulk INSERT of the reservations.
+    Raises CheckoutError (409) listing the products without enough stock; the caller must roll back.
+    Products are taken in id order so two carts never wait on each other's rows in opposite order.
+    Run it as the last statement before the commit: row locks are held until then.
+    """
+    ttl_seconds = ttl_seconds or RESERVATION_TTL_SECONDS
+    hints = _shard_hints(quantities.keys())
+    expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+
+    rows = []
+    out_of_stock = []
+    for product_id in sorted(quantities):
+        parts = _take(product_id, quantities[product_id], hints.get(product_id, []))
+        if not parts:
+            out_of_stock.append(product_id)
+            continue
+        rows.extend({
+            "purchase_id": purchase_id,
+            "product_id": product_id,
+            "shard": shard,
+            "quantity": units,
+            "status": InventoryReservation.HELD,
+            "expires_at": expires_at,
+        } for shard, units in parts)
+
+    if out_of_stock:
+        raise CheckoutError("Not enough stock for some products.", 409, {"out_of_stock_product_ids": out_of_stock})
+    db.session.execute(insert(InventoryReservation), rows)
+
+
+def release(purchase_id: str, reason: str = "") -> int:
+    """
+    Returns the held units of a purchase to their counters; does not commit. Each reservation is
+    flipped with a conditional UPDATE first, so the webhook and the sweeper racing on the same
+    purchase never return the same units twice. Returns how many units were released.
+    """
+    held = (
+        db.session.query(InventoryReservation.id, InventoryReservation.product_id,
+                         InventoryReservation.shard, InventoryReservation.quantity)
+        .filter_by(purchase_id=purchase_id, status=InventoryReservation.HELD)
+        .all()
+    )
+    now = datetime.utcnow()
+    released = 0
+    for row in held:
+        flipped = db.session.execute(
+            update(InventoryReservation)
+            .where(InventoryReservation.id == row.id, InventoryReservation.status == InventoryReservation.HELD)
+            .values(status=InventoryReservation.RELEASED, released_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if flipped.rowcount == 1:
+            _give_back(row.product_id, row.shard, row.quantity)
+            released += row.quantity
+    if released:
+        logger.info(f"Reserva de estoque da purchase {purchase_id} liberada ({released} unidades) {reason}".rstrip())
+    return released
+
+
+def commit(purchase_id: str) -> bool:
+    """
+    Makes a paid purchase's reservations permanent; does not commit. Held reservations are flipped
+    with a conditional UPDATE, like release(); reservations already released (payment confirmed after
+    expiring, or the sweeper won the race) are taken again if the stock is still there. Returns False
+    when that fails, i.e. the purchase was paid but its stock was sold to someone else.
+    """
+    pending = (
+        db.session.query(InventoryReservation.id, InventoryReservation.product_id, InventoryReservation.quantity)
+        .filter(InventoryReservation.purchase_id == purchase_id,
+                InventoryReservation.status != InventoryReservation.COMMITTED)
+        .all()
+    )
+    fulfilled = True
+    for row in pending:
+        flipped = db.session.execute(
+            update(InventoryReservation)
+            .where(InventoryReservation.id == row.id, InventoryReservation.status == InventoryReservation.HELD)
+            .values(status=InventoryReservation.COMMITTED)
+            .execution_options(synchronize_session=False)
+        )
+        if flipped.rowcount == 1:
+            continue
+        parts = _take(row.product_id, row.quantity, _shard_hints([row.product_id]).get(row.product_id, []))
+        if not parts:
+            logger.error(f"Purchase {purchase_id} paga sem estoque: produto {row.product_id} "
+                         f"x{row.quantity} foi liberado e vendido antes do pagamento")
+            fulfilled = False
+            continue
+        # Reaproveita a linha liberada para a primeira parte; shards adicionais viram linhas novas
+        (shard, units), extra = parts[0], parts[1:]
+        db.session.execute(
+            update(InventoryReservation)
+            .where(InventoryReservation.id == row.id)
+            .values(status=InventoryReservation.COMMITTED, shard=shard, quantity=units, released_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        if extra:
+            db.session.execute(insert(InventoryReservation), [{
+                "purchase_id": purchase_id,
+                "product_id": row.product_id,
+                "shard": shard,
+                "quantity": units,
+                "status": InventoryReservation.COMMITTED,
+                "expires_at": datetime.utcnow(),
+            } for shard, units in extra])
+    return fulfilled
+
+
+def release_expired(limit: int = 100) -> int:
+    """Releases the held reservations past their expiry, one commit per purchase. Returns purchases released"""
+    purchase_ids = [
+        row.purchase_id for row in
+        db.session.query(InventoryReservation.purchase_id)
+        .filter(InventoryReservation.status == InventoryReservation.HELD,
+                InventoryReservation.expires_at < datetime.utcnow())
+        .distinct()
+        .limit(limit)
+        .all()
+    ]
+    for purchase_id in purchase_ids:
+        try:
+            release(purchase_id, "(expirada)")
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao liberar reserva expirada da purchase {purchase_id}: {str(e)}")
+    return len(purchase_ids)
+
+
+def available(product_ids) -> Dict[int, int]:
+    """Sellable units per product: the product counter plus its shards"""
+    stock = {row.id: row.inventory for row in
+             db.session.query(Product.id, Product.inventory).filter(Product.id.in_(product_ids)).all()}
+    for row in (db.session.query(InventoryShard.product_id, func.sum(InventoryShard.inventory).label("units"))
+                .filter(InventoryShard.product_id.in_(product_ids))
+                .group_by(InventoryShard.product_id)
+                .all()):
+        stock[row.product_id] = stock.get(row.product_id, 0) + int(row.units or 0)
+    return stock
+
+
+def shard_product(product_id: int, shards: int) -> Dict[int, int]:
+    """
+    Spreads a product's stock evenly over `shards` sub-counters (0 folds them back into the product
+    row) and commits. Rare admin operation, so it locks the product row and its shards while moving.
+    """
+    if shards < 0:
+        raise ValueError("shards must be zero or positive")
+    product = db.session.query(Product).filter_by(id=product_id).with_for_update().first()
+    if product is None:
+        raise ValueError(f"Product with ID {product_id} not found")
+    current = db.session.query(InventoryShard).filter_by(product_id=product_id).with_for_update().all()
+    total = product.inventory + sum(shard.inventory for shard in current)
+    for shard in current:
+        db.session.delete(shard)
+    db.session.flush()
+
+    if shards == 0:
+        product.inventory = total
+    else:
+        share, remainder = divmod(total, shards)
+        product.inventory = 0
+        db.session.add_all(
+            InventoryShard(product_id=product_id, shard=i, inventory=share + (1 if i < remainder else 0))
+            for i in range(shards)
+        )
+    db.session.commit()
+    logger.info(f"Estoque do produto {product_id} ({total} unidades) redistribuído em {shards} shard(s)")
+    return available([product_id])
+
+
+class ReservationSweeper:
+    """Background thread that releases expired reservations; one per gunicorn worker, safe to run in all of them"""
+
+    def __init__(self, interval: float = 30.0, batch_size: int = 100):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.app = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._stop = threading.Event()
+
+    def init_app(self, app, start: bool = True):
+        self.app = app
+        if start:
+            self.start()
+
+    def start(self):
+        # Threads não sobrevivem a um fork; reinicia no processo filho
+        if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="inventory-reservation-sweeper", daemon=True)
+        self._thread_pid = os.getpid()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # Atraso aleatório inicial para os workers não varrerem todos ao mesmo tempo
+        if self._stop.wait(random.uniform(0, self.interval)):
+            return
+        while True:
+            try:
+                with self.app.app_context():
+                    try:
+                        release_expired(self.batch_size)
+                    finally:
+                        db.session.remove()
+            except Exception as e:
+                logger.error(f"Inventory reservation sweeper error: {str(e)}", exc_info=True)
+            if self._stop.wait(self.interval):
+                return
+
+
+reservation_sweeper = ReservationSweeper(
+    interval=float(os.getenv("INVENTORY_RESERVATION_SWEEP_INTERVAL", "30")),
+)
+
+
+def init_reservation_sweeper(app):
+    """Starts the expired-reservation sweeper in this process unless INVENTORY_RESERVATION_SWEEPER=false"""
+    start = os.getenv("INVENTORY_RESERVATION_SWEEPER", "true").lower() != "false"
+    reservation_sweeper.init_app(app, start=start)
@@ -0,0 +1,64 @@
+from api.utils.db.connection import db
+from datetime import datetime
+import pytz
+from typing import Dict
+
+
+class InventoryShard(db.Model):
+    """
+    Sub-counter of a hot product's stock. Sharding a product moves its inventory into N rows so
+    concurrent checkouts decrement different rows instead of queueing on the product row lock.
+    A product's available stock is products.inventory plus the sum of its shards.
+    """
+    __tablename__ = "inventory_shards"
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    shard = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    inventory = db.Column(db.Integer, nullable=False, default=0)
+
+    product_rel = db.relationship('Product', back_populates='inventory_shards')
+
+    def __repr__(self):
+        return f"<InventoryShard product={self.product_id} shard={self.shard} inventory={self.inventory}>"
+
+
+class InventoryReservation(db.Model):
+    """
+    Units taken from a product (or one of its shards) for a purchase. Held until the payment
+    succeeds (committed) or fails/expires (released, units returned to the same counter).
+    """
+    __tablename__ = "inventory_reservations"
+
+    HELD = "held"
+    COMMITTED = "committed"
+    RELEASED = "released"
+
+    id = db.Column(db.Integer, primary_key=True)
+    purchase_id = db.Column(db.String(36), db.ForeignKey('purchases.id', ondelete='CASCADE'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    shard = db.Column(db.Integer, nullable=True) # None: unidades tiradas de products.inventory
+    quantity = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=HELD)
+    # UTC (naive), como os demais agendamentos
+    expires_at = db.Column(db.DateTime, nullable=False)
+    released_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(pytz.timezone('America/Sao_Paulo')))
+
+    __table_args__ = (
+        db.Index('ix_inventory_reservations_status_expires_at', 'status', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f"<InventoryReservation {self.id} purchase={self.purchase_id} product={self.product_id} qty={self.quantity} {self.status}>"
+
+    def serialize(self) -> Dict:
+        return {
+            "id": self.id,
+            "purchase_id": self.purchase_id,
+            "product_id": self.product_id,
+            "shard": self.shard,
+            "quantity": self.quantity,
+            "status": self.status,
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+            "released_at": self.released_at.isoformat() if self.released_at else None,
+        }
@@ -0,0 +1,95 @@
+from api.utils.db.connection import db
+from datetime import datetime
+import json
+import pytz
+from typing import Dict, List, Optional, Tuple
+from api.utils.pagination import keyset_condition
+
+
+class OrderSummary(db.Model):
+    """
+    Read model of a purchase: one denormalized row with the latest payment status, the shipping
+    status, the item count and JSON snapshots of the line items and the shipping address.
+    Written by api/purchases/summary/projection.py whenever the source rows change, so order
+    listings read one indexed table instead of joining purchases, items, products, transactions,
+    payment statuses, shipping status and addresses.
+    """
+    __tablename__ = "order_summaries"
+
+    purchase_id = db.Column(db.String(36), db.ForeignKey('purchases.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    currency_id = db.Column(db.Integer, nullable=False)
+    currency_code = db.Column(db.String(3), nullable=True)
+    subtotal = db.Column(db.Numeric(10, 2), nullable=False, default=0.0)
+    shipping_cost = db.Column(db.Numeric(10, 2), nullable=False, default=0.0)
+    taxes = db.Column(db.Numeric(10, 2), nullable=False, default=0.0)
+    total_amount = db.Column(db.Numeric(10, 2), nullable=False, default=0.0)
+    item_count = db.Column(db.Integer, nullable=False, default=0) # unidades, não linhas
+    line_items = db.Column(db.Text, nullable=False, default="[]") # JSON
+    payment_status_id = db.Column(db.Integer, nullable=True)
+    payment_status = db.Column(db.String(50), nullable=True)
+    gateway_payment_id = db.Column(db.String(255), nullable=True)
+    shipping_status_id = db.Column(db.Integer, nullable=True)
+    shipping_status = db.Column(db.String(256), nullable=True)
+    shipping_conclusion = db.Column(db.String(50), nullable=True)
+    tracking_number = db.Column(db.String(100), nullable=True)
+    estimated_delivery_date = db.Column(db.Date, nullable=True)
+    shipping_address = db.Column(db.Text, nullable=True) # JSON
+    purchase_created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(pytz.timezone('America/Sao_Paulo')), onupdate=lambda: datetime.now(pytz.timezone('America/Sao_Paulo')))
+
+    __table_args__ = (
+        db.Index('ix_order_summaries_user_id_created_at', 'user_id', 'purchase_created_at', 'purchase_id'),
+        db.Index('ix_order_summaries_created_at', 'purchase_created_at', 'purchase_id'),
+        db.Index('ix_order_summaries_payment_status_created_at', 'payment_status_id', 'purchase_created_at'),
+    )
+
+    def __repr__(self):
+        return f"<OrderSummary {self.purchase_id} status={self.payment_status}>"
+
+    def serialize(self) -> Dict:
+        return {
+            "purchase_id": self.purchase_id,
+            "user_id": self.user_id,
+            "currency_id": self.currency_id,
+            "currency_code": self.currency_code,
+            "subtotal": float(self.subtotal),
+            "shipping_cost": float(self.shipping_cost),
+            "taxes": float(self.taxes),
+            "total_amount": float(self.total_amount),
+            "item_count": self.item_count,
+            "items": json.loads(self.line_items) if self.line_items else [],
+            "payment_status_id": self.payment_status_id,
+            "payment_status": self.payment_status,
+            "gateway_payment_id": self.gateway_payment_id,
+            "shipping_status_id": self.shipping_status_id,
+            "shipping_status": self.shipping_status,
+            "shipping_conclusion": self.shipping_conclusion,
+            "tracking_number": self.tracking_number,
+            "estimated_delivery_date": self.estimated_delivery_date.isoformat() if self.estimated_delivery_date else None,
+            "shipping_address": json.loads(self.shipping_address) if self.shipping_address else None,
+            "created_at": self.purchase_created_at.isoformat() if self.purchase_created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+    @classmethod
+    def page(cls, limit: int, after: Optional[Tuple[datetime, str]] = None, user_id: Optional[int] = None,
+             status_ids: Optional[List[int]] = None, since: Optional[datetime] = None,
+             until: Optional[datetime] = None) -> Tuple[List['OrderSummary'], bool]:
+        """
+        Newest-first page of summaries, keyset-paginated on (purchase_created_at, purchase_id); each
+        filter combination is served by one of the table's composite indexes. Returns (rows, has_more).
+        """
+        query = cls.query
+        if user_id is not None:
+            query = query.filter(cls.user_id == user_id)
+        if status_ids:
+            query = query.filter(cls.payment_status_id.in_(status_ids))
+        if since:
+            query = query.filter(cls.purchase_created_at >= since)
+        if until:
+            query = query.filter(cls.purchase_created_at < until)
+        if after is not None:
+            query = query.filter(keyset_condition((cls.purchase_created_at, cls.purchase_id), after))
+        rows = query.order_by(cls.purchase_created_at.desc(), cls.purchase_id.desc()).limit(limit + 1).all()
+        return rows[:limit], len(rows) > limit
@@ -0,0 +1,260 @@
+"""
+Keeps order_summaries (api/purchases/summary/model.py) in step with the purchase tables.
+
+Writers call into this module inside their own transaction, before they commit:
+- checkout inserts the row straight from the priced cart (cart_row), with no extra reads;
+- payment status changes (PaymentIntent worker, Stripe webhooks, reconciliation) go through
+  set_payment_status, one executemany UPDATE per batch;
+- anything else (shipping status, item or transaction edits) calls refresh, which rebuilds the
+  rows of the given purchases from the source tables in a fixed number of queries.
+
+Backfill or repair the whole table with (from the repository root):
+    python -m api.purchases.summary.projection [--batch-size 500]
+"""
+from api.utils.db.connection import db
+from api.purchases.summary.model import OrderSummary
+from api.purchases.purchase.model import Purchase
+from api.transaction.payment.model import Transaction
+from api.shippings.status.model import ShippingStatus
+from api.product.model import Product
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import bindparam, delete, insert, update
+from sqlalchemy.orm import joinedload, selectinload
+from typing import Dict, Iterable, List, Optional
+import argparse
+import json
+import logging
+import pytz
+import time
+
+logger = logging.getLogger(__name__)
+
+# Colunas regravadas por refresh (tudo menos a chave)
+_COLUMNS = [column.name for column in OrderSummary.__table__.columns if column.name != "purchase_id"]
+
+
+def _money(value) -> float:
+    return float(value) if value is not None else 0.0
+
+
+def line_item(product_id: int, product_name: Optional[str], size_id: Optional[int], quantity: int,
+              unit_price: Decimal, total_price: Decimal) -> Dict:
+    """Snapshot of one purchase item, as stored in order_summaries.line_items"""
+    return {
+        "product_id": product_id,
+        "product_name": product_name,
+        "size_id": size_id,
+        "quantity": quantity,
+        "unit_price": _money(unit_price),
+        "total_price": _money(total_price),
+    }
+
+
+def address_snapshot(address) -> Optional[str]:
+    if address is None:
+        return None
+    return json.dumps({
+        "id": address.id,
+        "street": address.street,
+        "number": address.number,
+        "city": address.city,
+        "state": address.state,
+        "zip_code": address.zip_code,
+        "country": address.country,
+    }, separators=(",", ":"))
+
+
+def cart_row(cart, purchase_id: str, user_id: int, address, payment_status_id: int, payment_status: str,
+             created_at: datetime) -> Dict:
+    """Summary row of a purchase being written by checkout, built from the priced cart"""
+    return {
+        "purchase_id": purchase_id,
+        "user_id": user_id,
+        "currency_id": cart.currency_id,
+        "currency_code": cart.currency_code.upper(),
+        "subtotal": cart.subtotal,
+        "shipping_cost": cart.shipping_cost,
+        "taxes": cart.taxes,
+        "total_amount": cart.total_amount,
+        "item_count": sum(line.quantity for line in cart.lines),
+        "line_items": json.dumps([
+            line_item(line.product_id, line.name, line.size_id, line.quantity, line.unit_price, line.total_price)
+            for line in cart.lines
+        ], separators=(",", ":")),
+        "payment_status_id": payment_status_id,
+        "payment_status": payment_status,
+        "gateway_payment_id": None,
+        "shipping_status_id": None,
+        "shipping_status": None,
+        "shipping_conclusion": None,
+        "tracking_number": None,
+        "estimated_delivery_date": None,
+        "shipping_address": address_snapshot(address),
+        "purchase_created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def _purchase_row(purchase: Purchase, product_names: Dict[int, str], now: datetime) -> Dict:
+    transaction = purchase.transactions[-1] if purchase.transactions else None # a mais recente
+    shipping = purchase.shipping_status_rel
+    return {
+        "purchase_id": purchase.id,
+        "user_id": purchase.user_id,
+        "currency_id": purchase.currency_id,
+        "currency_code": purchase.currency_rel.code if purchase.currency_rel else None,
+        "subtotal": purchase.subtotal,
+        "shipping_cost": purchase.shipping_cost,
+        "taxes": purchase.taxes,
+        "total_amount": purchase.total_amount,
+        "item_count": sum(item.quantity for item in purchase.items),
+        "line_items": json.dumps([
+            line_item(item.product_id, product_names.get(item.product_id), item.size_id,
+                      item.quantity, item.unit_price_at_purchase, item.total_price)
+            for item in purchase.items
+        ], separators=(",", ":")),
+        "payment_status_id": transaction.payment_status_id if transaction else None,
+        "payment_status": transaction.status_rel.name if transaction and transaction.status_rel else None,
+        "gateway_payment_id": transaction.gateway_payment_id if transaction else None,
+        "shipping_status_id": shipping.id if shipping else None,
+        "shipping_status": shipping.description if shipping else None,
+        "shipping_conclusion": shipping.conclusion.name if shipping and shipping.conclusion else None,
+        "tracking_number": shipping.tracking_number if shipping else None,
+        "estimated_delivery_date": shipping.estimated_delivery_date if shipping else None,
+        "shipping_address": address_snapshot(purchase.shipping_address_rel),
+        "purchase_created_at": purchase.created_at,
+        "updated_at": now,
+    }
+
+
+def build_rows(purchase_ids: Iterable[str]) -> List[Dict]:
+    """Summary rows of the given purchases from the source tables: one query per relation, whatever the count"""
+    purchase_ids = list(set(purchase_ids))
+    if not purchase_ids:
+        return []
+    purchases = (
+        Purchase.query
+        .filter(Purchase.id.in_(purchase_ids))
+        .options(
+            joinedload(Purchase.currency_rel),
+            selectinload(Purchase.items),
+            selectinload(Purchase.transactions).joinedload(Transaction.status_rel),
+            selectinload(Purchase.shipping_status_rel).joinedload(ShippingStatus.conclusion),
+            selectinload(Purchase.shipping_address_rel),
+        )
+        .execution_options(populate_existing=True) # o chamador pode ter alterado linhas ainda não expiradas
+        .all()
+    )
+    # Só o nome do produto entra no snapshot; evita carregar Product (e as faixas de estoque) inteiro
+    product_ids = {item.product_id for purchase in purchases for item in purchase.items}
+    product_names = dict(
+        db.session.query(Product.id, Product.name).filter(Product.id.in_(product_ids)).all()
+    ) if product_ids else {}
+    now = datetime.now(pytz.timezone('America/Sao_Paulo'))
+    return [_purchase_row(purchase, product_names, now) for purchase in purchases]
+
+
+def _upsert(rows: List[Dict]) -> None:
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(OrderSummary)
+        stmt = stmt.on_duplicate_key_update({name: stmt.inserted[name] for name in _COLUMNS})
+    elif dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(OrderSummary)
+        stmt = stmt.on_conflict_do_update(index_elements=["purchase_id"],
+                                          set_={name: stmt.excluded[name] for name in _COLUMNS})
+    else:
+        db.session.execute(delete(OrderSummary).where(OrderSummary.purchase_id.in_([row["purchase_id"] for row in rows])))
+        stmt = insert(OrderSummary)
+    db.session.execute(stmt, rows)
+
+
+def refresh(purchase_ids: Iterable[str]) -> int:
+    """Rebuilds (upserts) the summary rows of the given purchases; the caller commits. Returns how many were written"""
+    rows = build_rows(purchase_ids) # o autoflush inclui as alterações pendentes do chamador
+    if rows:
+        _upsert(rows)
+    return len(rows)
+
+
+def refresh_purchase(purchase_id: str) -> None:
+    """Rebuilds one purchase's row after a write to its transactions or shipping status; the caller commits"""
+    refresh([purchase_id])
+
+
+def insert_row(row: Dict) -> None:
+    """Adds a row built by cart_row to the caller's transaction"""
+    db.session.execute(insert(OrderSummary), [row])
+
+
+def set_payment_status(changes: List[Dict]) -> None:
+    """
+    Applies payment status changes without rebuilding the rows: one executemany UPDATE keyed by
+    purchase_id. Each change has purchase_id, payment_status_id, payment_status and optionally
+    gateway_payment_id. Purchases without a summary row yet are left to refresh/rebuild.
+    """
+    if not changes:
+        return
+    now = datetime.now(pytz.timezone('America/Sao_Paulo'))
+    table = OrderSummary.__table__
+    # Agrupa por conjunto de colunas: o executemany exige os mesmos parâmetros em todas as linhas.
+    # UPDATE do Core, e não o bulk update do ORM, para que compras ainda sem resumo não sejam erro
+    by_columns: Dict[tuple, List[Dict]] = {}
+    for change in changes:
+        params = {"b_purchase_id": change["purchase_id"], "payment_status_id": change["payment_status_id"],
+                  "payment_status": change["payment_status"], "updated_at": now}
+        if change.get("gateway_payment_id") is not None: # não apaga o id já gravado
+            params["gateway_payment_id"] = change["gateway_payment_id"]
+        by_columns.setdefault(tuple(sorted(params)), []).append(params)
+    for columns, params in by_columns.items():
+        stmt = (
+            update(table)
+            .where(table.c.purchase_id == bindparam("b_purchase_id"))
+            .values({name: bindparam(name) for name in columns if name != "b_purchase_id"})
+        )
+        db.session.execute(stmt, params)
+
+
+def rebuild(batch_size: int = 500) -> int:
+    """Backfills every purchase in batches, committing per batch; needs an app context. Returns rows written"""
+    written = 0
+    last_id = None
+    try:
+        while True:
+            query = db.session.query(Purchase.id)
+            if last_id is not None:
+                query = query.filter(Purchase.id > last_id)
+            ids = [row.id for row in query.order_by(Purchase.id).limit(batch_size).all()]
+            if not ids:
+                break
+            written += refresh(ids)
+            db.session.commit()
+            db.session.expunge_all()
+            last_id = ids[-1]
+            logger.info(f"order_summaries: {written} linhas reconstruídas")
+    finally:
+        db.session.remove()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    from api.app import application
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    with application.app_context():
+        written = rebuild(args.batch_size)
+    print(f"{written} order summaries rebuilt in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+from api.utils.db.connection import db
+from datetime import datetime, timedelta
+import pytz
+from typing import Dict, List
+from flask import current_app
+
+class StripeWebhookEvent(db.Model):
+    """
+    Inbox of verified Stripe webhook events. The webhook route only inserts the raw event (the
+    primary key is Stripe's event id, so redeliveries are dropped) and ACKs; StripeWebhookWorker
+    applies the events in batches.
+    """
+    __tablename__ = "stripe_webhook_events"
+
+    PENDING = "pending"
+    PROCESSING = "processing"
+    PROCESSED = "processed"
+    IGNORED = "ignored"
+    FAILED = "failed"
+
+    id = db.Column(db.String(255), primary_key=True) # evt_... da Stripe
+    type = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text(length=16777215), nullable=False) # evento bruto já verificado (MEDIUMTEXT no MySQL)
+    status = db.Column(db.String(20), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    claim_token = db.Column(db.String(32), nullable=True, index=True)
+    # Agendamento em UTC (naive)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    processed_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(pytz.timezone('America/Sao_Paulo')))
+
+    __table_args__ = (
+        db.Index('ix_stripe_webhook_events_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f"<StripeWebhookEvent {self.id} {self.type} status={self.status}>"
+
+    def serialize(self) -> Dict:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "attempts": self.attempts,
+            "processed_at": self.processed_at.isoformat() if self.processed_at else None,
+            "last_error": self.last_error,
+        }
+
+    @classmethod
+    def claim_batch(cls, token: str, limit: int = 100, lease_seconds: int = 60) -> List['StripeWebhookEvent']:
+        """
+        Atomically takes up to limit due events for this worker and returns them in arrival order:
+        pending and due, or processing with an expired lease (worker died). The conditional UPDATE
+        marks the rows with token, so concurrent workers never get the same event.
+        """
+        now = datetime.utcnow()
+        due = db.or_(
+            db.and_(cls.status == cls.PENDING, cls.next_attempt_at <= now),
+            db.and_(cls.status == cls.PROCESSING, cls.locked_until < now),
+        )
+        ids = [row.id for row in db.session.query(cls.id).filter(due).order_by(cls.next_attempt_at).limit(limit).all()]
+        if not ids:
+            db.session.commit()
+            return []
+        cls.query.filter(cls.id.in_(ids)).filter(due).update({
+            cls.status: cls.PROCESSING,
+            cls.claim_token: token,
+            cls.locked_until: now + timedelta(seconds=lease_seconds),
+            cls.attempts: cls.attempts + 1,
+        }, synchronize_session=False)
+        db.session.commit()
+        return cls.query.filter_by(claim_token=token, status=cls.PROCESSING).order_by(cls.created_at).all()
+
+    def schedule_retry(self, error: str, delay_seconds: float) -> None:
+        self.status = self.PENDING
+        self.claim_token = None
+        self.locked_until = None
+        self.last_error = error[:255]
+        self.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay_seconds)
+        current_app.logger.warning(f"Evento Stripe {self.id} reagendado em {delay_seconds:.0f}s: {error}")
@@ -0,0 +1,227 @@
+from api.utils.db.connection import db
+from api.purchases.webhook.model import StripeWebhookEvent
+from api.purchases.history.model import PurchaseHistory
+from api.purchases.reservation import engine as inventory
+from api.purchases.summary import projection as order_summaries
+from api.transaction.payment.model import Transaction
+from api.payment_status.model import PaymentStatus
+from datetime import datetime
+from sqlalchemy import insert
+from typing import Dict, List, Optional
+import json
+import logging
+import os
+import pytz
+import random
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Tipo de evento -> nome do PaymentStatus aplicado à Transaction
+HANDLED_EVENTS = {
+    "payment_intent.succeeded": "Paid",
+    "payment_intent.payment_failed": "failed",
+}
+
+
+class StripeWebhookWorker:
+    """
+    Applies the StripeWebhookEvent inbox in batches, outside the webhook request.
+
+    Each gunicorn worker runs one daemon thread, woken by the webhook route right after it stores an
+    event and by a periodic scan. A batch bulk-loads the transactions it touches by gateway_payment_id
+    (or the purchase_id in the PaymentIntent metadata), applies the status changes, inventory
+    commits/releases, PurchaseHistory entries and order summary updates, and marks the events done
+    in one transaction.
+    If the batch fails, its events are retried one by one so a bad event cannot block the rest.
+    """
+
+    def __init__(self, poll_interval: float = 5.0, batch_size: int = 100, max_attempts: int = 5,
+                 lease_seconds: int = 60, retry_base_delay: float = 5.0):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.retry_base_delay = retry_base_delay
+        self.app = None
+        self.enabled = False
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._stop = threading.Event()
+
+    def init_app(self, app, start: bool = True):
+        self.app = app
+        self.enabled = start
+        if start:
+            self.start()
+
+    def start(self):
+        # Threads não sobrevivem a um fork; reinicia no processo filho
+        if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stripe-webhook-worker", daemon=True)
+        self._thread_pid = os.getpid()
+        self._thread.start()
+        logger.info(f"Stripe webhook worker started (pid {self._thread_pid})")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def notify(self) -> None:
+        """Wakes this process's thread after an event was stored; no-op when a dedicated consumer runs instead"""
+        if not self.enabled:
+            return
+        if self._thread_pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            self.start()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    # Drena a fila enquanto vierem lotes cheios (rajada após uma indisponibilidade)
+                    while self.run_once() == self.batch_size and not self._stop.is_set():
+                        pass
+            except Exception as e:
+                logger.error(f"Stripe webhook worker error: {str(e)}", exc_info=True)
+
+    def run_once(self) -> int:
+        """Claims and applies one batch; needs an app context. Returns how many events were claimed"""
+        try:
+            events = StripeWebhookEvent.claim_batch(uuid.uuid4().hex, self.batch_size, self.lease_seconds)
+            if not events:
+                return 0
+            event_ids = [event.id for event in events]
+            try:
+                self.apply(events)
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"Lote de {len(event_ids)} eventos Stripe falhou ({str(e)}); aplicando um a um")
+                for event_id in event_ids:
+                    self._apply_one(event_id)
+            return len(event_ids)
+        finally:
+            db.session.remove()
+
+    def _apply_one(self, event_id: str) -> None:
+        try:
+            self.apply([db.session.get(StripeWebhookEvent, event_id)])
+        except Exception as e:
+            db.session.rollback()
+            event = db.session.get(StripeWebhookEvent, event_id)
+            message = f"{type(e).__name__}: {str(e)}"
+            if event.attempts < self.max_attempts:
+                # Backoff exponencial com jitter
+                event.schedule_retry(message, self.retry_base_delay * 2 ** (event.attempts - 1) * random.uniform(0.5, 1.5))
+            else:
+                event.status = StripeWebhookEvent.FAILED
+                event.claim_token = None
+                event.locked_until = None
+                event.last_error = message[:255]
+                logger.error(f"Evento Stripe {event_id} falhou após {event.attempts} tentativa(s): {message}")
+            db.session.commit()
+
+    def apply(self, events: List[StripeWebhookEvent]) -> None:
+        """Applies claimed events and marks them processed/ignored in a single commit"""
+        parsed = []
+        for event in events:
+            payload = json.loads(event.payload)
+            parsed.append((payload.get("created", 0), event, payload["data"]["object"]))
+        # A Stripe não garante a ordem de entrega; aplica na ordem em que os eventos aconteceram
+        parsed.sort(key=lambda item: item[0])
+
+        handled = [(event, obj) for _, event, obj in parsed if event.type in HANDLED_EVENTS]
+        payment_intent_ids = {obj.get("id") for _, obj in handled if obj.get("id")}
+        purchase_ids = {(obj.get("metadata") or {}).get("purchase_id") for _, obj in handled} - {None}
+        transactions = Transaction.query.filter(db.or_(
+            Transaction.gateway_payment_id.in_(payment_intent_ids),
+            Transaction.purchase_id.in_(purchase_ids),
+        )).all() if handled else []
+        by_payment_intent = {tx.gateway_payment_id: tx for tx in transactions if tx.gateway_payment_id}
+        by_purchase = {tx.purchase_id: tx for tx in transactions}
+        status_ids: Dict[str, int] = {
+            status.name: status.id
+            for status in PaymentStatus.query.filter(PaymentStatus.name.in_(set(HANDLED_EVENTS.values()))).all()
+        } if handled else {}
+
+        now = datetime.utcnow()
+        history_rows = []
+        summary_changes: Dict[str, Dict] = {} # purchase_id -> último status aplicado no lote
+        for _, event, obj in parsed:
+            event.claim_token = None
+            event.locked_until = None
+            event.processed_at = now
+            if event.type not in HANDLED_EVENTS:
+                event.status = StripeWebhookEvent.IGNORED
+                continue
+
+            transaction = by_payment_intent.get(obj.get("id")) or by_purchase.get((obj.get("metadata") or {}).get("purchase_id"))
+            status_id = status_ids.get(HANDLED_EVENTS[event.type])
+            if transaction is None or status_id is None:
+                event.status = StripeWebhookEvent.IGNORED
+                event.last_error = "Transaction not found" if transaction is None else f"PaymentStatus {HANDLED_EVENTS[event.type]} not found"
+                logger.warning(f"Evento Stripe {event.id} ignorado: {event.last_error}")
+                continue
+
+            if event.type == "payment_intent.succeeded":
+                transaction.payment_status_id = status_id
+                transaction.gateway_payment_id = transaction.gateway_payment_id or obj.get("id")
+                inventory.commit(transaction.purchase_id)
+            elif transaction.payment_status_id == status_ids.get(HANDLED_EVENTS["payment_intent.succeeded"]):
+                # Falha de uma tentativa anterior entregue depois do sucesso: não desfaz o pagamento
+                event.status = StripeWebhookEvent.IGNORED
+                event.last_error = "Stale event: transaction already paid"
+                continue
+            else:
+                transaction.payment_status_id = status_id
+                inventory.release(transaction.purchase_id, "(pagamento falhou)")
+
+            event.status = StripeWebhookEvent.PROCESSED
+            summary_changes[transaction.purchase_id] = {
+                "purchase_id": transaction.purchase_id,
+                "payment_status_id": status_id,
+                "payment_status": HANDLED_EVENTS[event.type],
+                "gateway_payment_id": transaction.gateway_payment_id,
+            }
+            history_rows.append({
+                "purchase_id": transaction.purchase_id,
+                "created_by": f"stripe:{event.type}"[:50],
+                "created_at": datetime.now(pytz.timezone('America/Sao_Paulo')),
+            })
+
+        if history_rows:
+            db.session.execute(insert(PurchaseHistory), history_rows)
+        order_summaries.set_payment_status(list(summary_changes.values()))
+        db.session.commit()
+        logger.info(f"{len(parsed)} eventos Stripe aplicados ({len(history_rows)} alteraram transações)")
+
+
+stripe_webhook_worker = StripeWebhookWorker(
+    poll_interval=float(os.getenv("STRIPE_WEBHOOK_POLL_INTERVAL", "5")),
+    batch_size=int(os.getenv("STRIPE_WEBHOOK_BATCH_SIZE", "100")),
+    max_attempts=int(os.getenv("STRIPE_WEBHOOK_MAX_ATTEMPTS", "5")),
+)
+
+
+def init_stripe_webhook_worker(app):
+    """Starts the webhook inbox thread in this process unless STRIPE_WEBHOOK_WORKER=false"""
+    start = os.getenv("STRIPE_WEBHOOK_WORKER", "true").lower() != "false"
+    stripe_webhook_worker.init_app(app, start=start)
+
+
+if __name__ == "__main__":
+    # Consumidor dedicado, para rodar com STRIPE_WEBHOOK_WORKER=false nos processos web
+    from api.app import application
+    stripe_webhook_worker.init_app(application, start=False)
+    logging.basicConfig(level=logging.INFO)
+    while True:
+        with application.app_context():
+            if not stripe_webhook_worker.run_once():
+                time.sleep(stripe_webhook_worker.poll_interval)
@@ -3,7 +3,6 @@ from flask import request, jsonify, Blueprint, make_response, current_app
 from api.scraping.model import Scraping, create_scraping, get_scraping, update_scraping, delete_scraping, validate_email_provider, update_password, login_scraping, update_scraping_password, get_email_contact_type_id
 from api.scraping.type.model import ContactType
 from sqlalchemy.exc import IntegrityError
-from api.utils.security.DDOS import ddos_protection
 import uuid
 from api.utils.security.DDOS.cookie_manager import CookieManager
 from datetime import datetime
@@ -38,7 +37,6 @@ def validate_contact_value_unique(contact_value: str, exclude_id: int = None) ->
 
 # Create
 @blueprint.route("/create", methods=["POST"])
-@ddos_protection(max_requests=50, window=5)
 def create():
     data = request.get_json()
     if not data:
@@ -57,6 +57,8 @@ def create_shipping_status(status_data: Dict) -> ShippingStatus:
             address_id=status_data.get("address_id")
         )
         db.session.add(shipping_status)
+        from api.purchases.summary import projection as order_summaries # import local: a projeção importa este modelo
+        order_summaries.refresh_purchase(shipping_status.purchase_id)
         db.session.commit()
         current_app.logger.info(f"Status de envio criado com sucesso para purchase {status_data['purchase_id']}.")
         return shipping_status
@@ -82,6 +84,8 @@ def update_shipping_status(status_id: int, status_data: Dict) -> Optional[Shippi
                 updated = True
 
         if updated:
+            from api.purchases.summary import projection as order_summaries
+            order_summaries.refresh_purchase(shipping_status.purchase_id)
             db.session.commit()
             current_app.logger.info(f"Status de envio ID {status_id} atualizado com sucesso.")
         else:
@@ -97,7 +101,10 @@ def delete_shipping_status(status_id: int) -> bool:
     shipping_status = find_shipping_status_by_id(status_id)
     if shipping_status:
         try:
+            purchase_id = shipping_status.purchase_id
             db.session.delete(shipping_status)
+            from api.purchases.summary import projection as order_summaries
+            order_summaries.refresh_purchase(purchase_id)
             db.session.commit()
             current_app.logger.info(f"Status de envio ID {status_id} deletado.")
             return True
@@ -119,6 +126,8 @@ def update_shipping_details(status_id: int, tracking_number: str, estimated_deli
     try:
         shipping_status.tracking_number = tracking_number
         shipping_status.estimated_delivery_date = estimated_delivery_date
+        from api.purchases.summary import projection as order_summaries
+        order_summaries.refresh_purchase(shipping_status.purchase_id)
         db.session.commit()
         current_app.logger.info(f"Detalhes de envio ID {status_id} atualizados com sucesso.")
         return shipping_status
@@ -1,4 +1,5 @@
 from api.utils.db.connection import db
+from api.utils.catalog_cache import bump_catalog_version
 from datetime import datetime
 import pytz
 from typing import Dict, Optional
@@ -34,6 +35,7 @@ def create_size(size_data: Dict) -> Optional[Size]:
             long_name=size_data["long_name"]
         )
         db.session.add(size)
+        bump_catalog_version()
         db.session.commit()
         current_app.logger.info(f"Size created successfully: {size.name}")
         return size
@@ -52,6 +54,7 @@ def update_size(size_id: int, size_data: Dict) -> Optional[Size]:
     if size:
         for key, value in size_data.items():
             setattr(size, key, value)
+        bump_catalog_version()
         db.session.commit()
         return size
     return None
@@ -61,6 +64,7 @@ def delete_size(size_id: int) -> Optional[Size]:
     size = get_size(size_id)
     if size:
         db.session.delete(size)
+        bump_catalog_version()
         db.session.commit()
         return size
     return None
\ No newline at end of file
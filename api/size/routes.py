@@ -2,6 +2,7 @@ from flask import request, jsonify, Blueprint
 from api.size.model import Size, create_size, get_size, update_size, delete_size
 from api.Database.connection import db
 from api.utils.decorators import token_required
+from api.utils.catalog_cache import catalog_cache
 
 blueprint = Blueprint('size', __name__)
 
@@ -24,24 +25,27 @@ def create(current_user_id):
         "message": "Size created successfully."
     }), 201
 
+def _load_size(id):
+    size = get_size(id)
+    return size.serialize() if size else None
+
 # Read
 @blueprint.route("/read/<int:id>", methods=["GET"])
 @token_required
 def read(current_user_id, id):
-    size = get_size(id)
-    if size is None:
+    size_data = catalog_cache.get_or_load(f"size:{id}", lambda: _load_size(id))
+    if size_data is None:
         return jsonify({"error": "Size not found"}), 404
 
     return jsonify({
-        "data": size.serialize(),
+        "data": size_data,
         "message": "Size retrieved successfully."
     }), 200
 
 @blueprint.route("/read/all", methods=["GET"])
 @token_required
 def read_all(current_user_id):
-    sizes = Size.query.all()
-    sizes_data = [size.serialize() for size in sizes]
+    sizes_data = catalog_cache.get_or_load("sizes:all", lambda: [size.serialize() for size in Size.query.all()])
 
     return jsonify({
         "data": sizes_data,
@@ -1,27 +1,35 @@
 import os
 import stripe
 from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.exc import IntegrityError
 from api.utils.db.connection import db
-from api.transaction.payment.model import Transaction
-from api.payment_status.model import PaymentStatus
+from api.purchases.webhook.model import StripeWebhookEvent
+from api.purchases.webhook.worker import stripe_webhook_worker
+from api.utils.payments import stripe_gateway  # noqa: F401 - configura a chave e o cliente HTTP da Stripe
 import json
 
-# Configure Stripe API key to match the purchase routes module
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
-
 # Blueprint for Stripe webhooks
 tmp = Blueprint
 stripe_webhook_bp = Blueprint("stripe_webhook", __name__)
 
 @stripe_webhook_bp.route("/create", methods=["POST"])
 def handle_stripe_webhook():
+    """
+    Verifies the event, stores it in the stripe_webhook_events inbox and ACKs. Transactions, stock
+    and purchase history are updated by StripeWebhookWorker, so a burst of redeliveries after a
+    Stripe outage costs one INSERT per event here. Redeliveries of a stored event are ACKed and dropped.
+    """
     payload = request.get_data()
     sig_header = request.headers.get("Stripe-Signature")
     endpoint_secret = os.getenv("STRIPE_WEBHOOK_SECRET")
 
     # Em desenvolvimento, pule a verificação de assinatura
     if os.getenv("FLASK_ENV") == "development":
-        event = json.loads(payload)
+        try:
+            event = json.loads(payload)
+        except ValueError as e:
+            current_app.logger.error(f"Invalid payload: {e}")
+            return jsonify({"error": "Invalid payload"}), 400
     else:
         try:
             event = stripe.Webhook.construct_event(payload, sig_header, endpoint_secret)
@@ -32,30 +40,20 @@ def handle_stripe_webhook():
             current_app.logger.error(f"Invalid signature: {e}")
             return jsonify({"error": "Invalid signature"}), 400
 
-    event_type = event["type"]
-    data = event["data"]["object"]
-    current_app.logger.info(f"Received Stripe event: {event_type}")
+    try:
+        event_id, event_type = event["id"], event["type"]
+    except (KeyError, TypeError):
+        return jsonify({"error": "Invalid payload"}), 400
 
-    # Handle PaymentIntent events
-    if event_type == "payment_intent.succeeded":
-        pi_id = data.get("id")
-        transaction = Transaction.get_by_gateway_id(pi_id)
-        if transaction:
-            status = PaymentStatus.get_by_name("Paid")
-            if status:
-                transaction.payment_status_id = status.id
-                db.session.commit()
-                current_app.logger.info(f"Transaction {transaction.id} marked succeeded.")
-    elif event_type == "payment_intent.payment_failed":
-        pi_id = data.get("id")
-        transaction = Transaction.get_by_gateway_id(pi_id)
-        if transaction:
-            status = PaymentStatus.get_by_name("failed")
-            if status:
-                transaction.payment_status_id = status.id
-                db.session.commit()
-                current_app.logger.info(f"Transaction {transaction.id} marked failed.")
-    else:
-        current_app.logger.info(f"Ignoring event type: {event_type}")
+    try:
+        # Chave primária = id do evento: reentregas da Stripe não são processadas de novo
+        db.session.add(StripeWebhookEvent(id=event_id, type=event_type, payload=payload.decode("utf-8")))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        current_app.logger.info(f"Duplicate Stripe event {event_id} ({event_type}) ignored")
+        return jsonify({"received": True, "duplicate": True}), 200
 
-    return jsonify({"received": True}), 200 
\ No newline at end of file
+    current_app.logger.info(f"Received Stripe event: {event_type} ({event_id})")
+    stripe_webhook_worker.notify()
+    return jsonify({"received": True}), 200
@@ -30,6 +30,11 @@ class Transaction(db.Model):
     status_rel = db.relationship('PaymentStatus', back_populates='transactions')
     currency_rel = db.relationship('Currency', back_populates='transactions')
 
+    __table_args__ = (
+        # Filtro por status da exportação de compras (EXISTS por purchase_id)
+        db.Index('ix_transactions_purchase_id_payment_status_id', 'purchase_id', 'payment_status_id'),
+    )
+
     def __repr__(self):
         return f"<Transaction {self.id} for Purchase {self.purchase_id}>"
 
@@ -76,6 +81,8 @@ class Transaction(db.Model):
             )
             # Add validation if needed
             db.session.add(transaction)
+            from api.purchases.summary import projection as order_summaries # import local: a projeção importa este modelo
+            order_summaries.refresh_purchase(transaction.purchase_id)
             db.session.commit()
             current_app.logger.info(f"Transaction {transaction.id} created successfully for purchase {transaction.purchase_id}")
             return transaction
@@ -112,6 +119,8 @@ class Transaction(db.Model):
                      transaction.gateway_payment_id = data["gateway_payment_id"]
                 # Add other updatable fields as needed
                 # Add validation if needed
+                from api.purchases.summary import projection as order_summaries
+                order_summaries.refresh_purchase(transaction.purchase_id)
                 db.session.commit()
                 current_app.logger.info(f"Transaction ID {transaction_id} updated.")
                 return transaction
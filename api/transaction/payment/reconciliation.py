@@ -0,0 +1,241 @@
+"""
+Repairs Transaction.payment_status_id from Stripe when webhooks were missed.
+
+Pages through PaymentIntents with Stripe's list API (cursor = last id of the page), joins each page
+against the local transactions in memory and writes the corrections in batched UPDATEs. Memory is
+bounded by one page plus one batch of pending corrections, whatever the number of intents.
+
+Usage (from the repository root):
+    python -m api.transaction.payment.reconciliation [--since 2026-10-01] [--until 2026-10-18]
+        [--page-size 100] [--batch-size 500] [--dry-run] [--watch 3600]
+
+STRIPE_API_BASE points it at a local Stripe stand-in.
+"""
+from api.utils.db.connection import db
+from api.utils.payments import stripe_gateway
+from api.transaction.payment.model import Transaction
+from api.payment_status.model import PaymentStatus
+from api.purchases.history.model import PurchaseHistory
+from api.purchases.reservation import engine as inventory
+from api.purchases.reservation.model import InventoryReservation
+from api.purchases.summary import projection as order_summaries
+from datetime import datetime, timezone
+from sqlalchemy import insert, update
+from typing import Dict, Iterator, List, Optional
+import argparse
+import logging
+import pytz
+import time
+
+logger = logging.getLogger(__name__)
+
+PAID = "Paid"
+FAILED = "failed"
+PENDING = "Pending"
+
+
+def _field(obj, key: str):
+    # StripeObject não tem .get(); campos ausentes levantam KeyError
+    try:
+        return obj[key]
+    except (KeyError, TypeError):
+        return None
+
+
+def expected_status(payment_intent) -> Optional[str]:
+    """Local PaymentStatus name for a PaymentIntent state; None when the local status should be left alone"""
+    status = payment_intent["status"]
+    if status == "succeeded":
+        return PAID
+    if status == "canceled":
+        return FAILED
+    if status == "requires_payment_method":
+        # Também é o estado inicial; só conta como falha se houve uma tentativa recusada
+        return FAILED if _field(payment_intent, "last_payment_error") else PENDING
+    if status in ("processing", "requires_confirmation", "requires_action", "requires_capture"):
+        return PENDING
+    return None
+
+
+class PaymentReconciler:
+    """
+    Streams PaymentIntents and corrects the matching Transaction rows.
+    Paid transactions are never downgraded: a paid row that Stripe reports otherwise is counted
+    as a conflict and logged for a human to look at.
+    """
+
+    def __init__(self, page_size: int = 100, batch_size: int = 500, dry_run: bool = False):
+        self.page_size = min(max(page_size, 1), 100) # limite da API de listagem da Stripe
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self._pending: List[Dict] = []
+        self._status_ids: Dict[str, int] = {}
+        self.stats: Dict[str, int] = {}
+
+    def _pages(self, created: Optional[Dict]) -> Iterator[List]:
+        starting_after = None
+        while True:
+            params = {"limit": self.page_size}
+            if created:
+                params["created"] = created
+            if starting_after:
+                params["starting_after"] = starting_after
+            page = stripe_gateway.list_payment_intents(**params)
+            if not page.data:
+                return
+            yield page.data
+            if not page.has_more:
+                return
+            starting_after = page.data[-1].id
+
+    def run(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict[str, int]:
+        """Reconciles every PaymentIntent created in [since, until]; needs an app context. Returns counters"""
+        self.stats = {"pages": 0, "intents": 0, "matched": 0, "unknown": 0, "in_sync": 0,
+                      "corrected": 0, "conflicts": 0}
+        self._status_ids = {
+            status.name: status.id
+            for status in PaymentStatus.query.filter(PaymentStatus.name.in_([PAID, FAILED, PENDING])).all()
+        }
+        missing = {PAID, FAILED, PENDING} - self._status_ids.keys()
+        if missing:
+            raise RuntimeError(f"PaymentStatus not found: {', '.join(sorted(missing))}")
+
+        created = {}
+        if since:
+            created["gte"] = int(since.replace(tzinfo=since.tzinfo or timezone.utc).timestamp())
+        if until:
+            created["lte"] = int(until.replace(tzinfo=until.tzinfo or timezone.utc).timestamp())
+
+        try:
+            for payment_intents in self._pages(created):
+                self.stats["pages"] += 1
+                self.stats["intents"] += len(payment_intents)
+                self._reconcile_page(payment_intents)
+                if len(self._pending) >= self.batch_size:
+                    self._flush()
+            self._flush()
+        finally:
+            db.session.remove()
+        logger.info(f"Reconciliação concluída: {self.stats}")
+        return self.stats
+
+    def _reconcile_page(self, payment_intents: List) -> None:
+        # Hash join: um SELECT por página, indexado por gateway_payment_id
+        ids = [pi.id for pi in payment_intents]
+        rows = (
+            db.session.query(Transaction.id, Transaction.purchase_id, Transaction.gateway_payment_id,
+                             Transaction.payment_status_id)
+            .filter(Transaction.gateway_payment_id.in_(ids))
+            .all()
+        )
+        by_gateway_id = {row.gateway_payment_id: row for row in rows}
+
+        # Intents criados sem que o id chegasse à Transaction (worker caiu entre a Stripe e o commit)
+        orphan_purchase_ids = {
+            _field(_field(pi, "metadata"), "purchase_id"): pi.id
+            for pi in payment_intents if pi.id not in by_gateway_id
+        }
+        orphan_purchase_ids.pop(None, None)
+        if orphan_purchase_ids:
+            for row in (db.session.query(Transaction.id, Transaction.purchase_id, Transaction.gateway_payment_id,
+                                         Transaction.payment_status_id)
+                        .filter(Transaction.purchase_id.in_(orphan_purchase_ids.keys()),
+                                Transaction.gateway_payment_id.is_(None))
+                        .all()):
+                by_gateway_id[orphan_purchase_ids[row.purchase_id]] = row
+        db.session.commit() # não segura a transação de leitura entre páginas
+
+        paid_id = self._status_ids[PAID]
+        for pi in payment_intents:
+            row = by_gateway_id.get(pi.id)
+            if row is None:
+                self.stats["unknown"] += 1
+                continue
+            self.stats["matched"] += 1
+            expected = expected_status(pi)
+            if expected is None:
+                self.stats["in_sync"] += 1
+                continue
+            expected_id = self._status_ids[expected]
+            if row.payment_status_id == expected_id and row.gateway_payment_id == pi.id:
+                self.stats["in_sync"] += 1
+                continue
+            if row.payment_status_id == paid_id and expected != PAID:
+                self.stats["conflicts"] += 1
+                logger.warning(f"Transaction {row.id} está paga localmente, mas o PaymentIntent {pi.id} está {pi['status']}")
+                continue
+            self._pending.append({"id": row.id, "purchase_id": row.purchase_id, "gateway_payment_id": pi.id,
+                                  "status": expected, "payment_status_id": expected_id})
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self.stats["corrected"] += len(batch)
+        if self.dry_run:
+            for correction in batch:
+                logger.info(f"[dry-run] Transaction {correction['id']} -> {correction['status']} ({correction['gateway_payment_id']})")
+            return
+
+        # UPDATE em lote por chave primária (executemany)
+        db.session.execute(update(Transaction), [
+            {"id": c["id"], "payment_status_id": c["payment_status_id"], "gateway_payment_id": c["gateway_payment_id"]}
+            for c in batch
+        ])
+        # Só as compras com reservas ainda abertas precisam passar pelo motor de estoque
+        open_reservations = {
+            row.purchase_id for row in
+            db.session.query(InventoryReservation.purchase_id)
+            .filter(InventoryReservation.purchase_id.in_({c["purchase_id"] for c in batch}),
+                    InventoryReservation.status != InventoryReservation.COMMITTED)
+            .distinct()
+            .all()
+        }
+        for correction in batch:
+            if correction["purchase_id"] not in open_reservations:
+                continue
+            if correction["status"] == PAID:
+                inventory.commit(correction["purchase_id"])
+            elif correction["status"] == FAILED:
+                inventory.release(correction["purchase_id"], "(reconciliação)")
+        now = datetime.now(pytz.timezone('America/Sao_Paulo'))
+        db.session.execute(insert(PurchaseHistory), [
+            {"purchase_id": c["purchase_id"], "created_by": f"reconciliation:{c['status']}", "created_at": now}
+            for c in batch
+        ])
+        order_summaries.set_payment_status([
+            {"purchase_id": c["purchase_id"], "payment_status_id": c["payment_status_id"],
+             "payment_status": c["status"], "gateway_payment_id": c["gateway_payment_id"]}
+            for c in batch
+        ])
+        db.session.commit()
+        logger.info(f"{len(batch)} transações corrigidas a partir da Stripe")
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since", type=_parse_date, help="only intents created at or after this date (UTC)")
+    parser.add_argument("--until", type=_parse_date, help="only intents created at or before this date (UTC)")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="report corrections without writing them")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="keep running, one pass every SECONDS")
+    args = parser.parse_args()
+
+    from api.app import application
+    logging.basicConfig(level=logging.INFO)
+    reconciler = PaymentReconciler(args.page_size, args.batch_size, args.dry_run)
+    while True:
+        with application.app_context():
+            print(reconciler.run(args.since, args.until))
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+from api.utils.db.connection import db
+from datetime import datetime
+import pytz
+from typing import List
+from flask import current_app
+
+class RevokedToken(db.Model):
+    """JWTs revoked before their exp (logout, refresh-token). Authoritative store behind the per-worker Bloom filter"""
+    __tablename__ = "revoked_tokens"
+
+    jti = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    # exp do token em UTC (naive), como o PyJWT valida
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(pytz.timezone('America/Sao_Paulo')))
+
+    def __repr__(self):
+        return f"<RevokedToken {self.jti} user={self.user_id}>"
+
+    @classmethod
+    def revoke(cls, jti: str, user_id: int, expires_at: datetime) -> 'RevokedToken':
+        """Records a revoked jti, dropping rows whose tokens have already expired"""
+        try:
+            cls.query.filter(cls.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+            revoked = db.session.get(cls, jti)
+            if revoked is None:
+                revoked = cls(jti=jti, user_id=user_id, expires_at=expires_at)
+                db.session.add(revoked)
+            db.session.commit()
+            current_app.logger.info(f"Token {jti} of user {user_id} revoked until {expires_at}")
+            return revoked
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error revoking token {jti}: {str(e)}")
+            raise
+
+    @classmethod
+    def is_revoked(cls, jti: str) -> bool:
+        return db.session.query(cls.jti).filter(cls.jti == jti).first() is not None
+
+    @classmethod
+    def active_jtis(cls) -> List[str]:
+        """jti of every revoked token that has not expired yet"""
+        return [row.jti for row in db.session.query(cls.jti).filter(cls.expires_at > datetime.utcnow())]
@@ -1,26 +1,12 @@
 from flask import request, jsonify, Blueprint, current_app
 from api.user.model import User, create_user, get_user, update_user, delete_user
-from api.utils.security.jwt.decorators import token_required
-from api.utils.security.jwt.jwt_utils import generate_token, verify_token
-from functools import wraps
+from api.utils.security.jwt.decorators import token_required, get_bearer_token
+from api.utils.security.jwt.jwt_utils import generate_token
+from api.utils.security.jwt.revocation import revoke_token
 import traceback
 
 blueprint = Blueprint('user', __name__)
 
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = request.headers.get("Authorization")
-        if not token:
-            return jsonify({"message": "Token ausente!"}), 401
-
-        user_id = verify_token(token.split()[1] if token.startswith("Bearer ") else token)
-        if not user_id:
-            return jsonify({"message": "Token inválido ou expirado!"}), 401
-
-        return f(user_id, *args, **kwargs)
-    return decorated
-
 # Create or Login via OAuth data
 @blueprint.route("/create", methods=["POST"])
 def create_or_login_oauth():
@@ -246,8 +232,25 @@ def delete(current_user_id, id):
 @token_required
 def refresh_token(current_user_id):
     new_token = generate_token(current_user_id)
+    # O token antigo deixa de valer assim que o novo é emitido
+    try:
+        revoke_token(get_bearer_token())
+    except Exception as e:
+        current_app.logger.error(f"Erro ao revogar token antigo do usuário {current_user_id}: {str(e)}")
+        return jsonify({'error': 'Erro ao renovar token'}), 500
     return jsonify({'token': new_token}), 200
 
+@blueprint.route('/logout', methods=['POST'])
+@token_required
+def logout(current_user_id):
+    try:
+        revoked = revoke_token(get_bearer_token())
+    except Exception as e:
+        current_app.logger.error(f"Erro ao revogar token no logout do usuário {current_user_id}: {str(e)}")
+        return jsonify({'error': 'Erro ao encerrar sessão'}), 500
+    current_app.logger.info(f"Logout do usuário {current_user_id} (token revogado: {revoked})")
+    return jsonify({'message': 'Logout realizado com sucesso'}), 200
+
 @blueprint.route('/anonymous-token', methods=['GET'])
 def get_anonymous_token():
     try:
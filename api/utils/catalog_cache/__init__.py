@@ -0,0 +1 @@
+from .cache import CatalogCache, catalog_cache, bump_catalog_version
@@ -0,0 +1,252 @@
+from collections import OrderedDict
+from datetime import datetime
+from dotenv import load_dotenv
+from flask import current_app
+from sqlalchemy import event, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import time
+
+from api.utils.db.connection import db
+from api.utils.db.redis_connection import get_redis, redis
+from .model import CatalogVersion
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+VERSION_ROW = 1
+
+
+def bump_catalog_version() -> None:
+    """
+    Increments the catalog version inside the caller's transaction, so the mutation and the new
+    version are committed together. Call it right before the mutator's commit.
+    """
+    result = db.session.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.id == VERSION_ROW)
+        .values(version=CatalogVersion.version + 1, updated_at=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        # Banco criado sem a migração (create_all): a primeira mutação cria a linha
+        db.session.add(CatalogVersion(id=VERSION_ROW, version=1, updated_at=datetime.utcnow()))
+    db.session.info["catalog_version_bumped"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _version_committed(session):
+    # Este worker relê a versão na próxima leitura em vez de esperar o intervalo
+    if session.info.pop("catalog_version_bumped", False):
+        catalog_cache.mark_dirty()
+
+
+@event.listens_for(Session, "after_rollback")
+def _version_rolled_back(session):
+    session.info.pop("catalog_version_bumped", None)
+
+
+class CatalogCache:
+    """
+    Read-through cache of serialized catalog reads (products, categories, sizes, genders, image
+    categories), one per worker, with Redis as an optional shared L2.
+
+    Entries are tagged with the catalog version they were loaded under. The version lives in the
+    catalog_versions table and is re-read at most every check_interval seconds (one primary key
+    lookup), so a change made by another worker is visible after at most check_interval seconds;
+    the worker that made it sees it on its next read. L2 keys include the version, so they never
+    need to be deleted. Entries also expire after ttl (memory) and l2_ttl (Redis) seconds, which
+    bounds how stale the inventory shown in listings can get, since reservations and purchases
+    change stock without bumping the version.
+
+    Values are shared between requests and must be treated as read-only.
+    """
+
+    L2_PREFIX = "lure:catalog"
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 60.0, check_interval: float = 1.0,
+                 l2_ttl: int = 60, use_redis: bool = True, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.l2_ttl = l2_ttl
+        self.use_redis = use_redis
+        self.enabled = enabled and max_entries > 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[int, Any, float, float]]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._checked_at_wall: Optional[float] = None
+        self._changed_at_wall: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.version_checks = 0
+        self.version_errors = 0
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_errors = 0
+
+    def _ensure_process(self) -> None:
+        # Depois do fork do gunicorn cada worker começa com o cache vazio e um lock novo
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _l2(self):
+        return get_redis() if self.use_redis else None
+
+    def _l2_key(self, version: int, key: str) -> str:
+        return f"{self.L2_PREFIX}:{version}:{key}"
+
+    def mark_dirty(self) -> None:
+        """Forces the next read to re-check the version"""
+        self._checked_at = 0.0
+
+    def version(self) -> Optional[int]:
+        """Current catalog version, re-read from the database at most every check_interval seconds; None if unavailable"""
+        self._ensure_process()
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return self._version
+        try:
+            version = db.session.query(CatalogVersion.version).filter(CatalogVersion.id == VERSION_ROW).scalar() or 0
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            self.version_errors += 1
+            logger.error(f"Could not read the catalog version, bypassing the cache: {str(e)}")
+            return None
+        with self._lock:
+            self.version_checks += 1
+            self._checked_at = now
+            self._checked_at_wall = time.time()
+            if version != self._version:
+                if self._version is not None:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._version = version
+                self._changed_at_wall = time.time()
+        return version
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value of key for the current catalog version, loading it with loader()
+        on a miss. loader must return something jsonify can encode (None is cached too).
+        """
+        if not self.enabled:
+            return loader()
+        version = self.version()
+        if version is None:
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version and entry[2] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        found, value = self._l2_get(version, key)
+        if not found:
+            value = loader()
+            self._l2_set(version, key, value)
+        self._store(version, key, value)
+        return value
+
+    def _store(self, version: int, key: str, value: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            # Uma troca de versão durante o carregamento descarta o valor
+            if version != self._version:
+                return
+            self._entries[key] = (version, value, now + self.ttl, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _l2_get(self, version: int, key: str) -> Tuple[bool, Any]:
+        client = self._l2()
+        if client is None:
+            return False, None
+        try:
+            raw = client.get(self._l2_key(version, key))
+        except redis.RedisError as e:
+            self.l2_errors += 1
+            logger.error(f"Redis error reading the catalog cache: {str(e)}")
+            return False, None
+        if raw is None:
+            self.l2_misses += 1
+            return False, None
+        self.l2_hits += 1
+        return True, json.loads(raw)
+
+    def _l2_set(self, version: int, key: str, value: Any) -> None:
+        client = self._l2()
+        if client is None:
+            return
+        try:
+            # Mesmo encoder do jsonify (datas, Decimal), então a resposta vinda do L2 é idêntica
+            client.set(self._l2_key(version, key), current_app.json.dumps(value), ex=self.l2_ttl)
+        except redis.RedisError as e:
+            self.l2_errors += 1
+            logger.error(f"Redis error writing the catalog cache: {str(e)}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        self._ensure_process()
+        now = time.time()
+        with self._lock:
+            lookups = self.hits + self.misses
+            oldest = min((entry[3] for entry in self._entries.values()), default=None)
+            return {
+                "enabled": self.enabled,
+                "version": self._version,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "check_interval": self.check_interval,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "version_checks": self.version_checks,
+                "version_errors": self.version_errors,
+                # Atraso máximo para ver uma mudança feita por outro worker, e idade do que está em memória
+                "staleness": {
+                    "seconds_since_version_check": round(now - self._checked_at_wall, 3) if self._checked_at_wall else None,
+                    "seconds_since_version_change": round(now - self._changed_at_wall, 3) if self._changed_at_wall else None,
+                    "oldest_entry_age": round(now - oldest, 3) if oldest is not None else None,
+                },
+                "l2": {
+                    "enabled": self.use_redis and self._l2() is not None,
+                    "hits": self.l2_hits,
+                    "misses": self.l2_misses,
+                    "errors": self.l2_errors,
+                    "ttl": self.l2_ttl,
+                },
+            }
+
+
+catalog_cache = CatalogCache(
+    max_entries=int(os.getenv("CATALOG_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("CATALOG_CACHE_TTL", "60")),
+    check_interval=float(os.getenv("CATALOG_CACHE_VERSION_CHECK_INTERVAL", "1")),
+    l2_ttl=int(os.getenv("CATALOG_CACHE_REDIS_TTL", "60")),
+    use_redis=os.getenv("CATALOG_CACHE_REDIS", "true").lower() == "true",
+    enabled=os.getenv("CATALOG_CACHE", "true").lower() == "true",
+)
@@ -0,0 +1,19 @@
+from api.utils.db.connection import db
+from datetime import datetime
+
+
+class CatalogVersion(db.Model):
+    """
+    Single row (id=1) with the catalog version: every product, category, size, gender and image category
+    mutation increments it in its own transaction, and each worker's CatalogCache drops its entries when
+    it sees a new value.
+    """
+    __tablename__ = "catalog_versions"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    # UTC (naive), como as colunas de agendamento
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CatalogVersion {self.version}>"
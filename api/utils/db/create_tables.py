@@ -7,11 +7,16 @@ from api.image_category.model import ImageCategory
 from api.product.model import Product
 from api.size.model import Size
 from api.user.model import User
+from api.user.revoked_token.model import RevokedToken
 from api.scraping.model import Scraping
 from api.scraping.type.model import ContactType
 from api.purchases.history.model import PurchaseHistory
 from api.purchases.product.model import PurchaseItem
 from api.purchases.purchase.model import Purchase
+from api.purchases.outbox.model import PaymentIntentOutbox
+from api.purchases.reservation.model import InventoryReservation, InventoryShard
+from api.purchases.webhook.model import StripeWebhookEvent
+from api.purchases.summary.model import OrderSummary
 from api.transaction.payment.model import Transaction
 from api.transaction.method.model import TransactionMethod
 from api.payment_status.model import PaymentStatus
@@ -19,6 +24,8 @@ from api.currency.model import Currency
 from api.shippings.status.model import ShippingStatus
 from api.shippings.conclusion.model import ShippingConclusion
 from api.favorites.model import Favorite
+from api.utils.idempotency.model import IdempotencyKey
+from api.utils.catalog_cache.model import CatalogVersion
 
 from api.utils.db.connection import db
 from sqlalchemy import inspect
@@ -0,0 +1,40 @@
+from dotenv import load_dotenv
+from typing import Optional
+import logging
+import os
+
+try:
+    import redis
+except ImportError:  # redis é opcional: sem ele os módulos usam armazenamento em memória
+    redis = None
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+_client = None
+
+
+def redis_configured() -> bool:
+    """Returns True when the Redis server is configured in the environment"""
+    return redis is not None and bool(os.getenv("REDIS_HOST"))
+
+
+def get_redis() -> Optional["redis.Redis"]:
+    """Returns a shared Redis client for this worker, or None if Redis is not configured"""
+    global _client
+    if _client is not None:
+        return _client
+    if not redis_configured():
+        return None
+
+    _client = redis.Redis(
+        host=os.getenv("REDIS_HOST"),
+        port=int(os.getenv("REDIS_PORT") or 6379),
+        password=os.getenv("REDIS_PASSWORD") or None,
+        db=int(os.getenv("REDIS_DB") or 0),
+        socket_connect_timeout=float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.5")),
+        socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5")),
+        health_check_interval=30,
+    )
+    logger.info(f"Redis client created for {os.getenv('REDIS_HOST')}:{os.getenv('REDIS_PORT') or 6379}")
+    return _client
@@ -0,0 +1,2 @@
+from .decorator import idempotent, get_idempotency_store, IDEMPOTENCY_HEADER
+from .store import IdempotencyStore, DatabaseIdempotencyStore, RedisIdempotencyStore, create_idempotency_store
@@ -0,0 +1,102 @@
+from functools import wraps
+from flask import request, jsonify, make_response, current_app
+from typing import Optional
+import hashlib
+import os
+import time
+
+from api.utils.security.jwt.decorators import current_principal
+from .store import IdempotencyStore, create_idempotency_store, COMPLETED
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+_store: Optional[IdempotencyStore] = None
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    global _store
+    if _store is None:
+        _store = create_idempotency_store()
+    return _store
+
+
+def _replay(record):
+    response = make_response(record["response_body"] or b"", record["response_status"])
+    if record.get("content_type"):
+        response.headers["Content-Type"] = record["content_type"]
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(ttl: Optional[int] = None, wait_timeout: Optional[float] = None, lock_seconds: Optional[int] = None):
+    """
+    Makes a route safe to retry with an Idempotency-Key header. Use below @token_required.
+
+    The first request with a key runs the view and stores its response for ttl seconds. 5xx responses
+    and exceptions are not stored, so the client can retry them: a view must only fail with 5xx when it
+    has not committed anything, and answer with a non-5xx status once it has. A concurrent duplicate waits up to
+    wait_timeout seconds for the first one and gets its response; later duplicates replay the stored
+    response without running the view. Reusing a key with a different request body returns 422.
+    Keys are scoped by endpoint and authenticated user (or IP). Requests without the header run normally.
+    """
+    ttl = ttl or int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+    wait_timeout = wait_timeout if wait_timeout is not None else float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+    # Reserva abandonada (worker morreu no meio) pode ser assumida depois disso
+    lock_seconds = lock_seconds or int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            client_key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not client_key:
+                return f(*args, **kwargs)
+            if len(client_key) > MAX_KEY_LENGTH:
+                return jsonify({"error": f"{IDEMPOTENCY_HEADER} must have at most {MAX_KEY_LENGTH} characters"}), 400
+
+            owner = current_principal() or request.remote_addr
+            key = hashlib.sha256(f"{request.endpoint}|{owner}|{client_key}".encode()).hexdigest()
+            fingerprint = hashlib.sha256(
+                request.method.encode() + b"|" + request.path.encode() + b"|" + request.get_data()
+            ).hexdigest()
+
+            store = get_idempotency_store()
+            record = store.begin(key, fingerprint, lock_seconds)
+
+            # Duplicata concorrente: espera a primeira requisição terminar
+            deadline = time.monotonic() + wait_timeout
+            delay = 0.05
+            while record is not None and record["status"] != COMPLETED and time.monotonic() < deadline:
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
+                record = store.get(key)
+                if record is None:
+                    # A primeira falhou e liberou a chave: esta requisição assume
+                    record = store.begin(key, fingerprint, lock_seconds)
+
+            if record is not None:
+                if record["fingerprint"] != fingerprint:
+                    current_app.logger.warning(f"{IDEMPOTENCY_HEADER} reused with a different request on {request.endpoint}")
+                    return jsonify({"error": f"{IDEMPOTENCY_HEADER} was already used with a different request"}), 422
+                if record["status"] != COMPLETED:
+                    response = jsonify({"error": "A request with this Idempotency-Key is still being processed"})
+                    response.headers["Retry-After"] = "1"
+                    return response, 409
+                current_app.logger.info(f"Replaying stored response for {IDEMPOTENCY_HEADER} on {request.endpoint}")
+                return _replay(record)
+
+            try:
+                response = make_response(f(*args, **kwargs))
+            except Exception:
+                store.release(key)
+                raise
+
+            if response.status_code >= 500 or response.is_streamed:
+                store.release(key)
+            else:
+                store.complete(key, fingerprint, response.status_code, response.get_data(),
+                               response.headers.get("Content-Type"), ttl)
+            return response
+
+        return decorated
+    return decorator
@@ -0,0 +1,34 @@
+from api.utils.db.connection import db
+from datetime import datetime
+import pytz
+
+class IdempotencyKey(db.Model):
+    """Stored outcome of a request sent with an Idempotency-Key header (DatabaseIdempotencyStore)"""
+    __tablename__ = "idempotency_keys"
+
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+
+    # sha256 de endpoint + principal + chave enviada pelo cliente
+    key = db.Column(db.String(64), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=IN_PROGRESS)
+    response_status = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.LargeBinary, nullable=True)
+    content_type = db.Column(db.String(100), nullable=True)
+    # Agendamento em UTC (naive)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(pytz.timezone('America/Sao_Paulo')))
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.key[:12]} {self.status}>"
+
+    def to_record(self):
+        return {
+            "status": self.status,
+            "fingerprint": self.fingerprint,
+            "response_status": self.response_status,
+            "response_body": self.response_body,
+            "content_type": self.content_type,
+        }
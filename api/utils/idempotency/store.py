@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, Optional
+import base64
+import json
+import logging
+import os
+
+from api.utils.db.connection import db
+from api.utils.db.redis_connection import get_redis, redis
+from .model import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IN_PROGRESS = IdempotencyKey.IN_PROGRESS
+COMPLETED = IdempotencyKey.COMPLETED
+
+
+class IdempotencyStore:
+    """
+    TTL store of idempotent requests. A record is a dict with status (in_progress|completed),
+    fingerprint and, once completed, response_status, response_body (bytes) and content_type.
+    """
+
+    def begin(self, key: str, fingerprint: str, lock_seconds: int) -> Optional[Dict]:
+        """Reserves key for this request. Returns None when reserved, otherwise the existing record"""
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def complete(self, key: str, fingerprint: str, status: int, body: bytes, content_type: str, ttl: int) -> None:
+        raise NotImplementedError
+
+    def release(self, key: str) -> None:
+        """Drops a reservation so a retry runs the request again (used after 5xx and exceptions)"""
+        raise NotImplementedError
+
+
+class DatabaseIdempotencyStore(IdempotencyStore):
+    """Shared by every worker through the idempotency_keys table; the primary key serializes concurrent requests"""
+
+    def begin(self, key: str, fingerprint: str, lock_seconds: int) -> Optional[Dict]:
+        now = datetime.utcnow()
+        locked_until = now + timedelta(seconds=lock_seconds)
+        try:
+            db.session.add(IdempotencyKey(key=key, fingerprint=fingerprint, status=IN_PROGRESS,
+                                          locked_until=locked_until, expires_at=locked_until))
+            db.session.commit()
+            return None
+        except IntegrityError:
+            db.session.rollback()
+
+        # Registro expirado ou reserva abandonada (worker morreu): assume a chave
+        taken_over = (
+            IdempotencyKey.query
+            .filter(IdempotencyKey.key == key)
+            .filter(db.or_(
+                IdempotencyKey.expires_at < now,
+                db.and_(IdempotencyKey.status == IN_PROGRESS, IdempotencyKey.locked_until < now),
+            ))
+            .update({
+                IdempotencyKey.fingerprint: fingerprint,
+                IdempotencyKey.status: IN_PROGRESS,
+                IdempotencyKey.response_status: None,
+                IdempotencyKey.response_body: None,
+                IdempotencyKey.content_type: None,
+                IdempotencyKey.locked_until: locked_until,
+                IdempotencyKey.expires_at: locked_until,
+            }, synchronize_session=False)
+        )
+        db.session.commit()
+        if taken_over == 1:
+            return None
+        return self.get(key)
+
+    def get(self, key: str) -> Optional[Dict]:
+        # populate_existing + commit: outra requisição pode ter concluído a chave desde a última leitura
+        row = db.session.get(IdempotencyKey, key, populate_existing=True)
+        record = row.to_record() if row else None
+        db.session.commit()
+        return record
+
+    def complete(self, key: str, fingerprint: str, status: int, body: bytes, content_type: str, ttl: int) -> None:
+        IdempotencyKey.query.filter_by(key=key).update({
+            IdempotencyKey.status: COMPLETED,
+            IdempotencyKey.response_status: status,
+            IdempotencyKey.response_body: body,
+            IdempotencyKey.content_type: content_type,
+            IdempotencyKey.locked_until: None,
+            IdempotencyKey.expires_at: datetime.utcnow() + timedelta(seconds=ttl),
+        }, synchronize_session=False)
+        db.session.commit()
+
+    def release(self, key: str) -> None:
+        IdempotencyKey.query.filter_by(key=key, status=IN_PROGRESS).delete(synchronize_session=False)
+        db.session.commit()
+
+    def prune(self) -> int:
+        """Deletes expired records"""
+        deleted = IdempotencyKey.query.filter(IdempotencyKey.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+
+class RedisIdempotencyStore(IdempotencyStore):
+    """Records live in Redis with their TTL; SET NX reserves a key atomically across workers"""
+
+    PREFIX = "lure:idempotency"
+
+    def __init__(self, client, fallback: Optional[IdempotencyStore] = None):
+        self.client = client
+        self.fallback = fallback or DatabaseIdempotencyStore()
+
+    def _key(self, key: str) -> str:
+        return f"{self.PREFIX}:{key}"
+
+    @staticmethod
+    def _encode(record: Dict) -> str:
+        record = dict(record)
+        if record.get("response_body") is not None:
+            record["response_body"] = base64.b64encode(record["response_body"]).decode()
+        return json.dumps(record)
+
+    @staticmethod
+    def _decode(raw) -> Optional[Dict]:
+        if raw is None:
+            return None
+        record = json.loads(raw)
+        if record.get("response_body") is not None:
+            record["response_body"] = base64.b64decode(record["response_body"])
+        return record
+
+    def begin(self, key: str, fingerprint: str, lock_seconds: int) -> Optional[Dict]:
+        try:
+            reserved = self.client.set(self._key(key), self._encode({"status": IN_PROGRESS, "fingerprint": fingerprint}),
+                                       nx=True, ex=lock_seconds)
+            if reserved:
+                return None
+            record = self._decode(self.client.get(self._key(key)))
+            # A chave pode ter expirado entre o SET e o GET
+            return record if record is not None else self.begin(key, fingerprint, lock_seconds)
+        except redis.RedisError as e:
+            logger.error(f"Redis error in idempotency begin, using fallback: {str(e)}")
+            return self.fallback.begin(key, fingerprint, lock_seconds)
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            return self._decode(self.client.get(self._key(key)))
+        except redis.RedisError as e:
+            logger.error(f"Redis error in idempotency get, using fallback: {str(e)}")
+            return self.fallback.get(key)
+
+    def complete(self, key: str, fingerprint: str, status: int, body: bytes, content_type: str, ttl: int) -> None:
+        record = {"status": COMPLETED, "fingerprint": fingerprint, "response_status": status,
+                  "response_body": body, "content_type": content_type}
+        try:
+            self.client.set(self._key(key), self._encode(record), ex=ttl)
+        except redis.RedisError as e:
+            logger.error(f"Redis error in idempotency complete, using fallback: {str(e)}")
+            self.fallback.complete(key, fingerprint, status, body, content_type, ttl)
+
+    def release(self, key: str) -> None:
+        try:
+            self.client.delete(self._key(key))
+        except redis.RedisError as e:
+            logger.error(f"Redis error in idempotency release, using fallback: {str(e)}")
+            self.fallback.release(key)
+
+
+def create_idempotency_store() -> IdempotencyStore:
+    """Chooses the backend from IDEMPOTENCY_STORAGE (redis|database); defaults to Redis when configured"""
+    backend = os.getenv("IDEMPOTENCY_STORAGE", "").lower()
+    if backend != "database":
+        client = get_redis()
+        if client is not None:
+            logger.info("Idempotency keys stored in Redis")
+            return RedisIdempotencyStore(client)
+        if backend == "redis":
+            logger.warning("IDEMPOTENCY_STORAGE=redis but Redis is not configured, using the database")
+    logger.info("Idempotency keys stored in the database")
+    return DatabaseIdempotencyStore()
@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import List, Optional, Sequence
+import base64
+import json
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def parse_limit(value: Optional[str], default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    """Page size from a query string value, clamped to [1, maximum]; raises ValueError if not an integer"""
+    if value is None or value == "":
+        return default
+    return min(max(int(value), 1), maximum)
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Opaque keyset cursor for the sort key of the last row of a page"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> List:
+    """Values of a cursor made by encode_cursor; raises ValueError if it is malformed. Datetimes come back as ISO strings"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_condition(columns: Sequence, values: Sequence, descending: bool = True):
+    """
+    Rows strictly after `values` in (columns...) order:
+    (c1 < v1) OR (c1 = v1 AND c2 < v2) OR ... (> when ascending).
+    Spelled out instead of a row-value comparison so every backend can use the composite index.
+    """
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        after = column < value if descending else column > value
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], after))
+    return or_(*clauses)
@@ -0,0 +1 @@
+from .stripe_gateway import stripe_gateway, StripeGateway, CircuitBreaker, CircuitOpenError, create_stripe_gateway
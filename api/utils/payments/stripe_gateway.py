@@ -0,0 +1,261 @@
+from collections import deque
+from dotenv import load_dotenv
+from typing import Callable, Dict, Optional
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+import stripe
+from requests.adapters import HTTPAdapter
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(stripe.error.APIConnectionError):
+    """Raised without calling Stripe while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. After failure_threshold failures in a row the circuit opens and calls
+    fail fast for recovery_timeout seconds; then a single trial call is let through (half-open) and its
+    outcome closes or reopens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Stripe circuit breaker closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"Stripe circuit breaker opened after {self.failures} failure(s)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures, "times_opened": self.times_opened}
+
+
+class LatencyStats:
+    """Per-operation call counters and latency percentiles over the last `samples` calls"""
+
+    def __init__(self, samples: int = 1024):
+        self.samples = samples
+        self._operations: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, seconds: float, outcome: str) -> None:
+        with self._lock:
+            entry = self._operations.get(operation)
+            if entry is None:
+                entry = self._operations[operation] = {"calls": 0, "outcomes": {}, "latencies": deque(maxlen=self.samples)}
+            entry["calls"] += 1
+            entry["outcomes"][outcome] = entry["outcomes"].get(outcome, 0) + 1
+            entry["latencies"].append(seconds)
+
+    @staticmethod
+    def _percentile(ordered, fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            operations = {name: (entry["calls"], dict(entry["outcomes"]), sorted(entry["latencies"]))
+                          for name, entry in self._operations.items()}
+        result = {}
+        for name, (calls, outcomes, ordered) in operations.items():
+            result[name] = {
+                "calls": calls,
+                "outcomes": outcomes,
+                "latency_ms": {
+                    "p50": round(self._percentile(ordered, 0.50) * 1000, 2),
+                    "p95": round(self._percentile(ordered, 0.95) * 1000, 2),
+                    "p99": round(self._percentile(ordered, 0.99) * 1000, 2),
+                    "max": round(ordered[-1] * 1000, 2),
+                } if ordered else None,
+            }
+        return result
+
+
+class StripeGateway:
+    """
+    Single entry point for Stripe API calls.
+    Owns a keep-alive requests session per worker process (recreated after a fork), bounded
+    connect/read timeouts, retries with exponential backoff and full jitter for idempotent calls,
+    a circuit breaker that fails fast while Stripe is degraded, and latency metrics per operation.
+    The library's own retries are disabled so the policy lives in one place.
+    """
+
+    def __init__(self, connect_timeout: float = 3.0, read_timeout: float = 15.0, max_retries: int = 2,
+                 backoff_base: float = 0.25, backoff_cap: float = 2.0, pool_size: int = 10,
+                 breaker: Optional[CircuitBreaker] = None, api_key: Optional[str] = None,
+                 api_base: Optional[str] = None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyStats()
+        self.api_key = api_key
+        self.api_base = api_base
+        self._client_pid: Optional[int] = None
+        self._client_lock = threading.Lock()
+
+    def _ensure_client(self) -> None:
+        # Sessões HTTP não devem atravessar um fork (gunicorn): uma por processo
+        if self._client_pid == os.getpid():
+            return
+        with self._client_lock:
+            if self._client_pid == os.getpid():
+                return
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            stripe.default_http_client = stripe.RequestsClient(
+                timeout=(self.connect_timeout, self.read_timeout), session=session
+            )
+            stripe.max_network_retries = 0
+            if self.api_key:
+                stripe.api_key = self.api_key
+            if self.api_base:
+                stripe.api_base = self.api_base
+            self._client_pid = os.getpid()
+            logger.info(f"Stripe HTTP client created for pid {self._client_pid} (pool {self.pool_size}, "
+                        f"timeouts {self.connect_timeout}s/{self.read_timeout}s)")
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """Network errors, rate limiting and 5xx; other errors would fail the same way again"""
+        if isinstance(error, CircuitOpenError):
+            return False
+        if isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+            return True
+        return isinstance(error, stripe.error.StripeError) and (error.http_status or 0) >= 500
+
+    @staticmethod
+    def _is_outage(error: Exception) -> bool:
+        # Só falhas do lado da Stripe abrem o circuito; erros de cartão/validação não
+        if isinstance(error, stripe.error.APIConnectionError):
+            return True
+        return isinstance(error, stripe.error.StripeError) and (error.http_status or 0) >= 500
+
+    def call(self, operation: str, fn: Callable, *args, idempotent: bool = False, **kwargs):
+        """
+        Runs fn(*args, **kwargs) under the gateway's policy. Only idempotent calls are retried:
+        reads, and POSTs that carry an idempotency_key.
+        """
+        self._ensure_client()
+        attempts = 1 + (self.max_retries if idempotent else 0)
+        for attempt in range(1, attempts + 1):
+            if not self.breaker.allow():
+                self.latency.record(operation, 0.0, "circuit_open")
+                raise CircuitOpenError(f"Stripe circuit breaker is open; {operation} not attempted")
+
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except stripe.error.StripeError as e:
+                self.latency.record(operation, time.perf_counter() - start, type(e).__name__)
+                if self._is_outage(e):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if attempt == attempts or not self.is_retryable(e):
+                    raise
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1)))
+                logger.warning(f"Stripe {operation} failed ({type(e).__name__}), retry {attempt}/{attempts - 1} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            except Exception as e:
+                # Exceção fora da hierarquia da Stripe (requests/urllib3 não embrulhados, bug):
+                # conta como falha para não deixar a chamada de teste do half-open presa
+                self.latency.record(operation, time.perf_counter() - start, type(e).__name__)
+                self.breaker.record_failure()
+                raise
+
+            self.latency.record(operation, time.perf_counter() - start, "ok")
+            self.breaker.record_success()
+            return result
+
+    def create_payment_intent(self, **params):
+        return self.call("payment_intent.create", stripe.PaymentIntent.create,
+                         idempotent="idempotency_key" in params, **params)
+
+    def retrieve_payment_intent(self, payment_intent_id: str, **params):
+        return self.call("payment_intent.retrieve", stripe.PaymentIntent.retrieve, payment_intent_id,
+                         idempotent=True, **params)
+
+    def list_payment_intents(self, **params):
+        return self.call("payment_intent.list", stripe.PaymentIntent.list, idempotent=True, **params)
+
+    def stats(self) -> Dict:
+        return {
+            "circuit_breaker": self.breaker.stats(),
+            "operations": self.latency.snapshot(),
+            "timeouts": {"connect": self.connect_timeout, "read": self.read_timeout},
+            "max_retries": self.max_retries,
+        }
+
+
+def create_stripe_gateway() -> StripeGateway:
+    """Builds the gateway from the STRIPE_* environment variables"""
+    return StripeGateway(
+        connect_timeout=float(os.getenv("STRIPE_CONNECT_TIMEOUT", "3")),
+        read_timeout=float(os.getenv("STRIPE_READ_TIMEOUT", "15")),
+        max_retries=int(os.getenv("STRIPE_MAX_RETRIES", "2")),
+        pool_size=int(os.getenv("STRIPE_POOL_SIZE", "10")),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("STRIPE_BREAKER_FAILURES", "5")),
+            recovery_timeout=float(os.getenv("STRIPE_BREAKER_RECOVERY", "30")),
+        ),
+        api_key=os.getenv("STRIPE_SECRET_KEY"),
+        # Permite apontar para um stand-in local da Stripe (ex.: stripe-mock em http://localhost:12111)
+        api_base=os.getenv("STRIPE_API_BASE") or None,
+    )
+
+
+stripe_gateway = create_stripe_gateway()
+# Módulos que só usam helpers locais da biblioteca (ex.: stripe.Webhook) também precisam da chave
+stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
@@ -1,2 +1,5 @@
-from .rate_limiter import ddos_protection
-from .cookie_manager import cookie_manager, TrustScores, RateLimits
\ No newline at end of file
+from .rate_limiter import ddos_protection, rate_limiter, RateLimiter, RateLimitAlgorithms
+from .storage import MemoryStorage, RedisStorage, create_storage
+from .cookie_manager import cookie_manager, TrustScores, RateLimits
+from .middleware import init_rate_limiting, rate_limit_middleware, RateLimitMiddleware
+from .policies import RATE_LIMIT_POLICIES, RateLimitPolicy, KeyStrategies
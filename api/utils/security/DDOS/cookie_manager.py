@@ -1,11 +1,17 @@
 from flask import request, make_response
 import uuid
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 import os
 from dotenv import load_dotenv
+import base64
+import binascii
 import hashlib
 import hmac  # Adicionando import necessário
 import json
+import struct
+import threading
+import time
 from typing import Optional, Tuple
 import logging
 
@@ -57,6 +63,20 @@ class RateLimits:
     WINDOW=60
 
 class CookieManager:
+    """
+    Issues and validates the signed client cookie.
+    Format (v1): base64url(version | client_id uuid bytes | issued-at uint32 | truncated HMAC-SHA256).
+    Legacy JSON cookies ({"id", "ts", "sig"}) are still accepted while they are younger than
+    EXPIRATION_DAYS, which is the migration window since no new JSON cookies are issued.
+    """
+
+    VERSION = 1
+    SIGNATURE_BYTES = 12
+    # versão (1) + uuid (16) + timestamp (4) + assinatura truncada (12)
+    PAYLOAD_BYTES = 1 + 16 + 4
+    TOKEN_BYTES = PAYLOAD_BYTES + SIGNATURE_BYTES
+    CACHE_SIZE = 10_000
+
     def __init__(self):
         logger.info("Initializing CookieManager")
         logger.debug(f"Using cookie name: {CookieConfig.NAME}")
@@ -65,41 +85,100 @@ class CookieManager:
         if not CookieConfig.SECRET_KEY:
             logger.error("COOKIE_SECRET_KEY is not set in environment variables")
             raise ValueError("COOKIE_SECRET_KEY must be set in environment variables")
+
+        self._key = CookieConfig.SECRET_KEY.encode()
+        self._max_age = CookieConfig.EXPIRATION_DAYS * 24 * 60 * 60
+        # Cache LRU de cookies já verificados: valor do cookie -> (client_id, expira_em)
+        self._verified: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
         
         logger.info("CookieManager initialized successfully")
 
     def _generate_signature(self, client_id: str, timestamp: str) -> str:
-        """Generate HMAC signature for cookie data"""
+        """Generate the legacy JSON cookie signature"""
         message = f"{client_id}:{timestamp}"
         return hashlib.sha256(
             f"{message}:{CookieConfig.SECRET_KEY}".encode()
         ).hexdigest()
 
     def _verify_signature(self, client_id: str, timestamp: str, signature: str) -> bool:
-        """Verify cookie signature using hmac"""
+        """Verify legacy JSON cookie signature using hmac"""
         expected_signature = self._generate_signature(client_id, timestamp)
         return hmac.compare_digest(signature.encode(), expected_signature.encode())
 
+    def _sign(self, payload: bytes) -> bytes:
+        # hmac.digest usa o caminho rápido em C (sem criar objeto HMAC)
+        return hmac.digest(self._key, payload, "sha256")[:self.SIGNATURE_BYTES]
+
+    def encode_cookie(self, client_id: str, issued_at: Optional[int] = None) -> str:
+        """Builds the compact signed cookie value for a UUID client_id"""
+        issued_at = int(time.time()) if issued_at is None else issued_at
+        payload = struct.pack(">B16sI", self.VERSION, uuid.UUID(client_id).bytes, issued_at)
+        return base64.urlsafe_b64encode(payload + self._sign(payload)).rstrip(b"=").decode()
+
+    def _decode_compact(self, cookie: str) -> Optional[Tuple[str, float]]:
+        try:
+            raw = base64.urlsafe_b64decode(cookie + "=" * (-len(cookie) % 4))
+        except (ValueError, binascii.Error):
+            return None
+        if len(raw) != self.TOKEN_BYTES or raw[0] != self.VERSION:
+            return None
+        payload, signature = raw[:self.PAYLOAD_BYTES], raw[self.PAYLOAD_BYTES:]
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            logger.warning("Invalid cookie signature")
+            return None
+        _, client_bytes, issued_at = struct.unpack(">B16sI", payload)
+        h = client_bytes.hex()
+        client_id = f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+        return client_id, issued_at + self._max_age
+
+    def _decode_legacy(self, cookie: str) -> Optional[Tuple[str, float]]:
+        try:
+            cookie_data = json.loads(cookie)
+            client_id = cookie_data['id']
+            timestamp = cookie_data['ts']
+            signature = cookie_data['sig']
+            issued_at = datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp()
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            logger.error(f"Error validating cookie: {str(e)}")
+            return None
+        if not self._verify_signature(client_id, timestamp, signature):
+            logger.warning(f"Invalid cookie signature for client_id: {client_id}")
+            return None
+        return client_id, issued_at + self._max_age
+
+    def verify_cookie_value(self, cookie: str) -> Optional[str]:
+        """Returns the client_id of a valid, unexpired cookie value, or None"""
+        now = time.time()
+        with self._cache_lock:
+            cached = self._verified.get(cookie)
+            if cached is not None:
+                if cached[1] > now:
+                    self._verified.move_to_end(cookie)
+                    return cached[0]
+                del self._verified[cookie]
+
+        decoded = self._decode_legacy(cookie) if cookie.startswith("{") else self._decode_compact(cookie)
+        if decoded is None or decoded[1] <= now:
+            return None
+
+        with self._cache_lock:
+            self._verified[cookie] = decoded
+            if len(self._verified) > self.CACHE_SIZE:
+                self._verified.popitem(last=False)
+        return decoded[0]
+
     def create_cookie(self, response, client_id: str = None) -> str:
         """Create a new secure cookie with client_id"""
         if not client_id:
             client_id = str(uuid.uuid4())
         
-        timestamp = datetime.utcnow().isoformat()
-        signature = self._generate_signature(client_id, timestamp)
-        
-        cookie_data = {
-            'id': client_id,
-            'ts': timestamp,
-            'sig': signature
-        }
-        
         logger.debug(f"Creating cookie for client_id: {client_id}")
         
         response.set_cookie(
             CookieConfig.NAME,
-            json.dumps(cookie_data),
-            max_age=CookieConfig.EXPIRATION_DAYS * 24 * 60 * 60,
+            self.encode_cookie(client_id),
+            max_age=self._max_age,
             domain=CookieConfig.DOMAIN,
             path=CookieConfig.PATH,
             secure=CookieConfig.SECURE,
@@ -107,34 +186,19 @@ class CookieManager:
             samesite=CookieConfig.SAMESITE
         )
         
-        logger.debug("Cookie created successfully")
         return client_id
 
     def validate_cookie(self) -> Tuple[Optional[str], bool]:
         """Validate cookie and return client_id if valid"""
-        try:
-            cookie = request.cookies.get(CookieConfig.NAME)
-            logger.debug(f"Validating cookie: {cookie}")
-            
-            if not cookie:
-                logger.debug("No cookie found")
-                return None, True
-
-            cookie_data = json.loads(cookie)
-            client_id = cookie_data['id']
-            timestamp = cookie_data['ts']
-            signature = cookie_data['sig']
-
-            if self._verify_signature(client_id, timestamp, signature):
-                logger.debug(f"Cookie validated successfully for client_id: {client_id}")
-                return client_id, False
-            
-            logger.warning(f"Invalid cookie signature for client_id: {client_id}")
+        cookie = request.cookies.get(CookieConfig.NAME)
+        if not cookie:
+            logger.debug("No cookie found")
             return None, True
-            
-        except (json.JSONDecodeError, KeyError) as e:
-            logger.error(f"Error validating cookie: {str(e)}")
+
+        client_id = self.verify_cookie_value(cookie)
+        if client_id is None:
             return None, True
+        return client_id, False
 
 # Global instance
 logger.info("Creating global CookieManager instance")
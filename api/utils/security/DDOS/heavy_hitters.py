@@ -0,0 +1,148 @@
+from array import array
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+class CountMinSketch:
+    """Fixed-size frequency estimator: never under-counts, over-counts by at most ~2N/width with high probability"""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.tables = [array("L", [0]) * width for _ in range(depth)]
+
+    def _indexes(self, key: str) -> List[int]:
+        # Double hashing (Kirsch-Mitzenmacher) a partir do hash da string, que o Python guarda em cache
+        h1 = hash(key) & _MASK64
+        h2 = ((h1 * 0x9E3779B97F4A7C15) & _MASK64) >> 17 | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Adds count to key and returns its new estimate"""
+        # Caminho quente (uma chamada por requisição): índices calculados inline
+        h1 = hash(key) & _MASK64
+        h2 = ((h1 * 0x9E3779B97F4A7C15) & _MASK64) >> 17 | 1
+        width = self.width
+        estimate = None
+        for i, table in enumerate(self.tables):
+            index = (h1 + i * h2) % width
+            value = table[index] + count
+            table[index] = value
+            if estimate is None or value < estimate:
+                estimate = value
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(table[index] for table, index in zip(self.tables, self._indexes(key)))
+
+    def clear(self) -> None:
+        self.tables = [array("L", [0]) * self.width for _ in range(self.depth)]
+
+
+class HeavyHitterTracker:
+    """
+    Streaming top-K of the most active clients per time window, in fixed memory.
+    A count-min sketch estimates every key's frequency and a space-saving table keeps the K largest.
+    Keys whose estimate passes block_threshold within a window are blocked through the rate limiter.
+    """
+
+    def __init__(self, k: int = 50, window: int = 60, width: int = 2048, depth: int = 4,
+                 block_threshold: int = 0, block_duration: int = 900, limiter=None):
+        self.k = k
+        self.window = window
+        self.block_threshold = block_threshold
+        self.block_duration = block_duration
+        self.limiter = limiter
+        self.sketch = CountMinSketch(width, depth)
+        self.top_k: Dict[str, int] = {}
+        self.escalated: Dict[str, int] = {}
+        self.previous: List[Tuple[str, int]] = []
+        self.window_started_at = time.time()
+        self.total = 0
+        # Limite inferior do menor contador do top-K; recalculado só quando alguém disputa a vaga
+        self._min_count = 0
+        self._lock = threading.Lock()
+
+    def _rotate(self, now: float) -> None:
+        self.previous = sorted(self.top_k.items(), key=lambda item: item[1], reverse=True)
+        self.sketch.clear()
+        self.top_k.clear()
+        self.escalated.clear()
+        self.total = 0
+        self._min_count = 0
+        self.window_started_at = now
+
+    def record(self, key: str) -> int:
+        """Counts one request for key and returns its estimated count in the current window"""
+        now = time.time()
+        escalate = False
+        with self._lock:
+            if now - self.window_started_at >= self.window:
+                self._rotate(now)
+            self.total += 1
+            estimate = self.sketch.add(key)
+
+            if key in self.top_k:
+                self.top_k[key] = estimate
+            elif len(self.top_k) < self.k:
+                self.top_k[key] = estimate
+            elif estimate > self._min_count:
+                min_key = min(self.top_k, key=self.top_k.get)
+                self._min_count = self.top_k[min_key]
+                if estimate > self._min_count:
+                    del self.top_k[min_key]
+                    self.top_k[key] = estimate
+
+            if self.block_threshold and estimate >= self.block_threshold and key not in self.escalated:
+                self.escalated[key] = estimate
+                escalate = True
+
+        if escalate and self.limiter is not None:
+            logger.warning(f"Heavy hitter {key} reached {estimate} requests in {self.window}s, blocking for {self.block_duration}s")
+            self.limiter.block_ip(key, self.block_duration)
+        return estimate
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        with self._lock:
+            items = sorted(self.top_k.items(), key=lambda item: item[1], reverse=True)
+        return items[:n] if n else items
+
+    def snapshot(self, n: Optional[int] = None) -> Dict:
+        with self._lock:
+            current = sorted(self.top_k.items(), key=lambda item: item[1], reverse=True)
+            previous = list(self.previous)
+            escalated = dict(self.escalated)
+            total = self.total
+            started_at = self.window_started_at
+        if n:
+            current, previous = current[:n], previous[:n]
+        return {
+            "window_seconds": self.window,
+            "window_started_at": started_at,
+            "requests_in_window": total,
+            "current": [{"key": key, "estimated_requests": count} for key, count in current],
+            "previous_window": [{"key": key, "estimated_requests": count} for key, count in previous],
+            "escalated": [{"key": key, "estimated_requests": count} for key, count in escalated.items()],
+            "block_threshold": self.block_threshold,
+            "sketch_bytes": sum(table.itemsize * len(table) for table in self.sketch.tables),
+        }
+
+
+def create_heavy_hitter_tracker(limiter=None) -> HeavyHitterTracker:
+    """Builds the tracker from the HEAVY_HITTER_* environment variables"""
+    return HeavyHitterTracker(
+        k=int(os.getenv("HEAVY_HITTER_TOP_K", "50")),
+        window=int(os.getenv("HEAVY_HITTER_WINDOW", "60")),
+        width=int(os.getenv("HEAVY_HITTER_SKETCH_WIDTH", "2048")),
+        depth=int(os.getenv("HEAVY_HITTER_SKETCH_DEPTH", "4")),
+        block_threshold=int(os.getenv("HEAVY_HITTER_BLOCK_THRESHOLD", "3000")),
+        block_duration=int(os.getenv("HEAVY_HITTER_BLOCK_DURATION", "900")),
+        limiter=limiter,
+    )
@@ -0,0 +1,111 @@
+from flask import request, jsonify, g
+from fnmatch import fnmatchcase
+from typing import Dict, List, Optional
+import logging
+import os
+import uuid
+
+from api.utils.security.jwt.decorators import current_principal
+from .cookie_manager import cookie_manager
+from .heavy_hitters import HeavyHitterTracker, create_heavy_hitter_tracker
+from .policies import RATE_LIMIT_POLICIES, RateLimitPolicy, KeyStrategies
+from .rate_limiter import rate_limiter, RateLimiter, RateLimitAlgorithms
+from .storage import make_key
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitMiddleware:
+    """
+    Applies RATE_LIMIT_POLICIES to every request through before_request/after_request hooks.
+    The view's response is returned untouched; only a new client cookie is added when needed.
+    """
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, policies: Optional[List[RateLimitPolicy]] = None,
+                 heavy_hitters: Optional[HeavyHitterTracker] = None):
+        self.limiter = limiter or rate_limiter
+        self.policies = policies if policies is not None else RATE_LIMIT_POLICIES
+        self.heavy_hitters = heavy_hitters or create_heavy_hitter_tracker(self.limiter)
+        self.enabled = os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false"
+        # Endpoints são finitos: o fnmatch roda uma vez por endpoint
+        self._policy_cache: Dict[str, Optional[RateLimitPolicy]] = {}
+
+    def init_app(self, app):
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        logger.info(f"Rate limit middleware registered with {len(self.policies)} policies (enabled: {self.enabled})")
+
+    def policy_for(self, endpoint: Optional[str]) -> Optional[RateLimitPolicy]:
+        endpoint = endpoint or ""
+        if endpoint not in self._policy_cache:
+            self._policy_cache[endpoint] = next(
+                (policy for policy in self.policies if fnmatchcase(endpoint, policy.pattern)), None
+            )
+        return self._policy_cache[endpoint]
+
+    def _subject(self, policy: RateLimitPolicy) -> str:
+        """
+        Returns the identity counted (and blocked) by the policy's key strategy. CLIENT falls back to
+        the IP for requests without a valid client cookie, USER for requests without a valid token.
+        """
+        ip = request.remote_addr
+        if policy.key == KeyStrategies.CLIENT:
+            client_id, is_new = cookie_manager.validate_cookie()
+            if not is_new:
+                return f"client:{client_id}"
+            # Sem cookie válido conta pelo IP: quem nunca devolve o cookie não ganha um contador novo
+            # a cada requisição. O cookie emitido aqui vale a partir da próxima
+            g.rate_limit_new_client_id = str(uuid.uuid4())
+        if policy.key == KeyStrategies.USER:
+            user_id = current_principal()
+            if user_id is not None:
+                return f"user:{user_id}"
+        # Bloqueios por IP são compartilhados com ddos_protection
+        return ip
+
+    def before_request(self):
+        if not self.enabled or request.method == "OPTIONS":
+            return None
+        policy = self.policy_for(request.endpoint)
+        if policy is None or policy.limit is None:
+            return None
+
+        subject = self._subject(policy)
+        # Top-K de quem mais chama a API; pode escalar para um bloqueio antes do check abaixo
+        self.heavy_hitters.record(request.remote_addr)
+        if subject != request.remote_addr:
+            self.heavy_hitters.record(subject)
+
+        limit = policy.limit + policy.burst
+        use_gcra = self.limiter.algorithm == RateLimitAlgorithms.GCRA
+        # No GCRA o burst aumenta a tolerância mantendo a taxa limit/window
+        window = policy.window * limit / policy.limit if use_gcra else policy.window
+
+        is_blocked, is_exceeded, _ = self.limiter.storage.check_and_record(
+            subject, make_key(subject, policy.pattern), window, limit, limit,
+            use_gcra=use_gcra, block_duration=policy.block_duration
+        )
+        if not (is_blocked or is_exceeded):
+            return None
+
+        logger.warning(f"Rate limit hit for {subject} on {request.endpoint} ({policy})")
+        message = ("Your IP has been temporarily blocked" if is_blocked
+                   else f"Rate limit exceeded: {policy.limit} requests per {policy.window} second(s)")
+        response = jsonify({"error": "Too many requests", "message": message})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(policy.block_duration or policy.window)
+        return response
+
+    def after_request(self, response):
+        client_id = g.pop("rate_limit_new_client_id", None)
+        if client_id:
+            cookie_manager.create_cookie(response, client_id)
+        return response
+
+
+rate_limit_middleware = RateLimitMiddleware()
+
+
+def init_rate_limiting(app):
+    """Registers the global rate limit middleware on the Flask app"""
+    rate_limit_middleware.init_app(app)
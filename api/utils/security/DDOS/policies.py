@@ -0,0 +1,52 @@
+from typing import List, Optional
+
+
+class KeyStrategies:
+    # Quem é contado/bloqueado por uma política
+    IP = "ip"
+    CLIENT = "client"  # cookie assinado do CookieManager (cai para IP sem cookie válido)
+    USER = "user"      # user_id do JWT (cai para IP em requisições sem token)
+
+
+class RateLimitPolicy:
+    """
+    One row of the rate limit table.
+    pattern is matched against the Flask endpoint name (fnmatch syntax, e.g. "purchase.*").
+    limit=None exempts the matched endpoints from rate limiting.
+    burst allows that many extra requests in a short spike on top of limit per window.
+    """
+
+    def __init__(self, pattern: str, limit: Optional[int], window: int = 60, burst: int = 0,
+                 key: str = KeyStrategies.IP, block_duration: int = 0):
+        self.pattern = pattern
+        self.limit = limit
+        self.window = window
+        self.burst = burst
+        self.key = key
+        self.block_duration = block_duration
+
+    def __repr__(self):
+        return f"<RateLimitPolicy {self.pattern}: {self.limit}/{self.window}s burst={self.burst} key={self.key}>"
+
+
+# A primeira política que casar com o endpoint vence; mantenha "*" por último
+RATE_LIMIT_POLICIES: List[RateLimitPolicy] = [
+    # Webhooks da Stripe chegam em rajadas legítimas e são autenticados por assinatura
+    RateLimitPolicy("stripe_webhook.*", limit=None),
+    RateLimitPolicy("static", limit=None),
+
+    # Rotas públicas sensíveis a abuso
+    RateLimitPolicy("scraping.create", limit=50, window=5, key=KeyStrategies.IP, block_duration=300),
+    RateLimitPolicy("scraping.login", limit=10, window=60, burst=5, key=KeyStrategies.IP, block_duration=300),
+    RateLimitPolicy("scraping.update_password_route", limit=5, window=60, key=KeyStrategies.IP, block_duration=300),
+    RateLimitPolicy("user.create_or_login_oauth", limit=20, window=60, burst=10, key=KeyStrategies.IP),
+    RateLimitPolicy("contact.*", limit=10, window=60, key=KeyStrategies.CLIENT),
+
+    # Endpoints caros
+    RateLimitPolicy("purchase.handle_create_purchase", limit=10, window=60, burst=5, key=KeyStrategies.USER),
+    RateLimitPolicy("purchase.get_all_purchases", limit=10, window=60, key=KeyStrategies.USER),
+    RateLimitPolicy("product.read_all", limit=60, window=60, burst=30, key=KeyStrategies.CLIENT),
+
+    # Padrão para todo o resto
+    RateLimitPolicy("*", limit=300, window=60, burst=100, key=KeyStrategies.IP),
+]
@@ -1,13 +1,13 @@
-from flask import request, jsonify, make_response
+from flask import request, jsonify, after_this_request
 from functools import wraps
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import time
 from flask import current_app
-import threading
 from .cookie_manager import cookie_manager
+from .storage import RateLimitStorage, MemoryStorage, create_storage, make_key
 import logging
 import os
+import uuid
 
 # Configuração de logging simplificada
 logging.basicConfig(
@@ -28,23 +28,30 @@ class RateLimits:
     LOW_TRUST = 10
     WINDOW = 60
 
+class RateLimitAlgorithms:
+    # Lista de timestamps por cliente: custo O(requisições na janela)
+    SLIDING_WINDOW = "sliding_window"
+    # Generic cell rate algorithm: um número por cliente, custo O(1)
+    GCRA = "gcra"
+
 class RateLimiter:
-    def __init__(self):
-        self.requests: Dict[str, Dict[str, List[float]]] = {}
-        self.blocked_ips: Dict[str, datetime] = {}
-        self.trust_scores: Dict[str, float] = {}
-        self._lock = threading.Lock()
-        logger.info("Rate Limiter initialized")
+    def __init__(self, storage: Optional[RateLimitStorage] = None, algorithm: Optional[str] = None):
+        self.storage = storage or MemoryStorage()
+        self.algorithm = algorithm or os.getenv("RATE_LIMIT_ALGORITHM", RateLimitAlgorithms.SLIDING_WINDOW)
+        if self.algorithm not in (RateLimitAlgorithms.SLIDING_WINDOW, RateLimitAlgorithms.GCRA):
+            raise ValueError(f"Unknown rate limit algorithm: {self.algorithm}")
+        logger.info(f"Rate Limiter initialized with {type(self.storage).__name__} ({self.algorithm})")
 
     def calculate_trust_score(self, ip: str, client_id: str, is_new_cookie: bool) -> float:
-        base_score = self.trust_scores.get(client_id, TrustScores.LOW)
+        stored_score = self.storage.get_trust_score(client_id)
+        base_score = stored_score if stored_score is not None else TrustScores.LOW
         logger.debug(f"Calculating trust score - IP: {ip}, Client: {client_id}, Is new: {is_new_cookie}")
         
         if is_new_cookie:
             logger.debug(f"New cookie detected, using low trust score for {ip}")
             return TrustScores.LOW
         
-        if client_id in self.requests.get(ip, {}):
+        if self.storage.exists(make_key(ip, client_id)):
             base_score += 0.1
             
         final_score = min(base_score, TrustScores.HIGH)
@@ -63,82 +70,83 @@ class RateLimiter:
         return limit
 
     def clean_old_requests(self, ip: str, window: int):
-        current_time = time.time()
-        with self._lock:
-            if ip in self.requests:
-                before_count = sum(len(times) for times in self.requests[ip].values())
-                
-                self.requests[ip] = {
-                    client_id: [
-                        req_time for req_time in timestamps
-                        if current_time - req_time <= window
-                    ]
-                    for client_id, timestamps in self.requests[ip].items()
-                }
-                
-                after_count = sum(len(times) for times in self.requests[ip].values())
-                logger.debug(f"Cleaned requests for {ip}: {before_count} -> {after_count}")
+        self.storage.prune(window, prefix=make_key(ip, ""))
+        logger.debug(f"Cleaned requests for {ip}")
 
     def check_rate_limit(self, ip: str, client_id: str, max_requests: int, window: int) -> bool:
-        current_time = time.time()
         logger.debug(f"Checking rate limit - IP: {ip}, Max: {max_requests}, Window: {window}s")
-        
-        with self._lock:
-            if ip not in self.requests or client_id not in self.requests[ip]:
-                logger.debug(f"First request for IP: {ip}")
-                return False
-            
-            # Limpar requisições antigas
-            recent_requests = [
-                req_time for req_time in self.requests[ip][client_id]
-                if (current_time - req_time) <= window
-            ]
-            
-            # Atualizar lista de requisições
-            self.requests[ip][client_id] = recent_requests
-            
-            # Verificar limite
-            request_count = len(recent_requests)
-            is_exceeded = request_count >= max_requests
-            
-            logger.debug(f"Requests in window: {request_count}/{max_requests}")
-            logger.debug(f"Time window: {window}s")
-            logger.debug(f"Rate limit exceeded: {is_exceeded}")
-            
-            return is_exceeded
 
-    def add_request(self, ip: str, client_id: str):
-        current_time = time.time()
-        logger.debug(f"Adding request - IP: {ip}, Time: {current_time}")
-        
-        with self._lock:
-            if ip not in self.requests:
-                self.requests[ip] = {}
-            if client_id not in self.requests[ip]:
-                self.requests[ip][client_id] = []
-            
-            self.requests[ip][client_id].append(current_time)
-            logger.debug(f"Total requests for IP {ip}: {len(self.requests[ip][client_id])}")
+        request_count = self.storage.count(make_key(ip, client_id), window)
+        if request_count == 0:
+            logger.debug(f"First request for IP: {ip}")
+            return False
+
+        is_exceeded = request_count >= max_requests
+        logger.debug(f"Requests in window: {request_count}/{max_requests}, exceeded: {is_exceeded}")
+        return is_exceeded
+
+    def add_request(self, ip: str, client_id: str, window: Optional[int] = None):
+        logger.debug(f"Adding request - IP: {ip}")
+        self.storage.hit(make_key(ip, client_id), window or RateLimits.WINDOW)
+
+    def evaluate_request(self, ip: str, client_id: str, is_new_cookie: bool,
+                         max_requests: Optional[int] = None, window: Optional[int] = None) -> Tuple[bool, int, int]:
+        """Records the request with the configured algorithm; returns (exceeded, limit, window)"""
+        actual_window = window or RateLimits.WINDOW
+        trust_score = self.calculate_trust_score(ip, client_id, is_new_cookie)
+        actual_max_requests = max_requests or self.get_rate_limit(trust_score)
+        key = make_key(ip, client_id)
+
+        if self.algorithm == RateLimitAlgorithms.GCRA:
+            is_exceeded = self.storage.gcra_hit(key, actual_max_requests, actual_window)
+        else:
+            is_exceeded = self.storage.hit(key, actual_window) > actual_max_requests
+
+        logger.debug(f"Rate limit evaluated - IP: {ip}, Max: {actual_max_requests}/{actual_window}s, exceeded: {is_exceeded}")
+        return is_exceeded, actual_max_requests, actual_window
+
+    def check_and_record(self, ip: str, client_id: str, is_new_cookie: bool, max_requests: Optional[int] = None,
+                         window: Optional[int] = None, block_duration: int = 0) -> Tuple[bool, bool, int, int]:
+        """
+        Block check, request recording and limit evaluation in a single storage operation
+        (one lock acquisition in memory, one Lua call in Redis).
+        Returns (ip_blocked, limit_exceeded, limit, window).
+        """
+        actual_window = window or RateLimits.WINDOW
+        if max_requests:
+            limit_seen = limit_unseen = max_requests
+        elif is_new_cookie:
+            limit_seen = limit_unseen = self.get_rate_limit(TrustScores.LOW)
+        else:
+            # Os dois limites possíveis; o storage escolhe conforme o cliente já tem histórico
+            stored_score = self.storage.get_trust_score(client_id)
+            base_score = stored_score if stored_score is not None else TrustScores.LOW
+            limit_unseen = self.get_rate_limit(min(base_score, TrustScores.HIGH))
+            limit_seen = self.get_rate_limit(min(base_score + 0.1, TrustScores.HIGH))
+
+        is_blocked, is_exceeded, limit = self.storage.check_and_record(
+            ip, make_key(ip, client_id), actual_window, limit_seen, limit_unseen,
+            use_gcra=self.algorithm == RateLimitAlgorithms.GCRA, block_duration=block_duration
+        )
+        if is_exceeded:
+            logger.warning(f"Rate limit exceeded for IP: {ip} ({limit} requests per {actual_window}s)")
+        return is_blocked, is_exceeded, limit, actual_window
 
     def is_ip_blocked(self, ip: str) -> bool:
-        with self._lock:
-            if ip in self.blocked_ips:
-                if datetime.now() >= self.blocked_ips[ip]:
-                    logger.info(f"Block expired for IP: {ip}")
-                    del self.blocked_ips[ip]
-                    return False
-                logger.debug(f"IP {ip} is currently blocked")
-                return True
-            return False
+        blocked = self.storage.is_blocked(ip)
+        if blocked:
+            logger.debug(f"IP {ip} is currently blocked")
+        return blocked
 
     def block_ip(self, ip: str, duration: int = 300):
-        with self._lock:
-            block_until = datetime.now() + timedelta(seconds=duration)
-            self.blocked_ips[ip] = block_until
-            logger.warning(f"IP {ip} blocked until {block_until}")
+        self.storage.block(ip, duration)
+        logger.warning(f"IP {ip} blocked for {duration}s")
+
+    def stats(self) -> Dict:
+        return {"algorithm": self.algorithm, **self.storage.stats()}
 
 # Instância global
-rate_limiter = RateLimiter()
+rate_limiter = RateLimiter(create_storage())
 
 def ddos_protection(max_requests: int = None, window: int = None, block_duration: int = 300):
     def decorator(f):
@@ -146,69 +154,37 @@ def ddos_protection(max_requests: int = None, window: int = None, block_duration
         def wrapper(*args, **kwargs):
             ip = request.remote_addr
             logger.debug(f"New request from IP: {ip}")
-            
-            # Criar response inicial
-            response = make_response()
-            
-            # Verificar bloqueio primeiro
-            if rate_limiter.is_ip_blocked(ip):
-                logger.warning(f"IP {ip} is blocked")
-                error_response = make_response(jsonify({
-                    "error": "Too many requests",
-                    "message": "Your IP has been temporarily blocked"
-                }))
-                error_response.status_code = 429
-                return error_response
 
             # Validar cookie e criar se necessário
             client_id, is_new = cookie_manager.validate_cookie()
             if is_new:
-                client_id = cookie_manager.create_cookie(response)
+                client_id = str(uuid.uuid4())
+
+                # O cookie é gravado direto na response final da view, sem copiá-la
+                @after_this_request
+                def set_client_cookie(response):
+                    cookie_manager.create_cookie(response, client_id)
+                    return response
             logger.debug(f"Cookie validation - Client ID: {client_id}, Is new: {is_new}")
-            
-            # Adicionar request
-            rate_limiter.add_request(ip, client_id)
-            
-            # Calcular limites
-            trust_score = rate_limiter.calculate_trust_score(ip, client_id, is_new)
-            actual_max_requests = max_requests or rate_limiter.get_rate_limit(trust_score)
-            actual_window = window or RateLimits.WINDOW
-            
-            # Verificar limite
-            if rate_limiter.check_rate_limit(ip, client_id, actual_max_requests, actual_window):
-                rate_limiter.block_ip(ip, block_duration)
-                logger.warning(f"Rate limit exceeded for IP: {ip}")
-                error_response = make_response(jsonify({
+
+            # Bloqueio, registro e limite numa única seção crítica
+            is_blocked, is_exceeded, actual_max_requests, actual_window = rate_limiter.check_and_record(
+                ip, client_id, is_new, max_requests, window, block_duration
+            )
+            if is_blocked:
+                logger.warning(f"IP {ip} is blocked")
+                return jsonify({
+                    "error": "Too many requests",
+                    "message": "Your IP has been temporarily blocked"
+                }), 429
+
+            if is_exceeded:
+                return jsonify({
                     "error": "Too many requests",
                     "message": f"Rate limit exceeded: {actual_max_requests} requests per {actual_window} second(s)"
-                }))
-                error_response.status_code = 429
-                return error_response
-
-            try:
-                # Executar função original
-                result = f(*args, **kwargs)
-                
-                # Preparar response final
-                if isinstance(result, tuple):
-                    data, status_code = result
-                    final_response = make_response(data)
-                    final_response.status_code = status_code
-                else:
-                    final_response = make_response(result)
-                
-                # Se temos cookie, copiar para response final
-                if is_new:
-                    cookie_data = response.headers.get('Set-Cookie')
-                    if cookie_data:
-                        final_response.headers['Set-Cookie'] = cookie_data
-                
-                logger.debug(f"Request completed for IP: {ip}")
-                return final_response
-                
-            except Exception as e:
-                logger.error(f"Error processing request: {str(e)}")
-                raise
-            
+                }), 429
+
+            return f(*args, **kwargs)
+
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,29 @@
+from flask import Blueprint, jsonify, request
+from api.utils.security.jwt.decorators import token_required, admin_required
+from .middleware import rate_limit_middleware
+from .rate_limiter import rate_limiter
+
+blueprint = Blueprint('ddos', __name__)
+
+
+@blueprint.route("/heavy-hitters", methods=["GET"])
+@token_required
+@admin_required
+def heavy_hitters(current_user_id):
+    """Top clients by request volume in the current and previous window"""
+    limit = request.args.get('limit', type=int)
+    return jsonify({
+        "data": rate_limit_middleware.heavy_hitters.snapshot(limit),
+        "message": "Heavy hitters retrieved successfully."
+    }), 200
+
+
+@blueprint.route("/stats", methods=["GET"])
+@token_required
+@admin_required
+def stats(current_user_id):
+    """Rate limiter storage counters: tracked keys, evictions and memory estimate"""
+    return jsonify({
+        "data": rate_limiter.stats(),
+        "message": "Rate limiter stats retrieved successfully."
+    }), 200
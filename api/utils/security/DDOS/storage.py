@@ -0,0 +1,528 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+
+from api.utils.db.redis_connection import get_redis, redis
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(ip: str, client_id: Optional[str]) -> str:
+    """Builds the storage key for an (ip, client_id) pair"""
+    return f"{ip}|{client_id}"
+
+
+class RateLimitStorage:
+    """Storage backend interface used by RateLimiter"""
+
+    def hit(self, key: str, window: int) -> int:
+        """Records a request for key and returns how many requests it made in the window"""
+        raise NotImplementedError
+
+    def count(self, key: str, window: int) -> int:
+        """Returns how many requests key made in the window"""
+        raise NotImplementedError
+
+    def gcra_hit(self, key: str, limit: int, window: int) -> bool:
+        """GCRA: records a request if it conforms to limit per window; returns True when the limit is exceeded"""
+        raise NotImplementedError
+
+    def check_and_record(self, ip: str, key: str, window: int, limit_seen: int, limit_unseen: int,
+                         use_gcra: bool = False, block_duration: int = 0) -> Tuple[bool, bool, int]:
+        """
+        Block check, request recording and limit evaluation as one atomic step.
+        The limit is limit_seen if key already has history, otherwise limit_unseen.
+        When the limit is exceeded and block_duration is set, ip is blocked in the same step.
+        Returns (ip_blocked, limit_exceeded, limit).
+        """
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        """Returns True if key has any recorded request"""
+        raise NotImplementedError
+
+    def prune(self, window: int, prefix: str = "") -> None:
+        """Drops requests older than the window for keys starting with prefix"""
+        raise NotImplementedError
+
+    def block(self, key: str, duration: int) -> None:
+        raise NotImplementedError
+
+    def is_blocked(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def get_trust_score(self, client_id: str) -> Optional[float]:
+        raise NotImplementedError
+
+    def set_trust_score(self, client_id: str, score: float) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        """Returns counters describing the storage size"""
+        raise NotImplementedError
+
+
+class _Shard:
+    """One lock stripe of MemoryStorage: its own tables, lock and counters"""
+
+    def __init__(self, max_keys: int):
+        # OrderedDict em ordem de acesso: o início é sempre o cliente ocioso há mais tempo
+        self.requests: "OrderedDict[str, List[float]]" = OrderedDict()
+        # GCRA guarda só o "theoretical arrival time" de cada chave
+        self.tats: "OrderedDict[str, float]" = OrderedDict()
+        self.blocked: Dict[str, float] = {}
+        self.trust_scores: "OrderedDict[str, float]" = OrderedDict()
+        self.max_keys = max_keys
+        self.evictions = 0
+        self.expirations = 0
+        self.lock = threading.Lock()
+
+    # Os métodos abaixo assumem que self.lock já está adquirido
+
+    def touch(self, table: "OrderedDict", key: str, value) -> None:
+        """Stores value as most recently used and evicts the LRU entry when over max_keys"""
+        table[key] = value
+        table.move_to_end(key)
+        if len(table) > self.max_keys:
+            table.popitem(last=False)
+            self.evictions += 1
+
+    def hit(self, key: str, window: int, now: float) -> int:
+        timestamps = [t for t in self.requests.get(key, ()) if now - t <= window]
+        timestamps.append(now)
+        self.touch(self.requests, key, timestamps)
+        return len(timestamps)
+
+    def gcra_hit(self, key: str, limit: int, window: int, now: float) -> bool:
+        tat = max(self.tats.get(key, now), now)
+        new_tat = tat + window / limit
+        if new_tat - now > window:
+            if key in self.tats:
+                self.tats.move_to_end(key)
+            return True
+        self.touch(self.tats, key, new_tat)
+        return False
+
+    def is_blocked(self, key: str, now: float) -> bool:
+        until = self.blocked.get(key)
+        if until is None:
+            return False
+        if now >= until:
+            del self.blocked[key]
+            return False
+        return True
+
+    def sweep(self, cutoff: float, now: float) -> int:
+        removed = 0
+        # Como as tabelas estão em ordem de acesso, paramos no primeiro cliente ainda ativo
+        while self.requests:
+            key, timestamps = next(iter(self.requests.items()))
+            if timestamps and timestamps[-1] > cutoff:
+                break
+            del self.requests[key]
+            removed += 1
+        while self.tats:
+            key, tat = next(iter(self.tats.items()))
+            if tat > cutoff:
+                break
+            del self.tats[key]
+            removed += 1
+        for key in [k for k, until in self.blocked.items() if now >= until]:
+            del self.blocked[key]
+            removed += 1
+        self.expirations += removed
+        return removed
+
+
+class MemoryStorage(RateLimitStorage):
+    """
+    Per-process storage. Each gunicorn worker keeps its own counters; used in tests and as fallback.
+    State is striped over `shards` locks by IP, so concurrent requests from different clients
+    rarely contend. Bounded: at most max_keys clients per table (least recently used are evicted)
+    and clients idle for longer than ttl seconds are removed by a background sweeper.
+    """
+
+    def __init__(self, max_keys: int = 100_000, ttl: int = 600, sweep_interval: Optional[float] = None, shards: int = 16):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self._shards = [_Shard(max(max_keys // shards, 1)) for _ in range(shards)]
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_pid: Optional[int] = None
+        self._stop_sweeper = threading.Event()
+        self.sweep_interval = sweep_interval
+        if sweep_interval:
+            self.start_sweeper(sweep_interval)
+
+    def _shard(self, key: str) -> _Shard:
+        # Chaves "ip|client_id" ficam na mesma faixa que o bloqueio do IP
+        return self._shards[hash(key.split("|", 1)[0]) % len(self._shards)]
+
+    def _ensure_sweeper(self) -> None:
+        # Threads não sobrevivem ao fork do gunicorn: reinicia o sweeper no processo do worker
+        if self.sweep_interval and self._sweeper_pid != os.getpid():
+            self.start_sweeper(self.sweep_interval)
+
+    def hit(self, key: str, window: int) -> int:
+        self._ensure_sweeper()
+        shard = self._shard(key)
+        with shard.lock:
+            return shard.hit(key, window, time.time())
+
+    def count(self, key: str, window: int) -> int:
+        now = time.time()
+        shard = self._shard(key)
+        with shard.lock:
+            timestamps = [t for t in shard.requests.get(key, ()) if now - t <= window]
+            if key in shard.requests:
+                shard.requests[key] = timestamps
+            return len(timestamps)
+
+    def gcra_hit(self, key: str, limit: int, window: int) -> bool:
+        self._ensure_sweeper()
+        shard = self._shard(key)
+        with shard.lock:
+            return shard.gcra_hit(key, limit, window, time.time())
+
+    def check_and_record(self, ip: str, key: str, window: int, limit_seen: int, limit_unseen: int,
+                         use_gcra: bool = False, block_duration: int = 0) -> Tuple[bool, bool, int]:
+        self._ensure_sweeper()
+        shard = self._shard(ip)
+        now = time.time()
+        with shard.lock:
+            if shard.is_blocked(ip, now):
+                return True, False, limit_unseen
+            limit = limit_seen if key in shard.requests or key in shard.tats else limit_unseen
+            if use_gcra:
+                is_exceeded = shard.gcra_hit(key, limit, window, now)
+            else:
+                is_exceeded = shard.hit(key, window, now) > limit
+            if is_exceeded and block_duration:
+                shard.blocked[ip] = now + block_duration
+            return False, is_exceeded, limit
+
+    def exists(self, key: str) -> bool:
+        shard = self._shard(key)
+        with shard.lock:
+            return key in shard.requests or key in shard.tats
+
+    def prune(self, window: int, prefix: str = "") -> None:
+        now = time.time()
+        for shard in self._shards:
+            with shard.lock:
+                for key in [k for k in shard.requests if k.startswith(prefix)]:
+                    timestamps = [t for t in shard.requests[key] if now - t <= window]
+                    if timestamps:
+                        shard.requests[key] = timestamps
+                    else:
+                        del shard.requests[key]
+                for key in [k for k, tat in shard.tats.items() if k.startswith(prefix) and tat <= now]:
+                    del shard.tats[key]
+
+    def block(self, key: str, duration: int) -> None:
+        shard = self._shard(key)
+        with shard.lock:
+            shard.blocked[key] = time.time() + duration
+
+    def is_blocked(self, key: str) -> bool:
+        shard = self._shard(key)
+        with shard.lock:
+            return shard.is_blocked(key, time.time())
+
+    def get_trust_score(self, client_id: str) -> Optional[float]:
+        shard = self._shard(client_id)
+        with shard.lock:
+            return shard.trust_scores.get(client_id)
+
+    def set_trust_score(self, client_id: str, score: float) -> None:
+        shard = self._shard(client_id)
+        with shard.lock:
+            shard.touch(shard.trust_scores, client_id, score)
+
+    def sweep(self) -> int:
+        """Removes clients idle for longer than ttl and expired blocks; returns how many keys were removed"""
+        removed = 0
+        # Uma faixa por vez, para nunca segurar mais de um lock
+        for shard in self._shards:
+            now = time.time()
+            with shard.lock:
+                removed += shard.sweep(now - self.ttl, now)
+        if removed:
+            logger.debug(f"Rate limiter sweep removed {removed} idle keys")
+        return removed
+
+    def _sweep_loop(self, interval: float) -> None:
+        while not self._stop_sweeper.wait(interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Error sweeping rate limiter storage: {str(e)}")
+
+    def start_sweeper(self, interval: float = 30) -> None:
+        """Starts the background sweeper thread (once per process, so it survives gunicorn forks)"""
+        self.sweep_interval = interval
+        if self._sweeper is not None and self._sweeper.is_alive() and self._sweeper_pid == os.getpid():
+            return
+        self._stop_sweeper.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, args=(interval,), name="rate-limit-sweeper", daemon=True)
+        self._sweeper.start()
+        self._sweeper_pid = os.getpid()
+
+    def stop_sweeper(self) -> None:
+        self._stop_sweeper.set()
+
+    def stats(self) -> Dict:
+        """Returns sizing counters: current keys, evictions, expirations and an approximate memory footprint"""
+        totals = {"request_keys": 0, "gcra_keys": 0, "blocked_keys": 0, "trust_keys": 0, "evictions": 0, "expirations": 0}
+        memory = 0.0
+        for shard in self._shards:
+            with shard.lock:
+                totals["request_keys"] += len(shard.requests)
+                totals["gcra_keys"] += len(shard.tats)
+                totals["blocked_keys"] += len(shard.blocked)
+                totals["trust_keys"] += len(shard.trust_scores)
+                totals["evictions"] += shard.evictions
+                totals["expirations"] += shard.expirations
+                memory += sum(sys.getsizeof(t) for t in (shard.requests, shard.tats, shard.blocked, shard.trust_scores))
+                # Estimativa por amostragem para não percorrer todas as chaves segurando o lock
+                sample = list(itertools.islice(shard.requests.items(), 20))
+                if sample:
+                    per_key = sum(sys.getsizeof(k) + sys.getsizeof(v) + 24 * len(v) for k, v in sample) / len(sample)
+                    memory += per_key * len(shard.requests)
+                sample = list(itertools.islice(shard.tats, 20))
+                if sample:
+                    memory += (sum(sys.getsizeof(k) for k in sample) / len(sample) + 24) * len(shard.tats)
+        return {
+            "backend": "memory",
+            "keys": totals["request_keys"] + totals["gcra_keys"] + totals["blocked_keys"] + totals["trust_keys"],
+            **totals,
+            "shards": len(self._shards),
+            "max_keys": self.max_keys,
+            "ttl": self.ttl,
+            "memory_bytes_estimate": int(memory),
+        }
+
+
+# Janela deslizante atômica: remove o que saiu da janela, registra a requisição e conta
+SLIDING_WINDOW_HIT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+redis.call('ZADD', KEYS[1], now, ARGV[3])
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+return redis.call('ZCARD', KEYS[1])
+"""
+
+SLIDING_WINDOW_COUNT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+return redis.call('ZCARD', KEYS[1])
+"""
+
+# GCRA: um único número (TAT) por chave, decisão em tempo constante
+GCRA_HIT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+if new_tat - now > window then
+    return 1
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return 0
+"""
+
+# Mesmo fluxo do check_and_record em memória, num único round-trip atômico
+CHECK_AND_RECORD = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return {1, 0, tonumber(ARGV[4])}
+end
+local limit = tonumber(ARGV[4])
+if redis.call('EXISTS', KEYS[2], KEYS[3]) > 0 then
+    limit = tonumber(ARGV[3])
+end
+local exceeded = 0
+if ARGV[5] == '1' then
+    local tat = tonumber(redis.call('GET', KEYS[3]) or now)
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + window / limit
+    if new_tat - now > window then
+        exceeded = 1
+    else
+        redis.call('SET', KEYS[3], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+    end
+else
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - window)
+    redis.call('ZADD', KEYS[2], now, ARGV[6])
+    redis.call('PEXPIRE', KEYS[2], math.ceil(window * 1000))
+    if redis.call('ZCARD', KEYS[2]) > limit then
+        exceeded = 1
+    end
+end
+local block_duration = tonumber(ARGV[7])
+if exceeded == 1 and block_duration > 0 then
+    redis.call('SET', KEYS[1], 1, 'EX', block_duration)
+end
+return {0, exceeded, limit}
+"""
+
+
+class RedisStorage(RateLimitStorage):
+    """Storage shared by every worker through Redis, using Lua scripts so each operation is atomic"""
+
+    PREFIX = "lure:ddos"
+
+    def __init__(self, client, fallback: Optional[RateLimitStorage] = None):
+        self.client = client
+        # Se o Redis cair, cada worker continua limitando localmente em vez de liberar tudo
+        self.fallback = fallback or MemoryStorage()
+        self._hit_script = client.register_script(SLIDING_WINDOW_HIT)
+        self._count_script = client.register_script(SLIDING_WINDOW_COUNT)
+        self._gcra_script = client.register_script(GCRA_HIT)
+        self._check_and_record_script = client.register_script(CHECK_AND_RECORD)
+        self._member_seq = itertools.count()
+        self._member_prefix = f"{os.getpid()}-{id(self)}"
+
+    def _requests_key(self, key: str) -> str:
+        return f"{self.PREFIX}:req:{key}"
+
+    def _gcra_key(self, key: str) -> str:
+        return f"{self.PREFIX}:gcra:{key}"
+
+    def _block_key(self, key: str) -> str:
+        return f"{self.PREFIX}:block:{key}"
+
+    def _trust_key(self) -> str:
+        return f"{self.PREFIX}:trust"
+
+    def _member(self, now: float) -> str:
+        # Membros do ZSET precisam ser únicos mesmo para requisições no mesmo instante
+        return f"{now}-{self._member_prefix}-{next(self._member_seq)}"
+
+    def hit(self, key: str, window: int) -> int:
+        now = time.time()
+        try:
+            return int(self._hit_script(keys=[self._requests_key(key)], args=[now, window, self._member(now)]))
+        except redis.RedisError as e:
+            logger.error(f"Redis unavailable for rate limiting, using local storage: {str(e)}")
+            return self.fallback.hit(key, window)
+
+    def count(self, key: str, window: int) -> int:
+        try:
+            return int(self._count_script(keys=[self._requests_key(key)], args=[time.time(), window]))
+        except redis.RedisError as e:
+            logger.error(f"Redis unavailable for rate limiting, using local storage: {str(e)}")
+            return self.fallback.count(key, window)
+
+    def gcra_hit(self, key: str, limit: int, window: int) -> bool:
+        try:
+            return bool(self._gcra_script(keys=[self._gcra_key(key)], args=[time.time(), window / limit, window]))
+        except redis.RedisError as e:
+            logger.error(f"Redis unavailable for rate limiting, using local storage: {str(e)}")
+            return self.fallback.gcra_hit(key, limit, window)
+
+    def check_and_record(self, ip: str, key: str, window: int, limit_seen: int, limit_unseen: int,
+                         use_gcra: bool = False, block_duration: int = 0) -> Tuple[bool, bool, int]:
+        now = time.time()
+        try:
+            blocked, exceeded, limit = self._check_and_record_script(
+                keys=[self._block_key(ip), self._requests_key(key), self._gcra_key(key)],
+                args=[now, window, limit_seen, limit_unseen, int(use_gcra), self._member(now), int(block_duration)],
+            )
+            return bool(blocked), bool(exceeded), int(limit)
+        except redis.RedisError as e:
+            logger.error(f"Redis unavailable for rate limiting, using local storage: {str(e)}")
+            return self.fallback.check_and_record(ip, key, window, limit_seen, limit_unseen, use_gcra, block_duration)
+
+    def exists(self, key: str) -> bool:
+        try:
+            return bool(self.client.exists(self._requests_key(key), self._gcra_key(key)))
+        except redis.RedisError as e:
+            logger.error(f"Redis unavailable for rate limiting, using local storage: {str(e)}")
+            return self.fallback.exists(key)
+
+    def prune(self, window: int, prefix: str = "") -> None:
+        # As chaves expiram sozinhas (PEXPIRE), então só limpamos as que ainda existem
+        now = time.time()
+        try:
+            for redis_key in self.client.scan_iter(match=f"{self._requests_key(prefix)}*", count=500):
+                self.client.zremrangebyscore(redis_key, "-inf", now - window)
+        except redis.RedisError as e:
+            logger.error(f"Redis unavailable while pruning rate limit keys: {str(e)}")
+        self.fallback.prune(window, prefix)
+
+    def block(self, key: str, duration: int) -> None:
+        try:
+            self.client.set(self._block_key(key), 1, ex=max(int(duration), 1))
+        except redis.RedisError as e:
+            logger.error(f"Redis unavailable for rate limiting, using local storage: {str(e)}")
+            self.fallback.block(key, duration)
+
+    def is_blocked(self, key: str) -> bool:
+        try:
+            return bool(self.client.exists(self._block_key(key)))
+        except redis.RedisError as e:
+            logger.error(f"Redis unavailable for rate limiting, using local storage: {str(e)}")
+            return self.fallback.is_blocked(key)
+
+    def get_trust_score(self, client_id: str) -> Optional[float]:
+        try:
+            score = self.client.hget(self._trust_key(), client_id)
+            return float(score) if score is not None else None
+        except redis.RedisError as e:
+            logger.error(f"Redis unavailable for rate limiting, using local storage: {str(e)}")
+            return self.fallback.get_trust_score(client_id)
+
+    def set_trust_score(self, client_id: str, score: float) -> None:
+        try:
+            self.client.hset(self._trust_key(), client_id, score)
+        except redis.RedisError as e:
+            logger.error(f"Redis unavailable for rate limiting, using local storage: {str(e)}")
+            self.fallback.set_trust_score(client_id, score)
+
+    def stats(self) -> Dict:
+        # No Redis as chaves expiram por TTL; reportamos a memória do servidor e o fallback local
+        data = {"backend": "redis", "fallback": self.fallback.stats()}
+        try:
+            data["redis_used_memory_bytes"] = int(self.client.info("memory").get("used_memory", 0))
+            data["redis_keys"] = int(self.client.dbsize())
+        except redis.RedisError as e:
+            logger.error(f"Redis unavailable while reading rate limiter stats: {str(e)}")
+        return data
+
+
+def create_memory_storage() -> MemoryStorage:
+    """Builds a bounded MemoryStorage configured from the RATE_LIMIT_* environment variables"""
+    return MemoryStorage(
+        max_keys=int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000")),
+        ttl=int(os.getenv("RATE_LIMIT_STATE_TTL", "600")),
+        sweep_interval=float(os.getenv("RATE_LIMIT_SWEEP_INTERVAL", "30")),
+        shards=int(os.getenv("RATE_LIMIT_SHARDS", "16")),
+    )
+
+
+def create_storage() -> RateLimitStorage:
+    """Chooses the storage backend from RATE_LIMIT_STORAGE (memory|redis); defaults to Redis when configured"""
+    backend = os.getenv("RATE_LIMIT_STORAGE", "").lower()
+    if backend != "memory":
+        client = get_redis()
+        if client is not None:
+            logger.info("Rate limiter using Redis storage")
+            return RedisStorage(client, fallback=create_memory_storage())
+        if backend == "redis":
+            logger.warning("RATE_LIMIT_STORAGE=redis but Redis is not configured, using memory storage")
+    logger.info("Rate limiter using memory storage")
+    return create_memory_storage()
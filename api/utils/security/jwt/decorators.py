@@ -1,12 +1,11 @@
-print("=== Carregando módulo decorators.py ===", flush=True)
-
 from functools import wraps
 from flask import request, jsonify, make_response, g
-from api.utils.security.jwt.jwt_utils import verify_token, decode_token
-import jwt
+from api.utils.security.jwt.jwt_utils import verify_token
+# Registra a lista de revogação (Bloom filter por worker) no cache de tokens do verify_token
+from api.utils.security.jwt.revocation import revocation_list
 from flask import current_app
-
-print("=== Módulo decorators.py carregado ===", flush=True)
+from typing import Optional
+import os
 
 # Lista de rotas públicas que não requerem autenticação
 PUBLIC_ROUTES = [
@@ -14,82 +13,76 @@ PUBLIC_ROUTES = [
     # Adicione outras rotas públicas aqui se necessário
 ]
 
+def get_bearer_token() -> Optional[str]:
+    """Returns the raw JWT from the Authorization header, with or without the Bearer prefix"""
+    token = request.headers.get("Authorization")
+    if not token:
+        return None
+    if token.startswith("Bearer "):
+        token = token[7:]
+    return token.strip() or None
+
+def current_principal() -> Optional[int]:
+    """
+    Returns the user id of the request's JWT, or None for a missing/invalid token.
+    The token is decoded at most once per request: verify_jwt, the rate limit middleware and
+    every decorator below read the result memoized on g.
+    """
+    if g.get('auth_resolved'):
+        return g.current_user_id
+
+    user_id = None
+    token = get_bearer_token()
+    if token:
+        try:
+            user_id = verify_token(token)
+        except (KeyError, TypeError, ValueError):
+            # Token assinado mas sem 'sub' numérico (ex.: token anônimo)
+            user_id = None
+    g.auth_resolved = True
+    g.current_user_id = user_id
+    return user_id
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        print("\n=== INÍCIO DA REQUISIÇÃO (decorator) ===", flush=True)
-        print(f"Método: {request.method}", flush=True)
-
-        # Flask-CORS agora lida com OPTIONS automaticamente
-        # if request.method == 'OPTIONS':
-        #     response = make_response()
-        #     response.headers.add('Access-Control-Allow-Origin', 'http://localhost:60123')
-        #     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        #     response.headers.add('Access-Control-Allow-Methods', 'GET,POST,HEAD,PUT,DELETE,PATCH,OPTIONS')
-        #     response.headers.add('Access-Control-Allow-Credentials', 'true')
-        #     response.headers.add('Access-Control-Max-Age', '86400')
-        #     return response, 200
-            
         # Verifica se a rota atual está na lista de rotas públicas
         if request.path in PUBLIC_ROUTES:
             return f(*args, **kwargs)
 
-        print("\n=== Validação de Token (decorator) ===", flush=True)
-        token = request.headers.get("Authorization")
-        
-        if not token:
-            print("❌ Token ausente no header (decorator)", flush=True)
+        if not get_bearer_token():
             return jsonify({"message": "Token ausente!"}), 401
-            
-        if token.startswith("Bearer "):
-            token = token.split()[1]
-            print("✓ Bearer token encontrado (decorator)", flush=True)
-        
-        print(f"Token recebido (decorator): {token[:20]}...", flush=True)
-        
-        try:
-            user_id = verify_token(token)
-            print(f"✓ Token válido para user_id: {user_id} (decorator)", flush=True)
-            kwargs['current_user_id'] = user_id
-            return f(*args, **kwargs)
-        except Exception as e:
-            print(f"❌ Erro na validação do token (decorator): {str(e)}", flush=True)
+
+        user_id = current_principal()
+        if user_id is None:
             return jsonify({"message": "Token inválido ou expirado!"}), 401
-            
+
+        kwargs['current_user_id'] = user_id
+        return f(*args, **kwargs)
+
     return decorated
 
 def optional_token(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].replace('Bearer ', '')
-
-        if not token:
-            return f(None, *args, **kwargs)  # Passa None como current_user_id
-
-        try:
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user_id = data['id']
-            return f(current_user_id, *args, **kwargs)
-        except:
-            return f(None, *args, **kwargs)  # Em caso de erro no token, passa None
+        # Passa None como current_user_id quando não há token válido
+        return f(current_principal(), *args, **kwargs)
     return decorated
 
 def optional_token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(" ")[1]
-        
-        if not token:
-            return f(current_user_id=None, *args, **kwargs)
-            
-        try:
-            current_user_id = decode_token(token)
-            return f(current_user_id=current_user_id, *args, **kwargs)
-        except:
-            return f(current_user_id=None, *args, **kwargs)
-            
+        return f(current_user_id=current_principal(), *args, **kwargs)
+    return decorated
+
+def admin_required(f):
+    """Restricts a route to the user ids listed in ADMIN_USER_IDS. Use below @token_required"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        admin_ids = {value.strip() for value in os.getenv("ADMIN_USER_IDS", "").split(",") if value.strip()}
+        current_user_id = kwargs.get('current_user_id', args[0] if args else None)
+        if current_user_id is None or str(current_user_id) not in admin_ids:
+            current_app.logger.warning(f"admin_required: user {current_user_id} tried to access {request.endpoint}")
+            return jsonify({"message": "Admin access required"}), 403
+        return f(*args, **kwargs)
     return decorated
\ No newline at end of file
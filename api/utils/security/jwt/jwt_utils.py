@@ -1,7 +1,13 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from typing import Callable, Dict, List, Optional, Tuple
+import hashlib
 import jwt
 import os
+import threading
+import time
+import uuid
 from pathlib import Path
 from flask import current_app
 import traceback
@@ -14,6 +20,9 @@ load_dotenv(dotenv_path=env_path)
 # Load JWT config from environment variables at the module level
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 JWT_EXPIRATION_MINUTES = int(os.getenv("JWT_EXPIRATION_MINUTES", "1440")) # Keep default if needed
+# Cache de tokens já verificados (0 desliga)
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+JWT_CACHE_TTL = int(os.getenv("JWT_CACHE_TTL", "300"))
 
 # --- Check if JWT_SECRET_KEY was loaded ---
 if not JWT_SECRET_KEY:
@@ -21,6 +30,90 @@ if not JWT_SECRET_KEY:
     raise ValueError("Fatal Error: JWT_SECRET_KEY environment variable not set.")
 # --- End Check ---
 
+class VerifiedTokenCache:
+    """
+    Bounded LRU of tokens that already passed HS256 verification: sha256(token) -> (user_id, exp, jti).
+    An entry lives until the token's exp or ttl seconds, whichever comes first.
+    Revocation checks registered with add_revocation_check run on every hit, so a revoked token
+    is refused even while cached.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: int = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, Tuple[int, float, Optional[str], float]]" = OrderedDict()
+        self._revocation_checks: List[Callable[[Optional[str], int], bool]] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def add_revocation_check(self, check: Callable[[Optional[str], int], bool]) -> None:
+        """check(jti, user_id) returns True when the token must be refused"""
+        self._revocation_checks.append(check)
+
+    def is_revoked(self, jti: Optional[str], user_id: int) -> bool:
+        return any(check(jti, user_id) for check in self._revocation_checks)
+
+    def get(self, token: str) -> Optional[int]:
+        """Returns the cached user_id of a still valid token, or None on a miss"""
+        if not self.max_size:
+            return None
+        key = self._digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[3] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        user_id, _, jti, _ = entry
+        if self.is_revoked(jti, user_id):
+            self.invalidate(token)
+            return None
+        return user_id
+
+    def put(self, token: str, user_id: int, exp: float, jti: Optional[str] = None) -> None:
+        if not self.max_size:
+            return
+        expires_at = min(exp, time.time() + self.ttl)
+        with self._lock:
+            self._entries[self._digest(token)] = (user_id, exp, jti, expires_at)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(self._digest(token), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+token_cache = VerifiedTokenCache(JWT_CACHE_SIZE, JWT_CACHE_TTL)
+
 def generate_token(user_id):
     """Generate a JWT token for a user"""
     current_app.logger.debug(f"Attempting to generate token using module's JWT_SECRET_KEY.")
@@ -30,7 +123,9 @@ def generate_token(user_id):
             # Use JWT_EXPIRATION_MINUTES loaded from env
             'exp': datetime.utcnow() + timedelta(minutes=JWT_EXPIRATION_MINUTES),
             'iat': datetime.utcnow(),
-            'sub': str(user_id)
+            'sub': str(user_id),
+            # Identificador único do token, usado pela lista de revogação
+            'jti': uuid.uuid4().hex
         }
         # Use the module-level JWT_SECRET_KEY directly
         token = jwt.encode(
@@ -47,6 +142,10 @@ def generate_token(user_id):
 
 def verify_token(token):
     """Verify if a token is valid"""
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
     try:
         # Use the module-level JWT_SECRET_KEY directly
         payload = jwt.decode(
@@ -55,8 +154,13 @@ def verify_token(token):
             algorithms=['HS256']
         )
         # Return user_id directly upon success, consistent with decorator usage
-        user_id_from_token = payload['sub']
-        return int(user_id_from_token)
+        user_id = int(payload['sub'])
+        jti = payload.get('jti')
+        if token_cache.is_revoked(jti, user_id):
+            current_app.logger.warning("Token verification failed: token revoked")
+            return None
+        token_cache.put(token, user_id, payload['exp'], jti)
+        return user_id
     except jwt.ExpiredSignatureError:
         current_app.logger.warning("Token verification failed: ExpiredSignatureError")
         # Raise an exception or return None/False as needed by the calling code (decorator)
@@ -67,6 +171,15 @@ def verify_token(token):
         return None
 
 
+def get_token_claims(token) -> Optional[Dict]:
+    """Returns the verified payload of a token (sub, exp, jti...), or None if it is invalid or expired"""
+    try:
+        return jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
+    except jwt.InvalidTokenError as e:
+        current_app.logger.warning(f"Could not read token claims: {str(e)}")
+        return None
+
+
 def decode_token(token):
     """Decode a JWT token and return the user_id (handles verification implicitly)"""
     try:
@@ -0,0 +1,139 @@
+from array import array
+from datetime import datetime
+from flask import current_app
+from typing import Iterable, Optional, Set
+import math
+import os
+import threading
+import time
+
+from api.user.revoked_token.model import RevokedToken
+from api.utils.security.jwt.jwt_utils import get_token_claims, token_cache
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+class BloomFilter:
+    """Set membership with no false negatives and a configurable false positive rate"""
+
+    def __init__(self, capacity: int = 1024, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = array("B", [0]) * ((self.size + 7) // 8)
+        self.count = 0
+
+    def _indexes(self, key: str):
+        # Double hashing como no CountMinSketch; cada worker monta o próprio filtro, então hash() basta
+        h1 = hash(key) & _MASK64
+        h2 = ((h1 * 0x9E3779B97F4A7C15) & _MASK64) >> 17 | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for index in self._indexes(key):
+            self.bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(key))
+
+    @classmethod
+    def from_keys(cls, keys: Iterable[str], error_rate: float = 0.01) -> 'BloomFilter':
+        keys = list(keys)
+        # Folga para as revogações feitas neste worker até o próximo refresh
+        bloom = cls(max(1024, len(keys) * 2), error_rate)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+
+class TokenRevocationList:
+    """
+    Per-worker view of the revoked_tokens table.
+    Every worker keeps a Bloom filter of the revoked jti values, rebuilt from the table every
+    refresh_interval seconds. Tokens not in the filter (almost all of them) never touch the database;
+    only Bloom positives are confirmed against the table. A token revoked by another worker is refused
+    here at the next refresh at the latest.
+    """
+
+    def __init__(self, refresh_interval: int = 30, error_rate: float = 0.01):
+        self.refresh_interval = refresh_interval
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(1024, error_rate)
+        self._confirmed: Set[str] = set()
+        self._cleared: Set[str] = set()
+        self._refreshed_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self.lookups = 0
+
+    def refresh(self, force: bool = False) -> None:
+        """Rebuilds the Bloom filter from the table; needs an app context"""
+        if not force and time.time() - self._refreshed_at < self.refresh_interval:
+            return
+        # Só uma thread recarrega; as demais seguem com o filtro atual
+        if not self._refresh_lock.acquire(blocking=force):
+            return
+        try:
+            jtis = RevokedToken.active_jtis()
+            self._bloom = BloomFilter.from_keys(jtis, self.error_rate)
+            self._confirmed = set()
+            self._cleared = set()
+            current_app.logger.debug(f"Revocation list refreshed with {len(jtis)} revoked tokens")
+        except Exception as e:
+            current_app.logger.error(f"Error refreshing revocation list: {str(e)}")
+        finally:
+            # Em caso de erro tenta de novo só no próximo intervalo
+            self._refreshed_at = time.time()
+            self._refresh_lock.release()
+
+    def is_revoked(self, jti: Optional[str], user_id: int) -> bool:
+        # Tokens emitidos antes do jti não são revogáveis; expiram em JWT_EXPIRATION_MINUTES
+        if not jti:
+            return False
+        self.refresh()
+        if jti not in self._bloom or jti in self._cleared:
+            return False
+        if jti in self._confirmed:
+            return True
+
+        self.lookups += 1
+        try:
+            revoked = RevokedToken.is_revoked(jti)
+        except Exception as e:
+            # Positivo no filtro e banco indisponível: recusa o token
+            current_app.logger.error(f"Error checking revoked token {jti}: {str(e)}")
+            return True
+        (self._confirmed if revoked else self._cleared).add(jti)
+        return revoked
+
+    def revoke(self, jti: str, user_id: int, exp: float) -> None:
+        RevokedToken.revoke(jti, user_id, datetime.utcfromtimestamp(exp))
+        self._bloom.add(jti)
+        self._cleared.discard(jti)
+        self._confirmed.add(jti)
+
+    def stats(self):
+        return {
+            "revoked_tokens": self._bloom.count,
+            "bloom_bits": self._bloom.size,
+            "bloom_hashes": self._bloom.hashes,
+            "database_lookups": self.lookups,
+            "refreshed_at": self._refreshed_at,
+        }
+
+
+revocation_list = TokenRevocationList(
+    refresh_interval=int(os.getenv("JWT_REVOCATION_REFRESH_INTERVAL", "30")),
+    error_rate=float(os.getenv("JWT_REVOCATION_BLOOM_ERROR_RATE", "0.01")),
+)
+token_cache.add_revocation_check(revocation_list.is_revoked)
+
+
+def revoke_token(token: str) -> bool:
+    """Revokes a token until its exp. Returns False for invalid tokens and tokens without jti"""
+    claims = get_token_claims(token)
+    if not claims or not claims.get('jti'):
+        return False
+    revocation_list.revoke(claims['jti'], int(claims['sub']), claims['exp'])
+    token_cache.invalidate(token)
+    return True